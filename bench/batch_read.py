@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+1件ずつ読み込む従来モードとまとめ読みモードの処理件数を比較するベンチマーク。
+合成イベント列を擬似デバイスで再生し、1秒あたりの処理イベント数を表示する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    batch_read.py <profile> [--frames=<n>] [--burst=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    再生するフレーム数 [default: 20000]
+    --burst=<n>     1回のwakeupで溜まっているイベント件数 [default: 32]
+"""
+import time
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+
+
+def measure(ctl, device, batch_read):
+    """
+    擬似デバイス上の全イベントを処理し、(イベント数/秒, func_map呼び出し回数) を返却する。
+    """
+    calls = [0]
+    def counted(func):
+        def wrapper(val):
+            calls[0] += 1
+            return func(val)
+        return wrapper
+    ctl.func_map = {btn: counted(func) for btn, func in ctl.func_map.items()}
+    # ボタンIDで添字付けした関数の配列へ反映する
+    ctl.bind()
+
+    device.rewind()
+    start = time.perf_counter()
+    while device.remaining > 0:
+        if batch_read:
+            ctl.update_state_from_batch()
+        else:
+            ctl.update_state_from_loop()
+    elapsed = time.perf_counter() - start
+    return len(device.events) / elapsed, calls[0]
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    frames = int(args['--frames'])
+    burst = int(args['--burst'])
+
+    for batch_read in (False, True):
+        device = FakeInputDevice(synthetic_events(profile, frames), burst=burst)
+        ctl = create_controller(profile, device, batch_read=batch_read)
+        rate, calls = measure(ctl, device, batch_read)
+        print('[bench] {:<6} events/sec: {:>12.0f}  func_map calls: {}'.format(
+            'batch' if batch_read else 'single', rate, calls))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中央値のずれたゲームパッドを模したイベント列で、キャリブレーションの効果を確認するベンチマーク。
+左スティックXを中央値から offset ずらした位置でノイズを乗せて静止させ、時折端まで倒す。
+  before    設定ファイルの値のみで正規化した場合の、静止中の非ゼロ通知の割合と平均値(クリープ)
+  learn     calibrate=True で集計した場合の処理時間と学習結果
+  after     キャッシュファイルを読み込んだ場合の静止中の非ゼロ通知の割合と平均値
+設定ファイルは一時ディレクトリへ複製し、キャッシュファイルもそこへ保存する。
+左スティックXを学習できなかった場合、キャリブレーション後も静止中に非ゼロの通知が残る場合は
+終了コード1で終了する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    calibration.py <profile> [--offset=<ratio>] [--noise=<ratio>] [--frames=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help           ヘルプ表示
+    --offset=<ratio>    中央値のずれ(可動範囲の半分に対する割合) [default: 0.02]
+    --noise=<ratio>     静止中のノイズの標準偏差(可動範囲の半分に対する割合) [default: 0.005]
+    --frames=<n>        静止中のフレーム数 [default: 20000]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from docopt import docopt
+from evdev import InputEvent, ecodes
+
+from bench.devices import PROFILES, FakeInputDevice, disable_debounce
+from gamepad.calibration import cache_path
+from gamepad.config import resource_path
+
+
+def worn_events(profile, frames, offset, noise, sweep_every=2000, seed=0):
+    """
+    中央値のずれた左スティックXのイベント列を生成する。
+    カーネルと同様に値が変化した場合のみイベントを発生させる。
+    戻り値は (イベントのリスト, 静止中のイベントかどうかのリスト)。
+    """
+    code, (low, high) = sorted(PROFILES[profile]['axes'].items())[0]
+    half = (high - low) / 2.0
+    center = (high + low) / 2.0 + offset * half
+    rng = random.Random(seed)
+    events, resting = [], []
+    last = None
+    usec = 0
+    def emit(value, rest):
+        nonlocal last, usec
+        value = int(round(min(max(value, low), high)))
+        if value == last:
+            return
+        last = value
+        usec += 2000
+        events.append(InputEvent(usec // 1000000, usec % 1000000, ecodes.EV_ABS, code, value))
+        resting.append(rest)
+    for frame in range(frames):
+        if sweep_every and frame % sweep_every == sweep_every - 1:
+            # 端から端まで倒して戻す
+            for step in range(-20, 21):
+                emit(center + abs(step) / 20.0 * (high - center if step > 0 else low - center), False)
+        emit(rng.gauss(center, noise * half), True)
+    return events, resting
+
+
+def rest_output(ctl, events, resting):
+    """
+    静止中のイベントの正規化値から、非ゼロの割合と平均値を返却する。
+    """
+    values = [val for event, rest in zip(events, resting) if rest
+        for btn, val in (ctl.decoder.decode(event),) if btn == 'LEFT_STICK_X']
+    nonzero = sum(1 for val in values if val != 0)
+    return nonzero / float(len(values)), sum(values) / len(values)
+
+
+def new_controller(profile, config_path, **kwargs):
+    """
+    複製した設定ファイルを使用するコントローラを生成する。
+    """
+    module = __import__(PROFILES[profile]['vendor'])
+    return disable_debounce(module.JoystickController(
+        event_input_device=FakeInputDevice([]), config_path=config_path, **kwargs))
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    events, resting = worn_events(profile, int(args['--frames']),
+        float(args['--offset']), float(args['--noise']))
+
+    directory = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(directory, PROFILES[profile]['config'])
+        shutil.copy(resource_path(PROFILES[profile]['vendor'], PROFILES[profile]['config']), config_path)
+
+        ctl = new_controller(profile, config_path)
+        ratio, creep = rest_output(ctl, events, resting)
+        print('[bench] before  rest non-zero: {:6.1%}  mean: {:+.4f}'.format(ratio, creep))
+
+        ctl = new_controller(profile, config_path, calibrate=True)
+        decode = ctl.decoder.decode
+        start = time.perf_counter()
+        for event in events:
+            decode(event)
+        elapsed = time.perf_counter() - start
+        calibration = ctl.save_calibration()
+        entry = calibration.get('LEFT_STICK_X')
+        if entry is None:
+            print('[bench] learn   events: {}  {:.2f} us/event  LEFT_STICK_X not learned '
+                '(fewer than {} rest samples)'.format(len(events), elapsed / len(events) * 1e6,
+                ctl.calibrator.min_samples))
+        else:
+            print('[bench] learn   events: {}  {:.2f} us/event  center: {:.2f}  deadzone: {:.2f}  '
+                'min: {}  max: {}  samples: {}'.format(len(events), elapsed / len(events) * 1e6,
+                entry['center'], entry['deadzone'], entry['min'], entry['max'], entry['samples']))
+        print('[bench] cache   {}'.format(cache_path(config_path)))
+
+        ctl = new_controller(profile, config_path)
+        ratio, creep = rest_output(ctl, events, resting)
+        print('[bench] after   rest non-zero: {:6.1%}  mean: {:+.4f}'.format(ratio, creep))
+    finally:
+        shutil.rmtree(directory)
+    if entry is None or ratio > 0.01:
+        sys.exit(1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+応答曲線を event.value で添字付けした表引き(設定ファイルの curves セクション)と、
+正規化関数の計算後に応答曲線を計算し update_throttle() で向きと倍率を掛ける方式を比較するベンチマーク。
+  match     曲線ごと(線形、expo/rate、折れ線)に、スロットル倍率の変更を挟んで
+            両方式の angle, throttle と状態(ctl.state)の値が一致するかどうか
+            (状態やフィルタへ渡る値にはスロットルの向きと倍率を掛けない)
+  dispatch  スティックのイベント1件あたりの dispatch_event() の処理時間
+  decode    スティックのイベント1件あたりの decode_id() の処理時間
+  build     表を含むデコードテーブルの構築時間
+ボタンの debounce と入力フィルタは無効にして比較する。
+一致しない場合は終了コード1で終了する。リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    curves.py <profile> [--frames=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    合成するフレーム数 [default: 20000]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+import sys
+import time
+
+from docopt import docopt
+from evdev import ecodes
+
+from bench.decode import per_event
+from bench.devices import FakeInputDevice, create_controller, disable_debounce, synthetic_events
+from gamepad.curves import response_curve
+
+# 比較する応答曲線
+CURVES = {
+    'linear': {},
+    'expo': {'expo': 0.4, 'rate': 0.8},
+    'points': {'points': [[0.0, 0.0], [0.5, 0.2], [1.0, 1.0]], 'invert': True},
+}
+
+# 応答曲線を適用するスティック
+TARGETS = ('LEFT_STICK_X', 'RIGHT_STICK_Y')
+
+
+def prepare(profile, curve=None, table=True):
+    """
+    debounce と入力フィルタを無効にしたコントローラを生成する。
+    table が True の場合は curves セクションで表引きへ、False の場合は
+    正規化関数の後に応答曲線を計算する関数へ差し替える。
+    """
+    ctl = create_controller(profile, FakeInputDevice([]))
+    ctl.filters = {}
+    if curve is not None and table:
+        ctl.config['curves'] = {name: curve for name in TARGETS}
+    disable_debounce(ctl)
+    if curve is not None and not table:
+        compute = response_curve(curve)
+        for name in TARGETS:
+            ctl.decoder.replace_normalizer(name,
+                lambda normalizer: lambda value: compute(normalizer(value)))
+    return ctl
+
+
+def compare(profile, events, curve):
+    """
+    両方式で同じイベント列を処理し、angle, throttle, 状態の値が一致しないイベント数を返却する。
+    途中でスロットル倍率を変更し、変更後の係数の反映も確認する。
+    """
+    table = prepare(profile, curve)
+    arithmetic = prepare(profile, curve, table=False)
+    mismatch = 0
+    for index, event in enumerate(events):
+        if index == len(events) // 2:
+            table.throttle_scale = arithmetic.throttle_scale = 0.65
+        table.dispatch_event(event)
+        arithmetic.dispatch_event(event)
+        if abs(table.angle - arithmetic.angle) > 1e-12 \
+                or abs(table.throttle - arithmetic.throttle) > 1e-12 \
+                or list(table.state.values) != list(arithmetic.state.values):
+            mismatch += 1
+    return mismatch
+
+
+def best_of(repeat, func):
+    """
+    最速の計測結果(秒)を返却する。
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    repeat = int(args['--repeat'])
+    events = synthetic_events(profile, int(args['--frames']), button_every=0)
+    sticks = [event for event in events if event.type == ecodes.EV_ABS]
+
+    failed = False
+    for label, curve in CURVES.items():
+        mismatch = compare(profile, events, curve)
+        failed = failed or mismatch > 0
+        print('[bench] match    {:<7}: {} mismatches / {} events'.format(label, mismatch, len(events)))
+
+    curve = CURVES['expo']
+    table = prepare(profile, curve)
+    arithmetic = prepare(profile, curve, table=False)
+    for label, ctl in (('arith', arithmetic), ('table', table)):
+        print('[bench] dispatch {:<7}: {:8.1f} ns/event'.format(
+            label, per_event(ctl.dispatch_event, sticks, repeat)))
+    for label, ctl in (('arith', arithmetic), ('table', table)):
+        print('[bench] decode   {:<7}: {:8.1f} ns/event'.format(
+            label, per_event(ctl.decoder.decode_id, sticks, repeat)))
+
+    build = best_of(repeat, table._compile_decoder)
+    plain = best_of(repeat, arithmetic._compile_decoder)
+    print('[bench] build    table  : {:8.2f} ms (without curves {:.2f} ms)'.format(
+        build * 1e3, plain * 1e3))
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+チャタリング・オートリピートを含むボタン操作を記録ファイルへ書き出して再生し、
+記録モード切替ボタンの func_map 呼び出し回数が実際の押下回数と一致することを確認する。
+設定ファイルの debounce を無効にした場合の呼び出し回数も表示する。
+一致しない場合は終了コード1で終了する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    debounce.py <profile> [--path=<path>] [--presses=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help           ヘルプ表示
+    --path=<path>       記録ファイルパス [default: /tmp/gamepad_chatter.gpev]
+    --presses=<n>       各操作パターンの押下回数 [default: 10]
+"""
+from docopt import docopt
+from evdev import InputEvent, ecodes
+
+from bench.devices import FakeInputDevice, create_controller, disable_debounce
+from gamepad.replay import ReplayDevice, write_events
+
+# 記録モード切替ボタン名
+TOGGLE_BUTTON = {'f710_xi': 'X', 'f710_di': 'X', 'jc_u3912t': '1'}
+
+
+def chatter_events(event_type, key, presses, start=1000.0):
+    """
+    以下の3パターンの押下をそれぞれ presses 回含むイベント列を生成する。
+      bounce  押下直後に数ミリ秒間隔で接点がばたつく
+      repeat  約0.8秒押し続け、オートリピートが発生する
+      tap     短く押して離す
+    押下/離脱イベントが発生する EV_KEY の場合は離脱(0)、オートリピート(2)も含める。
+
+    引数
+        event_type  ボタンの event.type
+        key         ボタンの event.code(EV_KEY)もしくは event.value(EV_MSC)
+        presses     各パターンの押下回数
+        start       最初のイベントのタイムスタンプ(エポック秒)
+    戻り値
+        events      evdev.InputEvent のリスト
+        count       実際の押下回数
+    """
+    events = []
+    def emit(t, value):
+        sec = int(t)
+        usec = int(round((t - sec) * 1000000))
+        if event_type == ecodes.EV_KEY:
+            events.append(InputEvent(sec, usec, ecodes.EV_KEY, key, value))
+        elif value != 0:
+            # EV_MSC は押下時のみ発生し、value はスキャンコード
+            events.append(InputEvent(sec, usec, ecodes.EV_MSC, ecodes.MSC_SCAN, key))
+        events.append(InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+
+    t = start
+    for _ in range(presses):
+        # bounce
+        for offset, value in ((0.000, 1), (0.002, 0), (0.004, 1), (0.006, 0), (0.008, 1)):
+            emit(t + offset, value)
+        emit(t + 0.12, 0)
+        t += 0.6
+        # repeat(250ms後から33ms間隔)
+        emit(t, 1)
+        repeat = t + 0.25
+        while repeat < t + 0.8:
+            emit(repeat, 2)
+            repeat += 0.033
+        emit(t + 0.8, 0)
+        t += 1.4
+        # tap
+        emit(t, 1)
+        emit(t + 0.08, 0)
+        t += 0.6
+    return events, presses * 3
+
+
+def replay_count(profile, path, name, debounce):
+    """
+    記録ファイルを再生し、ボタンに対応する func_map 上の関数の呼び出し回数を返却する。
+    """
+    ctl = create_controller(profile, ReplayDevice(path), batch_read=True)
+    if not debounce:
+        disable_debounce(ctl)
+    calls = [0]
+    func = ctl.func_map[name]
+    def counting(val):
+        # 押下(1)の通知のみ数える(離脱の通知では切り替わらない)
+        if val == 1:
+            calls[0] += 1
+        func(val)
+    ctl.func_map[name] = counting
+    ctl.bind()
+    while ctl.device.remaining > 0:
+        ctl.update_state_from_batch()
+    return calls[0], ctl.debounce.get(name)
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    path = args['--path']
+    name = TOGGLE_BUTTON[profile]
+
+    ctl = create_controller(profile, FakeInputDevice([]))
+    button_id = ctl.decoder.ids[name]
+    (event_type, key), = [key for key, entry in ctl.decoder.entries().items() if entry[0] == button_id]
+    events, expected = chatter_events(event_type, key, int(args['--presses']))
+    write_events(path, events)
+
+    raw, _ = replay_count(profile, path, name, False)
+    debounced, gate = replay_count(profile, path, name, True)
+    print('[bench] {} button {}: presses {}  without debounce {}  with debounce {} (suppressed {})'.format(
+        profile, name, expected, raw, debounced, gate.suppressed))
+    if debounced != expected:
+        raise SystemExit('[bench] mismatch: expected {} toggles, got {}'.format(expected, debounced))
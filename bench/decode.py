@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベント1件あたりのデコード処理時間を、従来の分岐処理とデコードテーブルとで比較する
+マイクロベンチマーク。両者の出力が一致することも確認する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    decode.py <profile> [--frames=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    デコードするフレーム数 [default: 20000]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+import time
+
+from docopt import docopt
+
+from bench import legacy
+from bench.devices import FakeInputDevice, PROFILES, create_controller, disable_debounce, synthetic_events
+
+
+def per_event(decode, events, repeat):
+    """
+    最速の計測結果からイベント1件あたりの処理時間(ナノ秒)を返却する。
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            decode(event)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(events) * 1e9
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    frames = int(args['--frames'])
+    repeat = int(args['--repeat'])
+
+    # ゲート(debounce)は押下間隔に依存するため無効にして比較する
+    ctl = disable_debounce(create_controller(profile, FakeInputDevice([])))
+    events = synthetic_events(profile, frames)
+    legacy_decode = legacy.logicool_decode if PROFILES[profile]['vendor'] == 'logicool' else legacy.elecom_decode
+
+    # 出力の一致を確認(対象外イベントは除く)
+    for event in events:
+        old = legacy_decode(ctl, event)
+        new = ctl.decoder.decode(event)
+        if old[0] is not None and old != new:
+            raise AssertionError('mismatch {}: {} != {}'.format(event, old, new))
+
+    old_ns = per_event(lambda event: legacy_decode(ctl, event), events, repeat)
+    new_ns = per_event(ctl.decoder.decode, events, repeat)
+    print('[bench] legacy  : {:8.1f} ns/event'.format(old_ns))
+    print('[bench] compiled: {:8.1f} ns/event'.format(new_ns))
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の擬似イベントデバイス。
+実機(F710/JC-U3912T)を接続しなくても read_loop()/read() を駆動できるよう、
+合成したイベント列を evdev.InputDevice と同じインターフェイスで再生する。
+"""
+import math
+import os
+import random
+import struct
+
+from evdev import InputEvent, ecodes
+from evdev import _input
+
+# 各コントローラのイベント構成
+#   vendor  パッケージ名
+#   config  設定ファイル名
+#   axes    {EV_ABS code: (最小値, 最大値)} 左スティックX/右スティックY
+#   button  ボタン押下時に発生するイベント (type, code, value)
+PROFILES = {
+    'f710_xi': {
+        'vendor': 'logicool',
+        'config': 'f710_xi.yml',
+        'axes': {0: (-32768, 32767), 4: (-32768, 32767)},
+        'button': (ecodes.EV_KEY, 304, 1),
+    },
+    'f710_di': {
+        'vendor': 'logicool',
+        'config': 'f710_di.yml',
+        'axes': {0: (0, 255), 5: (0, 255)},
+        'button': (ecodes.EV_MSC, ecodes.MSC_SCAN, 589826),
+    },
+    'jc_u3912t': {
+        'vendor': 'elecom',
+        'config': 'jc_u3912t.yml',
+        'axes': {0: (0, 255), 2: (0, 255)},
+        'button': (ecodes.EV_MSC, ecodes.MSC_SCAN, 589825),
+    },
+}
+
+
+def create_controller(profile, device, **kwargs):
+    """
+    擬似デバイスを使用するコントローラを生成する。
+
+    引数
+        profile     PROFILES のキー
+        device      擬似デバイス
+        kwargs      コントローラのコンストラクタへ渡すその他の引数
+    戻り値
+        ctl         JoystickController オブジェクト
+    """
+    from gamepad.config import resource_path
+    vendor = PROFILES[profile]['vendor']
+    module = __import__(vendor)
+    return module.JoystickController(event_input_device=device,
+        config_path=resource_path(vendor, PROFILES[profile]['config']), **kwargs)
+
+
+def disable_debounce(ctl):
+    """
+    設定ファイルの debounce を無効にしてデコードテーブルを構築し直す。
+    ボタン押下の間隔に依存しない処理(デコード結果の比較など)を計測する場合に使用する。
+
+    引数
+        ctl     JoystickController オブジェクト
+    戻り値
+        ctl     同じ JoystickController オブジェクト
+    """
+    ctl.config['debounce'] = {}
+    ctl.decoder = ctl._compile_decoder()
+    return ctl
+
+
+def synthetic_events(profile, count, rate_hz=500, button_every=100):
+    """
+    スティックを往復させ、時折ボタンを押す操作を模したイベント列を生成する。
+    1フレームごとに各axisのEV_ABSとEV_SYNを発生させる。
+
+    引数
+        profile         PROFILES のキー
+        count           生成するフレーム数
+        rate_hz         フレーム発生頻度(デフォルト500Hz)
+        button_every    ボタン押下を挿入するフレーム間隔(デフォルト100)
+    戻り値
+        events          evdev.InputEvent のリスト
+    """
+    axes = PROFILES[profile]['axes']
+    btn_type, btn_code, btn_value = PROFILES[profile]['button']
+    events = []
+    for frame in range(count):
+        usec_total = int(frame * 1000000 / rate_hz)
+        sec, usec = divmod(usec_total, 1000000)
+        phase = 2.0 * math.pi * frame / 250.0
+        for index, (code, (min_value, max_value)) in enumerate(sorted(axes.items())):
+            ratio = (math.sin(phase + index) + 1.0) / 2.0
+            value = int(min_value + (max_value - min_value) * ratio)
+            events.append(InputEvent(sec, usec, ecodes.EV_ABS, code, value))
+        if button_every and frame % button_every == 0:
+            events.append(InputEvent(sec, usec, btn_type, btn_code, btn_value))
+        events.append(InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+    return events
+
+
+def jitter_events(profile, count, rate_hz=500, amplitude=0.02, seed=0):
+    """
+    スティックをゼロ範囲外の一定位置に保持した状態での揺らぎを模したイベント列を生成する。
+    値は保持位置を中心に可変範囲の amplitude 倍の幅で揺らぐ。
+
+    引数
+        profile     PROFILES のキー
+        count       生成するフレーム数
+        rate_hz     フレーム発生頻度(デフォルト500Hz)
+        amplitude   揺らぎの幅(可変範囲に対する比率、デフォルト0.02)
+        seed        乱数シード
+    戻り値
+        events      evdev.InputEvent のリスト
+    """
+    rng = random.Random(seed)
+    axes = PROFILES[profile]['axes']
+    events = []
+    for frame in range(count):
+        usec_total = int(frame * 1000000 / rate_hz)
+        sec, usec = divmod(usec_total, 1000000)
+        for code, (min_value, max_value) in sorted(axes.items()):
+            span = max_value - min_value
+            hold = min_value + span * 0.7
+            value = int(hold + span * amplitude * (rng.random() - 0.5))
+            events.append(InputEvent(sec, usec, ecodes.EV_ABS, code, value))
+        events.append(InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+    return events
+
+
+class FakeInputDevice:
+    """
+    イベント列を先頭から順に返却する擬似 InputDevice。
+    read() は1回のwakeupでfd上に溜まっている件数(burst)分を返却する。
+    """
+    def __init__(self, events, burst=32, name='fake input device'):
+        """
+        コンストラクタ。
+
+        引数
+            events  再生するイベントオブジェクトのリスト
+            burst   read() 1回で返却する最大件数(デフォルト32)
+            name    デバイス名
+        戻り値
+            なし
+        """
+        self.events = events
+        self.burst = burst
+        self.name = name
+        self.position = 0
+        self.fd = None
+
+    @property
+    def remaining(self):
+        """
+        未再生イベント件数。
+        """
+        return len(self.events) - self.position
+
+    def rewind(self):
+        """
+        再生位置を先頭へ戻す。
+        """
+        self.position = 0
+
+    def read(self):
+        """
+        最大burst件のイベントを返却する。
+        """
+        start = self.position
+        self.position = min(start + self.burst, len(self.events))
+        return iter(self.events[start:self.position])
+
+    def read_loop(self):
+        """
+        イベントを1件ずつ返却するジェネレータ。
+        """
+        while self.position < len(self.events):
+            event = self.events[self.position]
+            self.position += 1
+            yield event
+
+
+class PipeInputDevice:
+    """
+    evdev と同じ input_event 構造体をパイプ経由で読み込む擬似 InputDevice。
+    読み込みには evdev 本体と同じ C 実装(device_read_many)を使用するため、
+    カーネルからの読み込み経路に近い条件で計測できる。
+    """
+    # struct input_event(timeval, type, code, value)
+    EVENT_FORMAT = 'llHHi'
+
+    def __init__(self, name='pipe input device'):
+        """
+        コンストラクタ。ノンブロッキングのパイプを生成する。
+
+        引数
+            name    デバイス名
+        戻り値
+            なし
+        """
+        self.name = name
+        self.path = name
+        self.fd, self.write_fd = os.pipe()
+        os.set_blocking(self.fd, False)
+
+    def write(self, events):
+        """
+        イベントをパイプへ書き込む(カーネル側のイベント発生に相当)。
+
+        引数
+            events  evdev.InputEvent オブジェクトのリスト
+        戻り値
+            なし
+        """
+        os.write(self.write_fd, b''.join(struct.pack(self.EVENT_FORMAT,
+            event.sec, event.usec, event.type, event.code, event.value) for event in events))
+
+    def read(self):
+        """
+        溜まっている全イベントを返却する。なければ BlockingIOError を送出する。
+        """
+        for event in _input.device_read_many(self.fd):
+            yield InputEvent(*event)
+
+    def read_one(self):
+        """
+        イベントを1件返却する。なければNoneを返却する。
+        """
+        event = _input.device_read(self.fd)
+        return InputEvent(*event) if event else None
+
+    def read_loop(self):
+        """
+        イベントを1件ずつ返却するジェネレータ。
+        """
+        while True:
+            event = self.read_one()
+            if event is None:
+                return
+            yield event
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        """
+        パイプを閉じる。
+        """
+        os.close(self.fd)
+        os.close(self.write_fd)
+
+
+class FifoInputDevice(PipeInputDevice):
+    """
+    名前付きパイプ(FIFO)からイベントを読み込む擬似 InputDevice。
+    パスで開き直せるため、別プロセス(GameController(isolate=...) の子プロセスなど)からも使用できる。
+    """
+    def __init__(self, path):
+        """
+        コンストラクタ。FIFOをノンブロッキングで開く。
+        書き込み側が閉じても EOF にならないよう読み書き両用で開く。
+
+        引数
+            path    FIFOのパス
+        戻り値
+            なし
+        """
+        self.name = 'fifo input device'
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        self.write_fd = self.fd
+
+    def close(self):
+        """
+        FIFOを閉じる。
+        """
+        os.close(self.fd)
+
+
+def fifo_controller(profile, path, event_input_device=None, config_path=None,
+    device_search_term=None, **kwargs):
+    """
+    FIFOから読み込むコントローラを生成する。
+    GameController(isolate=functools.partial(fifo_controller, profile, path)) として
+    子プロセスでのコントローラ生成に使用する(デバイス、設定ファイルの引数は無視する)。
+
+    引数
+        profile     PROFILES のキー
+        path        FIFOのパス
+        kwargs      コントローラのコンストラクタへ渡すその他の引数
+    戻り値
+        ctl         JoystickController オブジェクト
+    """
+    return create_controller(profile, FifoInputDevice(path), **kwargs)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベント1件あたりの振り分け処理時間(デコード、状態更新、func_map 呼び出し)を、
+ボタン名(文字列)による辞書検索と、ボタンIDによる配列添字とで比較するベンチマーク。
+入力フィルタは両者とも無効にして計測する。
+func_map 上の関数の処理時間を除いた振り分け処理のみの比較も行う。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    dispatch.py <profile> [--frames=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    処理するフレーム数 [default: 20000]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+from docopt import docopt
+
+from bench.decode import per_event
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+from bench.legacy import StringDispatcher
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    repeat = int(args['--repeat'])
+    events = synthetic_events(profile, int(args['--frames']))
+
+    ctl = create_controller(profile, FakeInputDevice([]))
+    ctl.filters = {}
+    ctl.bind()
+    legacy = StringDispatcher(ctl)
+
+    # 状態の一致を確認
+    for event in events:
+        legacy.dispatch_event(event)
+        ctl.dispatch_event(event)
+    for btn, val in legacy.state.items():
+        if ctl.state[btn] != val:
+            raise AssertionError('mismatch {}: {} != {}'.format(btn, ctl.state[btn], val))
+
+    string_ns = per_event(legacy.dispatch_event, events, repeat)
+    id_ns = per_event(ctl.dispatch_event, events, repeat)
+    print('[bench] string names: {:8.1f} ns/event'.format(string_ns))
+    print('[bench] integer ids : {:8.1f} ns/event'.format(id_ns))
+
+    # func_map 上の関数を何もしない関数へ置き換え、振り分け処理のみを比較する
+    noop = lambda val: None
+    ctl.func_map = {btn: noop for btn in ctl.func_map}
+    ctl.bind()
+    ctl._publish = lambda: None
+    string_ns = per_event(legacy.dispatch_event, events, repeat)
+    id_ns = per_event(ctl.dispatch_event, events, repeat)
+    print('[bench] string names (no-op func_map): {:8.1f} ns/event'.format(string_ns))
+    print('[bench] integer ids  (no-op func_map): {:8.1f} ns/event'.format(id_ns))
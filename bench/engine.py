@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汎用デコードエンジン(gamepad.engine)で設定ファイルから構築したデコードテーブルを、
+従来の各社サブクラスの処理と比較するベンチマーク。
+  read_loop   デコードテーブル導入前の read_loop() の分岐処理(bench.legacy)
+  subclass    汎用デコードエンジン導入前の各社サブクラスのデコードテーブル構築処理(bench.legacy)
+  engine      設定ファイルの decode セクションから構築したデコードテーブル
+記録ファイル(.gpev)を再生したイベント列で、出力の一致、構築時間、イベント1件あたりの処理時間を計測する。
+記録ファイルを指定しない場合は合成イベント列(全ボタン/axisを含む)から記録ファイルを作成して使用する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    engine.py <profile> [<path>] [--frames=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    合成するフレーム数 [default: 20000]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from docopt import docopt
+from evdev import InputEvent, ecodes
+
+from bench import legacy
+from bench.decode import per_event
+from bench.devices import PROFILES, FakeInputDevice, create_controller, jitter_events, \
+    synthetic_events
+from gamepad.engine import compile_decoder
+from gamepad.replay import ReplayDevice, write_events
+
+
+def coverage_events(decoder, profile):
+    """
+    デコードテーブルの全エントリ(と対象外のイベント)を1回以上含むイベント列を生成する。
+    """
+    low, high = sorted(PROFILES[profile]['axes'].items())[0][1]
+    events = []
+    for (event_type, key) in sorted(decoder.entries()):
+        if event_type in decoder.value_keyed:
+            events.append(InputEvent(0, 0, event_type, ecodes.MSC_SCAN, key))
+        elif event_type == ecodes.EV_ABS:
+            for value in (low, (low + high) // 2, (low + high + 1) // 2, high, -1, 0, 1):
+                events.append(InputEvent(0, 0, event_type, key, value))
+        else:
+            for value in (0, 1, 2):
+                events.append(InputEvent(0, 0, event_type, key, value))
+    # 対象外のイベント
+    events.append(InputEvent(0, 0, ecodes.EV_ABS, 40, 0))
+    events.append(InputEvent(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+    return events
+
+
+def replayed(path):
+    """
+    記録ファイルを再生したイベント列を返却する。
+    """
+    device = ReplayDevice(path)
+    try:
+        return list(device.read_loop())
+    finally:
+        device.close()
+
+
+def build_time(build, repeat):
+    """
+    デコードテーブル構築1回あたりの最速の処理時間(マイクロ秒)を返却する。
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    repeat = int(args['--repeat'])
+    ctl = create_controller(profile, FakeInputDevice([]))
+    is_logicool = PROFILES[profile]['vendor'] == 'logicool'
+    legacy_decode = legacy.logicool_decode if is_logicool else legacy.elecom_decode
+    legacy_compile = legacy.logicool_compile if is_logicool else legacy.elecom_compile
+    subclass = legacy_compile(ctl)
+    engine = compile_decoder(ctl.config)
+
+    path = args['<path>']
+    if path is None:
+        frames = int(args['--frames'])
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, profile + '.gpev')
+        write_events(path, coverage_events(subclass, profile)
+            + synthetic_events(profile, frames) + jitter_events(profile, frames // 4))
+        events = replayed(path)
+        shutil.rmtree(directory)
+    else:
+        events = replayed(path)
+
+    # 出力の一致を確認(read_loop は対象外イベントを除く)
+    if engine.entries().keys() != subclass.entries().keys():
+        raise AssertionError('table keys differ: {}'.format(
+            set(engine.entries()).symmetric_difference(subclass.entries())))
+    for event in events:
+        old = legacy_decode(ctl, event)
+        compiled = subclass.decode(event)
+        new = engine.decode(event)
+        if compiled != new or (old[0] is not None and old != new):
+            raise AssertionError('mismatch {}: {} / {} / {}'.format(event, old, compiled, new))
+
+    print('[bench] session : {} ({} events)'.format(path, len(events)))
+    print('[bench] build   subclass: {:8.1f} us  engine: {:8.1f} us'.format(
+        build_time(lambda: legacy_compile(ctl), repeat),
+        build_time(lambda: compile_decoder(ctl.config), repeat)))
+    print('[bench] read_loop: {:8.1f} ns/event'.format(
+        per_event(lambda event: legacy_decode(ctl, event), events, repeat)))
+    print('[bench] subclass : {:8.1f} ns/event'.format(per_event(subclass.decode, events, repeat)))
+    print('[bench] engine   : {:8.1f} ns/event'.format(per_event(engine.decode, events, repeat)))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベントの書き出し(export)による運転ループへの影響と、tub レコードへの整列処理を計測するベンチマーク。
+  dispatch  書き出しなし/リングバッファのみ/書き出しありでのイベント1件あたりの処理時間
+  export    書き出したイベント件数、チャンク数、破棄件数(リングバッファの上書き)と内容の一致
+  append    ボタン名の順序が異なるセッションを同じディレクトリへ追記した場合のボタン名の一致
+  align     tub(v1形式の record_*.json)のタイムスタンプへの整列処理時間(方式ごと)と
+            hold 方式の結果を1件ずつ求めた値との一致
+一時ディレクトリへ書き出し、終了時に削除する。numpy パッケージが必要。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    export.py <profile> [--frames=<n>] [--hz=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    合成するフレーム数 [default: 20000]
+    --hz=<n>        tub レコードの記録周波数 [default: 20]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+import bisect
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from docopt import docopt
+
+from bench.decode import per_event
+from bench.devices import FakeInputDevice, create_controller, disable_debounce, synthetic_events
+from gamepad.export import EventExporter, align, load_export, tub_timestamps
+from gamepad.ring import EventRing
+
+
+def write_tub(tub_dir, start, count, hz):
+    """
+    tub v1 形式(record_*.json, meta.json)のレコードを作成する。
+    """
+    os.makedirs(tub_dir)
+    with open(os.path.join(tub_dir, 'meta.json'), 'w') as f:
+        json.dump({'inputs': ['user/angle'], 'types': ['float'], 'start': start}, f)
+    for index in range(count):
+        with open(os.path.join(tub_dir, 'record_{}.json'.format(index)), 'w') as f:
+            json.dump({'user/angle': 0.0, 'milliseconds': int(index * 1000 / hz)}, f)
+
+
+def naive_hold(timestamps, buttons, values, button_id, tick):
+    """
+    tick 時点の直前のイベントの値を1件ずつ求める(比較用)。
+    """
+    selected = [index for index in range(len(timestamps)) if buttons[index] == button_id]
+    times = [timestamps[index] for index in selected]
+    position = bisect.bisect_right(times, tick) - 1
+    return values[selected[position]] if position >= 0 else 0.0
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    repeat = int(args['--repeat'])
+    hz = int(args['--hz'])
+    events = synthetic_events(profile, int(args['--frames']))
+    directory = tempfile.mkdtemp()
+    try:
+        # 運転ループ側の処理時間(書き出しスレッドは計測中も動作させる)
+        plain = disable_debounce(create_controller(profile, FakeInputDevice([])))
+        ringed = disable_debounce(create_controller(profile, FakeInputDevice([]), ring=4096))
+        exported = disable_debounce(create_controller(profile, FakeInputDevice([]),
+            export=os.path.join(directory, 'timing')))
+        for label, ctl in (('none', plain), ('ring', ringed), ('export', exported)):
+            print('[bench] dispatch {:<6}: {:8.1f} ns/event'.format(
+                label, per_event(ctl.dispatch_event, events, repeat)))
+        exported.export.close()
+        print('[bench] export  timing run: {} events  {} chunks  dropped: {} (replayed faster than real time)'.format(
+            exported.export.events, exported.export.chunks, exported.export.dropped))
+
+        # 全件を保持できるリングバッファで書き出した内容を比較
+        ring = EventRing(len(events))
+        reference = ring.reader()
+        export_dir = os.path.join(directory, 'export')
+        ctl = disable_debounce(create_controller(profile, FakeInputDevice([]),
+            export=EventExporter(export_dir, ring, chunk=8192)))
+        for event in events:
+            ctl.dispatch_event(event)
+        ctl.export.close()
+        expected = reference.allocate(ring.head)
+        count = reference.read_into(*expected)
+        timestamps, buttons, values, names = load_export(export_dir)
+        if len(timestamps) != count or ctl.export.dropped:
+            raise AssertionError('exported {} of {} events (dropped {})'.format(
+                len(timestamps), count, ctl.export.dropped))
+        for column, source in zip((timestamps, buttons, values), expected):
+            if not np.array_equal(np.sort(column), np.sort(np.frombuffer(source, dtype=column.dtype))):
+                raise AssertionError('exported column differs')
+        print('[bench] export  events: {}  chunks: {}  dropped: {}  names: {}'.format(
+            len(timestamps), ctl.export.chunks, ctl.export.dropped, names))
+
+        # ボタン名の登録順が異なるセッションを追記してもボタン名が入れ替わらないこと
+        append_dir = os.path.join(directory, 'append')
+        for session, order in enumerate((names, list(reversed(names)))):
+            ring = EventRing(len(order))
+            offset = ring.register(order)
+            exporter = EventExporter(append_dir, ring)
+            for button_id, name in enumerate(order):
+                ring.push(float(session), offset + button_id, float(names.index(name)))
+            exporter.close()
+        _, appended_buttons, appended_values, appended_names = load_export(append_dir)
+        for button_id, value in zip(appended_buttons, appended_values):
+            if appended_names[button_id] != names[int(value)]:
+                raise AssertionError('appended export relabelled {} as {}'.format(
+                    names[int(value)], appended_names[button_id]))
+        print('[bench] append  {} events from 2 sessions keep their button names'.format(
+            len(appended_buttons)))
+
+        # tub のタイムスタンプへの整列
+        start = float(timestamps[0])
+        duration = float(timestamps[-1] - timestamps[0])
+        tub_dir = os.path.join(directory, 'tub')
+        write_tub(tub_dir, start, int(duration * hz), hz)
+        _, ticks = tub_timestamps(tub_dir)
+        for method in ('hold', 'linear', 'mean'):
+            best = None
+            for _ in range(repeat):
+                begin = time.perf_counter()
+                aligned = align(timestamps, buttons, values, names, ticks, method)
+                elapsed = time.perf_counter() - begin
+                best = elapsed if best is None else min(best, elapsed)
+            print('[bench] align   {:<6}: {} records x {} buttons  {:8.2f} ms'.format(
+                method, len(ticks), len(aligned), best * 1e3))
+        aligned = align(timestamps, buttons, values, names, ticks, 'hold')
+        for button_id, name in enumerate(names):
+            for index in range(0, len(ticks), max(1, len(ticks) // 50)):
+                expected = naive_hold(timestamps, buttons, values, button_id, ticks[index])
+                if aligned[name][index] != expected:
+                    raise AssertionError('hold mismatch {} at {}: {} / {}'.format(
+                        name, ticks[index], aligned[name][index], expected))
+        print('[bench] align   hold matches per-record lookup')
+    finally:
+        shutil.rmtree(directory)
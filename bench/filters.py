@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入力フィルタの有無による func_map 呼び出し回数と処理イベント数を比較するベンチマーク。
+スティックを保持した状態の揺らぎを模したイベント列を再生する。
+設定ファイルの filters セクションは既定でコメントアウトされているため、
+LEFT_STICK_X, RIGHT_STICK_Y に変化量閾値フィルタ(threshold)を設定して比較する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    filters.py <profile> [--frames=<n>] [--amplitude=<r>] [--delta=<d>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help           ヘルプ表示
+    --frames=<n>        再生するフレーム数 [default: 20000]
+    --amplitude=<r>     揺らぎの幅(可変範囲に対する比率) [default: 0.02]
+    --delta=<d>         threshold フィルタの変化量閾値 [default: 0.01]
+"""
+from docopt import docopt
+
+from bench.batch_read import measure
+from bench.devices import FakeInputDevice, create_controller, jitter_events
+from gamepad.filters import build_filters
+
+# フィルタを設定するボタン名(各設定ファイルの filters セクションの記述例と同じ)
+FILTERED_BUTTONS = ('LEFT_STICK_X', 'RIGHT_STICK_Y')
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    events = jitter_events(profile, int(args['--frames']),
+        amplitude=float(args['--amplitude']))
+
+    delta = float(args['--delta'])
+    for label, use_filters in (('no filters', False), ('threshold', True)):
+        device = FakeInputDevice(events)
+        ctl = create_controller(profile, device)
+        ctl.filters = build_filters({btn: [{'type': 'threshold', 'delta': delta}]
+            for btn in FILTERED_BUTTONS}) if use_filters else {}
+        ctl.bind()
+        rate, calls = measure(ctl, device, False)
+        print('[bench] {:<10} events/sec: {:>10.0f}  func_map calls: {}'.format(label, rate, calls))
+    print('[bench] filtered buttons: {}'.format(', '.join(sorted(ctl.filters))))
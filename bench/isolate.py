@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+親プロセスにCPU負荷(GILを保持し続けるPythonスレッド)がある状態で、スティック操作が
+操作状態へ反映されるまでの遅延を、読み込み方式ごとに比較するベンチマーク。
+  thread    親プロセスのスレッドで update() を実行する(従来方式)
+  process   GameController(isolate=...) で子プロセスが読み込み、デコードする
+イベントデバイスは名前付きパイプで代用する。別プロセスの送信側がスティックを
+端から端へ倒すフレームを書き込み、操作状態が共有メモリへ書き込まれた時刻
+(published)から書き込み時刻を引いた値を遅延とする。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    isolate.py <profile> [--load=<n>] [--frames=<n>] [--rate=<hz>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --load=<n>      負荷をかける場合のスレッド数 [default: 2]
+    --frames=<n>    計測するフレーム数 [default: 300]
+    --rate=<hz>     フレームの送信レート(Hz) [default: 100]
+"""
+import functools
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from docopt import docopt
+from evdev import ecodes
+
+from bench.devices import (PROFILES, FakeInputDevice, FifoInputDevice, PipeInputDevice,
+    create_controller, fifo_controller)
+from gamepad.metrics import LatencyHistogram
+from gamepad.shm import StatePublisher, StateReader
+
+BLOCK_NAME = 'gamepad_bench_isolate'
+# 計測から除外する先頭フレーム数(子プロセスの起動待ちを含む)
+WARMUP = 20
+
+
+def sender_main(profile, path, name, frames, rate, results):
+    """
+    送信側プロセス本体。フレームを書き込み、操作状態へ反映されるまで待機する。
+    """
+    code, (low, high) = sorted(PROFILES[profile]['axes'].items())[0]
+    # 読み込み側がFIFOを開くまで待機する
+    fd = os.open(path, os.O_WRONLY)
+    reader = StateReader(name)
+    histogram = LatencyHistogram()
+    lost = 0
+    interval = 1.0 / rate
+    for index in range(WARMUP + frames):
+        now = time.time()
+        sec, usec = int(now), int(now * 1000000) % 1000000
+        value = high if index % 2 else low
+        os.write(fd, b''.join(struct.pack(PipeInputDevice.EVENT_FORMAT, sec, usec, *event)
+            for event in ((ecodes.EV_ABS, code, value), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0))))
+        sent = sec + usec / 1000000.0
+        deadline = now + 1.0
+        while True:
+            state = reader.read()
+            if state is not None and state.angle_time is not None and state.angle_time >= sent:
+                if index >= WARMUP:
+                    histogram.record(int((state.published - sent) * 1e9))
+                break
+            if time.time() > deadline and index >= WARMUP:
+                lost += 1
+                break
+            time.sleep(0.0002)
+        delay = now + interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    os.close(fd)
+    reader.close()
+    results.put((histogram.to_dict(), lost))
+
+
+def cpu_load(stop):
+    """
+    GILを保持し続けるPythonの計算ループ(前処理、推論などに相当)。
+    """
+    while not stop.is_set():
+        total = 0
+        for i in range(10000):
+            total += i * i
+
+
+def start_thread(profile, path, publisher):
+    """
+    親プロセスのスレッドで読み込むコントローラを起動する。
+    """
+    ctl = create_controller(profile, FifoInputDevice(path), shm=publisher, batch_read=True)
+    threading.Thread(target=ctl.update, daemon=True).start()
+    return ctl
+
+
+def start_process(profile, path, publisher):
+    """
+    子プロセスで読み込むコントローラを起動する。
+    """
+    ctl = create_controller(profile, FakeInputDevice([]), shm=publisher, batch_read=True,
+        isolate=functools.partial(fifo_controller, profile, path))
+    threading.Thread(target=ctl.update, daemon=True).start()
+    return ctl
+
+
+def measure(profile, mode, load, frames, rate):
+    """
+    1つの読み込み方式、負荷条件で遅延を計測する。
+    """
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'events')
+    os.mkfifo(path)
+    publisher = StatePublisher(BLOCK_NAME)
+    start = start_thread if mode == 'thread' else start_process
+    ctl = start(profile, path, publisher)
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=cpu_load, args=(stop,), daemon=True) for _ in range(load)]
+    for worker in workers:
+        worker.start()
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    sender = context.Process(target=sender_main,
+        args=(profile, path, publisher.name, frames, rate, results))
+    sender.start()
+    latency, lost = results.get()
+    sender.join()
+    stop.set()
+    for worker in workers:
+        worker.join()
+    if mode == 'process':
+        ctl.shutdown()
+    publisher.close()
+    os.unlink(path)
+    os.rmdir(directory)
+    print('[bench] {:<7} load threads: {}  frames: {}  lost: {}  '
+        'p50: {:7.1f} us  p99: {:8.1f} us  max: {:8.1f} us'.format(
+        mode, load, latency['count'], lost,
+        latency.get('p50', 0) * 1e6, latency.get('p99', 0) * 1e6, latency.get('max', 0) * 1e6))
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    frames, rate, load = int(args['--frames']), int(args['--rate']), int(args['--load'])
+    for mode in ('thread', 'process'):
+        for threads in (0, load):
+            measure(profile, mode, threads, frames, rate)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョイスティックキャラクタデバイス(js)バックエンドと evdev バックエンドの
+イベント1件あたりの処理時間(読み込み、変換、デコード、func_map 呼び出し)を比較するベンチマーク。
+どちらもパイプへ書き込んだイベントをカーネルからの読み込みの代わりに使用する。
+あわせて、設定ファイル上の全axis(スティック、トリガ、十字キー)の値の範囲を
+js 形式へ変換して読み込み、元の値へ戻るかどうか、debounce 対象のボタンを
+debounce の間隔より長く押し続けて離した場合に1回の押下として扱われるかどうかを確認する。
+戻らない値や押下回数の誤りがある場合は終了コード1で終了する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    jsdev.py <profile> [--frames=<n>] [--chunk=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    再生するフレーム数 [default: 20000]
+    --chunk=<n>     1回に書き込むイベント件数 [default: 64]
+"""
+import os
+import struct
+import sys
+import time
+
+from docopt import docopt
+from evdev import InputEvent, ecodes
+
+from bench.devices import PipeInputDevice, create_controller, synthetic_events
+from gamepad.jsdev import JoystickDevice, JS_FORMAT, JS_EVENT_AXIS, JS_EVENT_BUTTON, \
+    JS_AXIS_MAX, HID_BUTTON_SCAN_BASE, js_ranges
+
+
+def to_js(events, axis_map, button_map, ranges):
+    """
+    evdev 形式のイベント列を js_event のバイト列リストへ変換する(EV_SYNは除く)。
+    ranges は js_ranges() の戻り値({ABSコード: (最小値, 最大値)})。
+    """
+    records = []
+    for event in events:
+        msec = (event.sec * 1000 + event.usec // 1000) & 0xffffffff
+        if event.type == ecodes.EV_ABS:
+            min_value, max_value = ranges[event.code]
+            value = round((event.value - min_value) * 2.0 * JS_AXIS_MAX / (max_value - min_value)) - JS_AXIS_MAX
+            records.append(struct.pack(JS_FORMAT, msec, value, JS_EVENT_AXIS, axis_map.index(event.code)))
+        elif event.type == ecodes.EV_KEY:
+            records.append(struct.pack(JS_FORMAT, msec, event.value, JS_EVENT_BUTTON, button_map.index(event.code)))
+        elif event.type == ecodes.EV_MSC:
+            records.append(struct.pack(JS_FORMAT, msec, 1, JS_EVENT_BUTTON, event.value - HID_BUTTON_SCAN_BASE))
+    return records
+
+
+def mismatches(js, write_fd, ranges):
+    """
+    各axisの範囲内の値を js 形式へ変換して読み込み、元の値へ戻らない件数と確認した件数を返却する。
+    """
+    events = []
+    for code, (min_value, max_value) in sorted(ranges.items()):
+        step = max(1, (max_value - min_value) // 1000)
+        for value in range(min_value, max_value + 1, step):
+            events.append(InputEvent(0, 0, ecodes.EV_ABS, code, value))
+    records = to_js(events, js.axis_map, js.button_map, ranges)
+    count = 0
+    for index in range(0, len(records), 32):
+        os.write(write_fd, b''.join(records[index:index + 32]))
+        for event, restored in zip(events[index:index + 32], js.read()):
+            if (restored.code, restored.value) != (event.code, event.value):
+                count += 1
+    return count, len(events)
+
+
+def hold_presses(profile, axis_map, button_map):
+    """
+    debounce 対象のボタンを debounce の間隔の2倍押し続けてから離す操作を js 形式で書き込み、
+    func_map 上の関数が押下(0以外)で呼び出された回数をボタン名ごとに返却する。
+    """
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    js = JoystickDevice(fd=read_fd, name='pipe js device',
+        axis_map=axis_map, button_map=button_map)
+    ctl = create_controller(profile, js, batch_read=True)
+    entries = ctl.decoder.entries()
+    presses = {}
+    msec = 1000
+    for name, interval in sorted((ctl.config.get('debounce') or {}).items()):
+        button_id = ctl.decoder.ids[name]
+        keys = [key for key, entry in entries.items() if entry[0] == button_id]
+        event_type, key = keys[0]
+        number = button_map.index(key) if event_type == ecodes.EV_KEY \
+            else key - HID_BUTTON_SCAN_BASE
+        presses[name] = 0
+        def count(val, name=name):
+            if val:
+                presses[name] += 1
+        ctl.func_map[name] = count
+        hold = int(interval * 2000)
+        os.write(write_fd, struct.pack(JS_FORMAT, msec, 1, JS_EVENT_BUTTON, number)
+            + struct.pack(JS_FORMAT, msec + hold, 0, JS_EVENT_BUTTON, number))
+        msec += hold * 2
+    ctl.bind()
+    while True:
+        try:
+            events = js.read()
+        except BlockingIOError:
+            break
+        for event in events:
+            ctl.dispatch_event(event)
+    os.close(write_fd)
+    js.close()
+    return presses
+
+
+def run(ctl, write, items, chunk):
+    """
+    chunk 件ずつ書き込み、まとめ読みで全件処理した所要時間(秒)を返却する。
+    """
+    start = time.perf_counter()
+    for index in range(0, len(items), chunk):
+        write(items[index:index + chunk])
+        ctl.update_state_from_batch()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    chunk = int(args['--chunk'])
+    events = synthetic_events(profile, int(args['--frames']))
+    inputs = len([event for event in events if event.type != ecodes.EV_SYN])
+
+    # evdev バックエンド
+    device = PipeInputDevice()
+    ctl = create_controller(profile, device, batch_read=True)
+    evdev_sec = run(ctl, device.write, events, chunk)
+
+    # js バックエンド(axis は設定ファイル上の全ABSコード)
+    ranges = js_ranges(ctl.config)
+    axis_map = sorted(ranges)
+    button_map = sorted(key[1] for key in ctl.decoder.entries() if key[0] == ecodes.EV_KEY)
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    js = JoystickDevice(fd=read_fd, name='pipe js device',
+        axis_map=axis_map, button_map=button_map)
+    ctl = create_controller(profile, js, batch_read=True)
+    records = to_js(events, axis_map, button_map, ranges)
+    js_sec = run(ctl, lambda items: os.write(write_fd, b''.join(items)), records,
+        chunk * len(records) // len(events) or 1)
+
+    print('[bench] evdev backend: {:8.1f} ns/input event'.format(evdev_sec / inputs * 1e9))
+    print('[bench] js backend   : {:8.1f} ns/input event'.format(js_sec / inputs * 1e9))
+
+    # 値の範囲の復元
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    js = JoystickDevice(fd=read_fd, name='pipe js device',
+        axis_map=axis_map, button_map=button_map)
+    js.configure(ctl.config)
+    count, total = mismatches(js, write_fd, ranges)
+    print('[bench] ranges       : {} mismatches / {} values ({})'.format(count, total,
+        ', '.join('{}:{}..{}'.format(code, *ranges[code]) for code in axis_map)))
+
+    # debounce の間隔より長く押し続けたボタン
+    presses = hold_presses(profile, axis_map, button_map)
+    wrong = {name: count for name, count in presses.items() if count != 1}
+    print('[bench] hold         : {} of {} buttons pressed once{}'.format(
+        len(presses) - len(wrong), len(presses),
+        '' if not wrong else ' (presses: {})'.format(wrong)))
+    if count or wrong:
+        sys.exit(1)
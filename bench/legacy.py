@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+デコードテーブル導入前の read_loop() のイベント解釈処理、
+汎用デコードエンジン(gamepad.engine)導入前の各社サブクラスのデコードテーブル構築処理、および
+ボタンID導入前のボタン名(文字列)による振り分け処理(比較用)。
+verbose 出力を除き、当時の分岐・計算をそのまま残している。
+"""
+from evdev import ecodes
+
+from gamepad.decoder import Decoder, analog_normalizer, button_normalizer, dpad_normalizer, \
+    press_normalizer
+
+
+def logicool_decode(ctl, event):
+    """
+    logicool.JoystickController の従来のイベント解釈処理。
+
+    引数
+        ctl     logicool.JoystickController オブジェクト(設定値の参照用)
+        event   evdev.InputEvent オブジェクト
+    戻り値
+        btn     対象のボタン名
+        val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+    """
+    if event.type == ecodes.EV_ABS:
+        btn = ctl.ev_abs_code_map.get(event.code)
+        if btn in ctl.dpad_target:
+            val = event.value
+        else:
+            if ctl.analog_stick_zero_domain[0] < event.value and event.value < ctl.analog_stick_zero_domain[1]:
+                val = 0
+            else:
+                middle = (ctl.analog_stick_zero_domain[0] + ctl.analog_stick_zero_domain[1]) / 2.0
+                length = ctl.analog_stick_max_value - ctl.analog_stick_min_value
+                val = ((event.value - middle) * 1.0) / (length / 2.0)
+    elif event.type == ecodes.EV_KEY and ctl.is_xi:
+        btn = ctl.ev_key_code_map.get(event.code)
+        val = 0 if event.value == 0 else 1
+    elif event.type == ecodes.EV_MSC and (not ctl.is_xi):
+        btn = ctl.ev_msc_value_map.get(event.value)
+        val = 1
+    else:
+        btn = None
+        val = None
+    return btn, val
+
+
+def elecom_decode(ctl, event):
+    """
+    elecom.JoystickController の従来のイベント解釈処理。
+
+    引数
+        ctl     elecom.JoystickController オブジェクト(設定値の参照用)
+        event   evdev.InputEvent オブジェクト
+    戻り値
+        btn     対象のボタン名
+        val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+    """
+    btn = ctl.code_map.get(event.code)
+    if btn in ctl.button_map_target:
+        btn = ctl.btn_map.get(event.value)
+    if event.type == ecodes.EV_ABS:
+        if btn in ctl.dpad_target:
+            val = event.value * 1.0
+        else:
+            if event.value == ctl.analog_stick_zero_value:
+                val = 0.0
+            else:
+                val = ((event.value - ctl.analog_stick_zero_value) * 1.0) \
+                    / ((ctl.analog_stick_max_value - ctl.analog_stick_min_value) / 2.0)
+    elif event.type == ecodes.EV_MSC:
+        val = 1
+    else:
+        return None, None
+    return btn, val
+
+
+def logicool_compile(ctl):
+    """
+    logicool.JoystickController の従来のデコードテーブル構築処理。
+
+    引数
+        ctl     logicool.JoystickController オブジェクト(設定値の参照用)
+    戻り値
+        decoder gamepad.decoder.Decoder オブジェクト
+    """
+    decoder = Decoder()
+    zero_low, zero_high = ctl.analog_stick_zero_domain
+    analog = analog_normalizer(zero_low, zero_high,
+        (zero_low + zero_high) / 2.0,
+        ctl.analog_stick_max_value, ctl.analog_stick_min_value)
+    for code, btn in ctl.ev_abs_code_map.items():
+        normalizer = dpad_normalizer if btn in ctl.dpad_target else analog
+        decoder.add(ecodes.EV_ABS, code, btn, normalizer)
+    if ctl.is_xi:
+        for code, btn in ctl.ev_key_code_map.items():
+            decoder.add(ecodes.EV_KEY, code, btn, button_normalizer)
+    else:
+        for value, btn in ctl.ev_msc_value_map.items():
+            decoder.add_value_keyed(ecodes.EV_MSC, value, btn, press_normalizer)
+    return decoder
+
+
+def elecom_compile(ctl):
+    """
+    elecom.JoystickController の従来のデコードテーブル構築処理。
+
+    引数
+        ctl     elecom.JoystickController オブジェクト(設定値の参照用)
+    戻り値
+        decoder gamepad.decoder.Decoder オブジェクト
+    """
+    decoder = Decoder()
+    analog = analog_normalizer(
+        ctl.analog_stick_zero_value - 1, ctl.analog_stick_zero_value + 1,
+        ctl.analog_stick_zero_value,
+        ctl.analog_stick_max_value, ctl.analog_stick_min_value)
+    for code, btn in ctl.code_map.items():
+        if btn in ctl.button_map_target:
+            continue
+        normalizer = dpad_normalizer if btn in ctl.dpad_target else analog
+        decoder.add(ecodes.EV_ABS, code, btn, normalizer)
+    for value, btn in ctl.btn_map.items():
+        decoder.add_value_keyed(ecodes.EV_MSC, value, btn, press_normalizer)
+    return decoder
+
+
+class StringDispatcher:
+    """
+    ボタンID導入前の dispatch_event()/dispatch() 相当の処理。
+    ボタン名をキーとするデコードテーブル、状態辞書、func_map 辞書、入力フィルタ辞書を使用する。
+    """
+    def __init__(self, ctl):
+        """
+        コンストラクタ。コントローラのデコードテーブルからボタン名をキーとするテーブルを構築する。
+
+        引数
+            ctl     JoystickController オブジェクト
+        戻り値
+            なし
+        """
+        self.ctl = ctl
+        names = ctl.decoder.names
+        self.table = {key: (names[button_id], normalizer)
+            for key, (button_id, normalizer, _) in ctl.decoder.entries().items()}
+        self.value_keyed = ctl.decoder.value_keyed
+        self.state = {}
+
+    def decode(self, event):
+        event_type = event.type
+        entry = self.table.get((event_type,
+            event.value if event_type in self.value_keyed else event.code))
+        if entry is None:
+            btn, val = None, None
+        else:
+            btn, val = entry[0], entry[1](event.value)
+        if self.ctl.trace is not None:
+            self.ctl.trace.record(event, btn, val)
+        return btn, val
+
+    def dispatch_event(self, event):
+        btn, val = self.decode(event)
+        if btn is not None:
+            timestamp = event.sec + event.usec / 1000000.0
+            pipeline = self.ctl.filters.get(btn)
+            if pipeline is not None:
+                val = pipeline(val, timestamp)
+            if val is not None:
+                self.dispatch(btn, val, timestamp)
+        if self.ctl._flushable:
+            self.ctl._flush_filters(event.sec + event.usec / 1000000.0)
+
+    def dispatch(self, btn, val, timestamp=None):
+        if btn is None:
+            return
+        self.state[btn] = val
+        if self.ctl.ring is not None:
+            self.ctl.ring.push(timestamp, self.ctl.decoder.ids[btn] + self.ctl._ring_offset, val)
+        func = self.ctl.func_map.get(btn)
+        if func is not None:
+            self.ctl._event_time = timestamp
+            func(val)
+            self.ctl._publish()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ゲームパッドの台数を増やした場合のスループットとCPU時間を、
+デバイスごとにスレッドを用意する方式と ControllerManager(1スレッドで全デバイスを待ち受ける方式)
+とで比較するベンチマーク。各デバイスはパイプで代用し、F710(Xinput/DirectInput)と
+JC-U3912T を順番に割り当てる。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    manager.py [--pads=<list>] [--rounds=<n>] [--frames=<n>]
+
+Options:
+    -h --help           ヘルプ表示
+    --pads=<list>       計測するゲームパッド台数(カンマ区切り) [default: 1,2,4,8,16]
+    --rounds=<n>        各デバイスへの書き込み回数 [default: 200]
+    --frames=<n>        1回に書き込むフレーム数 [default: 16]
+"""
+import threading
+import time
+
+from docopt import docopt
+from evdev import InputEvent, ecodes
+
+from bench.devices import PROFILES, PipeInputDevice, create_controller, synthetic_events
+from gamepad.manager import ControllerManager
+
+PROFILE_CYCLE = ('f710_xi', 'f710_di', 'jc_u3912t')
+
+
+def chunk_events(profile, frames):
+    """
+    1回分の書き込みイベント列を生成する。末尾は完了判定用のボタン押下イベントとする。
+    """
+    events = synthetic_events(profile, frames, button_every=0)
+    btn_type, btn_code, btn_value = PROFILES[profile]['button']
+    last = events[-1]
+    events.append(InputEvent(last.sec, last.usec, btn_type, btn_code, btn_value))
+    return events
+
+
+def setup(pads, frames):
+    """
+    擬似デバイスとコントローラ、書き込みイベント列、ボタン押下件数のカウンタを生成する。
+    """
+    devices, controllers, chunks, counters = [], [], [], []
+    for index in range(pads):
+        profile = PROFILE_CYCLE[index % len(PROFILE_CYCLE)]
+        device = PipeInputDevice(name='{} {}'.format(profile, index))
+        ctl = create_controller(profile, device, batch_read=True)
+        counter = [0]
+        dispatch_event = ctl.dispatch_event
+        def counting(event, dispatch_event=dispatch_event, counter=counter):
+            if event.type == ecodes.EV_KEY or event.type == ecodes.EV_MSC:
+                counter[0] += 1
+            dispatch_event(event)
+        ctl.dispatch_event = counting
+        devices.append(device)
+        controllers.append(ctl)
+        chunks.append(chunk_events(profile, frames))
+        counters.append(counter)
+    return devices, controllers, chunks, counters
+
+
+def run_rounds(devices, chunks, counters, rounds, wait):
+    """
+    全デバイスへ1回分ずつ書き込み、全デバイスの処理完了を待つことを繰り返す。
+    戻り値は (経過秒数, CPU秒数)。
+    """
+    start, cpu = time.perf_counter(), time.process_time()
+    for round_index in range(1, rounds + 1):
+        for device, chunk in zip(devices, chunks):
+            device.write(chunk)
+        wait(lambda: all(counter[0] >= round_index for counter in counters))
+    return time.perf_counter() - start, time.process_time() - cpu
+
+
+def measure_threads(pads, rounds, frames):
+    """
+    デバイスごとにスレッドで update_state_from_batch() を実行する方式。
+    """
+    devices, controllers, chunks, counters = setup(pads, frames)
+    for ctl in controllers:
+        threading.Thread(target=ctl.update, daemon=True).start()
+    def wait(done):
+        while not done():
+            time.sleep(0.0002)
+    result = run_rounds(devices, chunks, counters, rounds, wait)
+    return result, sum(len(chunk) for chunk in chunks) * rounds
+
+
+def measure_manager(pads, rounds, frames):
+    """
+    ControllerManager で全デバイスを1スレッドで処理する方式。
+    """
+    devices, controllers, chunks, counters = setup(pads, frames)
+    manager = ControllerManager(controllers)
+    def wait(done):
+        while not done():
+            manager.poll()
+    result = run_rounds(devices, chunks, counters, rounds, wait)
+    return result, sum(len(chunk) for chunk in chunks) * rounds
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    rounds = int(args['--rounds'])
+    frames = int(args['--frames'])
+    for pads in [int(n) for n in args['--pads'].split(',')]:
+        for label, measure in (('threads', measure_threads), ('manager', measure_manager)):
+            (wall, cpu), count = measure(pads, rounds, frames)
+            print('[bench] pads: {:>3} {:<8} events/sec: {:>10.0f}  cpu: {:7.1f} us/event'.format(
+                pads, label, count / wall, cpu / count * 1e6))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+計測(metrics)の有無によるイベント1件あたりの処理時間(デコード、入力フィルタ、
+func_map 呼び出し)を比較するベンチマーク。
+計測なしの場合は計測処理を経由しないことも確認する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    metrics.py <profile> [--frames=<n>] [--repeat=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    処理するフレーム数 [default: 20000]
+    --repeat=<n>    計測の繰り返し回数 [default: 5]
+"""
+import json
+import time
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+from gamepad import GameController
+
+
+def per_event(ctl, events, repeat):
+    """
+    最速の計測結果からイベント1件あたりの処理時間(ナノ秒)を返却する。
+    """
+    best = None
+    for _ in range(repeat):
+        dispatch_event = ctl.dispatch_event
+        start = time.perf_counter()
+        for event in events:
+            dispatch_event(event)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(events) * 1e9
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    repeat = int(args['--repeat'])
+    events = synthetic_events(profile, int(args['--frames']))
+
+    disabled = create_controller(profile, FakeInputDevice([]))
+    enabled = create_controller(profile, FakeInputDevice([]), metrics=True)
+    # 計測なしの場合は基底クラスの dispatch_event() をそのまま使用する
+    if disabled.dispatch_event.__func__ is not GameController.dispatch_event:
+        raise AssertionError('dispatch_event is wrapped while metrics is disabled')
+
+    # 交互に計測し、実行順による偏りを抑える
+    off_ns = min(per_event(disabled, events, repeat), per_event(disabled, events, repeat))
+    on_ns = min(per_event(enabled, events, repeat), per_event(enabled, events, repeat))
+    print('[bench] metrics off: {:8.1f} ns/event'.format(off_ns))
+    print('[bench] metrics on : {:8.1f} ns/event ({:+.1f}%)'.format(on_ns, (on_ns / off_ns - 1) * 100))
+    summary = enabled.metrics.to_dict()
+    print('[bench] events: {}'.format(json.dumps(summary['events'], sort_keys=True)))
+    print('[bench] unmapped: {} filtered: {}'.format(summary['unmapped'], summary['filtered']))
+    print('[bench] decode_to_dispatch: {}'.format(json.dumps(summary['decode_to_dispatch'], sort_keys=True)))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偽のデバイスディレクトリ上でデバイスの切断・再接続を模擬し、
+再接続に要した時間を計測するベンチマーク。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    reconnect.py [--devices=<n>] [--dropout=<sec>] [--repeat=<n>]
+
+Options:
+    -h --help           ヘルプ表示
+    --devices=<n>       ディレクトリ上の無関係なデバイス数 [default: 20]
+    --dropout=<sec>     切断から再出現までの秒数 [default: 0.2]
+    --repeat=<n>        繰り返し回数 [default: 5]
+"""
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from docopt import docopt
+
+from gamepad.reconnect import Reconnector
+
+SEARCH_TERM = 'smart jc-u3912t'
+
+
+def opener(path):
+    """
+    'デバイス名|phys' を記述したファイルをデバイスとして開く。
+    """
+    with open(path) as f:
+        name, phys = f.read().split('|')
+    return SimpleNamespace(path=path, name=name, phys=phys, uniq='')
+
+
+def replug(path, delay):
+    """
+    delay 秒後にデバイスファイルを再作成する。
+    """
+    time.sleep(delay)
+    with open(path, 'w') as f:
+        f.write('Smart JC-U3912T|usb-0000:01:00.0-1.2/input0')
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    dropout = float(args['--dropout'])
+    input_dir = tempfile.mkdtemp()
+    for index in range(int(args['--devices'])):
+        with open(os.path.join(input_dir, 'event{}'.format(index)), 'w') as f:
+            f.write('Other Device {}|usb-other-{}'.format(index, index))
+    target = os.path.join(input_dir, 'event99')
+    replug(target, 0)
+
+    reconnector = Reconnector(SEARCH_TERM, input_dir=input_dir, opener=opener)
+    reconnector.remember(opener(target))
+    for _ in range(int(args['--repeat'])):
+        os.remove(target)
+        thread = threading.Thread(target=replug, args=(target, dropout))
+        thread.start()
+        reconnector.reconnect()
+        thread.join()
+    overhead = [latency - dropout for latency in reconnector.latencies]
+    print('[bench] reconnects: {}  latency after replug avg: {:.1f} ms  max: {:.1f} ms'.format(
+        reconnector.count, sum(overhead) / len(overhead) * 1e3, max(overhead) * 1e3))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+記録ファイルを再生し、コントローラのデコード処理性能とイベント発生から
+func_map 呼び出しまでの遅延を計測するベンチマーク。
+記録ファイルを指定しない場合は合成イベント列から記録ファイルを作成して使用する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    replay.py <profile> [<path>] [--frames=<n>] [--batch]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    合成するフレーム数 [default: 2000]
+    --batch         まとめ読みモードで計測
+"""
+import os
+import tempfile
+import time
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+from gamepad.batch import coalesce_events
+from gamepad.replay import ReplayDevice, write_events
+
+
+def throughput(ctl, device, batch_read):
+    """
+    可能な限り高速に再生し、1秒あたりの処理イベント数を返却する。
+    """
+    device.rewind()
+    start = time.perf_counter()
+    while device.remaining > 0:
+        if batch_read:
+            ctl.update_state_from_batch()
+        else:
+            ctl.update_state_from_loop()
+    return device.count / (time.perf_counter() - start)
+
+
+def latencies(ctl, device, batch_read):
+    """
+    記録時の間隔で再生し、各イベントの発生予定時刻から func_map 呼び出し完了までの
+    遅延(秒)のリストを返却する。
+    """
+    device.rewind()
+    device.realtime = True
+    results = []
+    while device.remaining > 0:
+        events = list(device.read())
+        if batch_read:
+            events = coalesce_events(events)
+        for event in events:
+            ctl.dispatch_event(event)
+            origin_wall, origin_ts = device._origin
+            scheduled = origin_wall + (event.timestamp() - origin_ts)
+            results.append(time.monotonic() - scheduled)
+    device.realtime = False
+    return results
+
+
+def percentile(values, ratio):
+    """
+    ソート済みリストから指定割合の値を返却する。
+    """
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    batch_read = args['--batch']
+
+    ctl = create_controller(profile, FakeInputDevice([]), batch_read=batch_read)
+    path = args['<path>']
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'synthetic.gpev')
+        write_events(path, synthetic_events(profile, int(args['--frames'])))
+    device = ReplayDevice(path)
+    ctl.device = device
+
+    print('[bench] {} events/sec (as fast as possible)'.format(
+        int(throughput(ctl, device, batch_read))))
+    values = sorted(latencies(ctl, device, batch_read))
+    print('[bench] latency p50: {:.1f} us  p99: {:.1f} us  max: {:.1f} us'.format(
+        percentile(values, 0.5) * 1e6, percentile(values, 0.99) * 1e6, values[-1] * 1e6))
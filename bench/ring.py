@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+デコード済みイベントの受け渡し方式によるメモリ確保量とGC発生回数を比較するベンチマーク。
+  tuples  バッチごとに (タイムスタンプ, ボタン名, 値) タプルのリストを生成して受け渡す
+  ring    EventRing へ書き込み、事前確保した配列へ read_into() でまとめてコピーする
+tracemalloc で計測開始時点からの増加量(current)と一時的な最大増加量(peak)を、
+gc.callbacks で世代0のGC発生回数を計測する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    ring.py <profile> [--frames=<n>] [--batch=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --frames=<n>    処理するフレーム数 [default: 20000]
+    --batch=<n>     読み出し1回あたりのイベント件数 [default: 2048]
+"""
+import gc
+import tracemalloc
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+
+
+def run_tuples(ctl, events, batch):
+    """
+    バッチごとにタプルのリストを生成して受け渡す方式。
+    """
+    decode = ctl.decode
+    for offset in range(0, len(events), batch):
+        records = []
+        for index in range(offset, min(offset + batch, len(events))):
+            event = events[index]
+            btn, val = decode(event)
+            if btn is not None:
+                records.append((event.sec + event.usec / 1000000.0, btn, val))
+        for timestamp, btn, val in records:
+            ctl.dispatch(btn, val, timestamp)
+
+
+def run_ring(ctl, events, batch, reader, buffers):
+    """
+    リングバッファへ書き込み、事前確保した配列へまとめてコピーする方式。
+    """
+    timestamps, buttons, values = buffers
+    dispatch_event = ctl.dispatch_event
+    for offset in range(0, len(events), batch):
+        for index in range(offset, min(offset + batch, len(events))):
+            dispatch_event(events[index])
+        while reader.read_into(timestamps, buttons, values):
+            pass
+
+
+def measure(run):
+    """
+    1回実行して状態を安定させた後、2回目の実行中のメモリ確保量とGC発生回数を計測する。
+    戻り値は (current増加バイト数, peak増加バイト数, 世代0のGC回数)。
+    """
+    run()
+    collections = [0]
+    def on_gc(phase, info):
+        if phase == 'start' and info['generation'] == 0:
+            collections[0] += 1
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    gc.callbacks.append(on_gc)
+    try:
+        run()
+    finally:
+        gc.callbacks.remove(on_gc)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current - base, peak - base, collections[0]
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    batch = int(args['--batch'])
+    events = synthetic_events(profile, int(args['--frames']))
+
+    ctl = create_controller(profile, FakeInputDevice([]))
+    tuples = measure(lambda: run_tuples(ctl, events, batch))
+
+    ctl = create_controller(profile, FakeInputDevice([]), ring=batch)
+    reader = ctl.ring.reader()
+    buffers = reader.allocate()
+    ring = measure(lambda: run_ring(ctl, events, batch, reader, buffers))
+
+    for label, (current, peak, collections) in (('tuples', tuples), ('ring', ring)):
+        print('[bench] {:<6} events: {}  current: {:>+8d} B  peak: {:>8d} B  gen0 GC: {}'.format(
+            label, len(events), current, peak, collections))
+    print('[bench] ring dropped: {}'.format(reader.dropped))
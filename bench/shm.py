@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共有メモリ(gamepad.shm)による操作状態の公開を計測するベンチマーク。
+  rate      publish() 単体、および共有メモリへの公開あり/なしのイベント処理の持続処理件数
+  latency   指定レートでイベントを処理し、別プロセスの StateReader が更新を検知するまでの遅延
+  stress    全速で書き込みながら別プロセスで条件なしに読み出し続け、不整合な値(angle != throttle)が
+            ないこと、書き込み中の読み出し(読み直しが発生した読み出し)が一定件数以上あることを確認
+不整合な値を読み出した場合、書き込み中の読み出しが --min-overlaps 件に満たない場合は終了コード1で終了する。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    shm.py <profile> [--frames=<n>] [--rate=<hz>] [--seconds=<sec>] [--min-overlaps=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help           ヘルプ表示
+    --frames=<n>        rate で処理するフレーム数 [default: 20000]
+    --rate=<hz>         latency でのフレームレート(Hz) [default: 1000]
+    --seconds=<sec>     latency, stress の計測秒数 [default: 2]
+    --min-overlaps=<n>  stress で必要な書き込み中の読み出し件数 [default: 10]
+"""
+import multiprocessing
+import sys
+import time
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+from gamepad.metrics import LatencyHistogram
+from gamepad.shm import StatePublisher, StateReader
+from gamepad.state import ControlSnapshot
+
+BLOCK_NAME = 'gamepad_bench_{}'
+
+
+def reader_main(name, mode, ready, stop, results):
+    """
+    読み出し側プロセス本体。シーケンス番号の変化を監視し、更新ごとに読み出す。
+    stress の場合はシーケンス番号を見ずに読み出し続ける。
+    """
+    reader = StateReader(name)
+    if mode == 'stress':
+        ready.set()
+        results.put(stress_reads(reader, stop))
+        reader.close()
+        return
+    histogram = LatencyHistogram()
+    reads = updates = skipped = 0
+    last = reader.seq
+    ready.set()
+    while not stop.is_set():
+        seq = reader.seq
+        if seq == last or seq & 1:
+            continue
+        state = reader.read()
+        if state is None:
+            continue
+        reads += 1
+        histogram.record(int((time.time() - state.published) * 1e9))
+        # シーケンス番号は書き込みごとに2増加する(読み出し前に上書きされた分を skipped とする)
+        updates += 1
+        skipped += max(0, (state.seq - last) // 2 - 1)
+        last = state.seq
+    results.put({'reads': reads, 'updates': updates, 'skipped': skipped,
+        'conflicts': reader.conflicts, 'latency': histogram.to_dict()})
+    reader.close()
+
+
+def stress_reads(reader, stop):
+    """
+    シーケンス番号を見ずに read() を呼び出し続け、読み出し件数、書き込みと重なった
+    (読み直しが発生した)読み出し件数、読み直しの上限に達した件数、不整合な値の件数を返却する。
+    """
+    reads = overlapped = failed = torn = 0
+    while not stop.is_set():
+        conflicts = reader.conflicts
+        state = reader.read()
+        reads += 1
+        if reader.conflicts != conflicts:
+            overlapped += 1
+            if reader.conflicts - conflicts >= reader.retries:
+                failed += 1
+        if state is not None and state.angle != state.throttle:
+            torn += 1
+    return {'reads': reads, 'overlapped': overlapped, 'failed': failed, 'torn': torn,
+        'conflicts': reader.conflicts}
+
+
+def start_reader(name, mode):
+    """
+    読み出し側プロセスを起動し、監視開始まで待機する。
+    """
+    context = multiprocessing.get_context('spawn')
+    ready, stop, results = context.Event(), context.Event(), context.Queue()
+    process = context.Process(target=reader_main, args=(name, mode, ready, stop, results))
+    process.start()
+    ready.wait()
+    return process, stop, results
+
+
+def finish_reader(process, stop, results):
+    """
+    読み出し側プロセスを停止し、結果を返却する。
+    """
+    stop.set()
+    result = results.get()
+    process.join()
+    return result
+
+
+def bench_rate(profile, events):
+    """
+    publish() 単体、共有メモリへの公開あり/なしのイベント処理の持続処理件数を計測する。
+    """
+    publisher = StatePublisher(BLOCK_NAME.format('rate'))
+    snapshot = ControlSnapshot(0.5, -0.5, 'user', False, time.time(), time.time())
+    count = len(events)
+    start = time.perf_counter()
+    for _ in range(count):
+        publisher.publish(snapshot)
+    elapsed = time.perf_counter() - start
+    print('[bench] publish only     : {:>10.0f} updates/sec  ({:.2f} us/update)'.format(
+        count / elapsed, elapsed / count * 1e6))
+
+    for label, shm in (('dispatch        ', None), ('dispatch + shm  ', publisher)):
+        ctl = create_controller(profile, FakeInputDevice([]), shm=shm)
+        dispatch_event = ctl.dispatch_event
+        start = time.perf_counter()
+        for event in events:
+            dispatch_event(event)
+        elapsed = time.perf_counter() - start
+        print('[bench] {}: {:>10.0f} events/sec   ({:.2f} us/event)'.format(
+            label, count / elapsed, elapsed / count * 1e6))
+    publisher.close()
+
+
+def bench_latency(profile, rate, seconds):
+    """
+    指定レートでイベントを処理し、読み出し側プロセスが更新を検知するまでの遅延を計測する。
+    """
+    publisher = StatePublisher(BLOCK_NAME.format('latency'))
+    ctl = create_controller(profile, FakeInputDevice([]), shm=publisher)
+    events = synthetic_events(profile, int(rate * seconds), rate_hz=rate, button_every=0)
+    process, stop, results = start_reader(publisher.name, 'latency')
+    dispatch_event = ctl.dispatch_event
+    # EV_SYN ごとに1フレーム分待機する(読み出し側へCPUを譲るため sleep で待機)
+    interval = 1.0 / rate
+    deadline = time.perf_counter()
+    for event in events:
+        dispatch_event(event)
+        if event.type == 0:
+            deadline += interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    result = finish_reader(process, stop, results)
+    publisher.close()
+    latency = result['latency']
+    print('[bench] latency @ {} Hz   : updates seen: {}  skipped: {}  '
+        'p50: {:.1f} us  p99: {:.1f} us  max: {:.1f} us'.format(
+        rate, result['updates'], result['skipped'],
+        latency['p50'] * 1e6, latency['p99'] * 1e6, latency['max'] * 1e6))
+
+
+def bench_stress(seconds, min_overlaps):
+    """
+    全速で書き込みながら読み出し、不整合な値を読み出さないこと、
+    書き込み中の読み出しが min_overlaps 件以上発生したことを確認する。
+    """
+    publisher = StatePublisher(BLOCK_NAME.format('stress'))
+    process, stop, results = start_reader(publisher.name, 'stress')
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        value = float(count)
+        publisher.publish(ControlSnapshot(value, value, 'user', False, None, None))
+        count += 1
+    result = finish_reader(process, stop, results)
+    publisher.close()
+    print('[bench] stress           : writes: {}  reads: {}  overlapped: {}  retries: {}  '
+        'gave up: {}  torn: {}'.format(count, result['reads'], result['overlapped'],
+        result['conflicts'], result['failed'], result['torn']))
+    if result['overlapped'] < min_overlaps:
+        print('[bench] stress           : only {} reads overlapped a write (< {})'.format(
+            result['overlapped'], min_overlaps))
+        return False
+    return result['torn'] == 0
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    seconds = float(args['--seconds'])
+    bench_rate(profile, synthetic_events(profile, int(args['--frames'])))
+    bench_latency(profile, int(args['--rate']), seconds)
+    if not bench_stress(seconds, int(args['--min-overlaps'])):
+        sys.exit(1)
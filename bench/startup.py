@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+コントローラ起動処理の所要時間を計測するベンチマーク。
+  * デバイス走査: 検索対象文字列ごとに走査する従来方式と1回の走査で分類する方式
+  * 設定ファイル読み込み: 初回(解析あり)と2回目以降(キャッシュ)
+  * コンストラクタ全体(擬似デバイス使用)
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    startup.py [--devices=<n>] [--repeat=<n>]
+
+Options:
+    -h --help       ヘルプ表示
+    --devices=<n>   擬似的に接続するデバイス数 [default: 20]
+    --repeat=<n>    繰り返し回数 [default: 100]
+"""
+import time
+from types import SimpleNamespace
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, PROFILES, create_controller
+from gamepad import config
+from gamepad.discovery import classify_devices
+
+XI_SEARCH_TERM = 'logitech gamepad f710'
+DI_SEARCH_TERM = 'logicool logicool cordless rumblepad 2'
+
+
+def elapsed(func, repeat):
+    """
+    func を repeat 回実行した1回あたりの平均時間(ミリ秒)を返却する。
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    repeat = int(args['--repeat'])
+    paths = ['/dev/input/event{}'.format(index) for index in range(int(args['--devices']))]
+    opened = [0]
+    def opener(path):
+        opened[0] += 1
+        name = 'Logicool Logicool Cordless RumblePad 2' if path == paths[-1] else 'Other'
+        return SimpleNamespace(path=path, name=name, close=lambda: None)
+
+    # 検索対象文字列ごとに走査(Xinputで見つからなければDirectInputで再走査)
+    def per_term():
+        for term in (XI_SEARCH_TERM, DI_SEARCH_TERM):
+            if classify_devices([term], paths, opener)[term]:
+                break
+    opened[0] = 0
+    per_term_ms = elapsed(per_term, repeat)
+    per_term_opens = opened[0] // repeat
+    opened[0] = 0
+    single_ms = elapsed(lambda: classify_devices([XI_SEARCH_TERM, DI_SEARCH_TERM], paths, opener), repeat)
+    single_opens = opened[0] // repeat
+    print('[bench] enumeration per term : {:7.3f} ms ({} opens)'.format(per_term_ms, per_term_opens))
+    print('[bench] enumeration one pass : {:7.3f} ms ({} opens)'.format(single_ms, single_opens))
+
+    for profile in sorted(PROFILES):
+        path = config.resource_path(PROFILES[profile]['vendor'], PROFILES[profile]['config'])
+        def cold():
+            config._load.cache_clear()
+            config.load_config(path)
+        print('[bench] {:<10} config cold: {:7.3f} ms  warm: {:7.3f} ms  constructor: {:7.3f} ms'.format(
+            profile, elapsed(cold, repeat), elapsed(lambda: config.load_config(path), repeat),
+            elapsed(lambda: create_controller(profile, FakeInputDevice([])), repeat)))
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入力処理の回帰ベンチマーク。
+F710(Xinput/DirectInput)と JC-U3912T の JoystickController を合成イベント列で駆動し、
+以下を計測してベースラインファイル(JSON)と比較する。
+  events_per_sec          擬似 InputDevice(FakeInputDevice)から1件ずつ読み込んだ場合の処理件数/秒
+  batch_events_per_sec    同じくまとめ読み(batch_read=True)の場合の処理件数/秒
+  pipe_events_per_sec     evdev と同じ C 実装で読み込む PipeInputDevice 経由の処理件数/秒
+  decode_p50/p90/p99_ns   イベント1件のデコード時間のパーセンタイル(計時処理の時間を除く)
+  dispatch_ns             デコード済みの値1件を状態へ反映し func_map を呼び出す時間
+  peak_bytes_per_event    処理中のメモリ確保量の最大増加量(tracemalloc)のイベント1件あたりの値
+  retained_bytes_per_event 処理後に残ったメモリ確保量のイベント1件あたりの値
+  gc_per_kevent           イベント1000件あたりの世代0のGC発生回数
+  paced_lag_p50/p99_us    --paced 指定時のみ、--rate のフレーム頻度でパイプへ書き込んだイベントの
+                          書き込みからデコードまでの遅延(Metrics の kernel_to_decode)
+オプション --save を指定すると --runs 回の計測で項目ごとに最も悪い値をベースラインとして保存する。
+指定しない場合はベースラインと比較し、許容範囲(相対値 --tolerance かつ項目ごとの絶対値)を
+超えて悪化した機種を --retries 回まで計測し直し、毎回悪化した項目があれば終了コード1で終了する。
+ベースラインは計測したホストに依存するため、同じホストで保存したものと比較すること。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    suite.py [<profile>...] [--frames=<n>] [--rate=<hz>] [--repeat=<n>] [--paced=<sec>]
+             [--baseline=<path>] [--save] [--runs=<n>] [--tolerance=<ratio>] [--retries=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか(デフォルト→全て)
+
+Options:
+    -h --help             ヘルプ表示
+    --frames=<n>          合成するフレーム数 [default: 20000]
+    --rate=<hz>           合成イベント列のフレーム頻度 [default: 500]
+    --repeat=<n>          計測の繰り返し回数(中央値を採用) [default: 7]
+    --paced=<sec>         実時間でパイプへ書き込む計測の秒数(0の場合は計測しない) [default: 0]
+    --baseline=<path>     ベースラインファイルパス [default: bench/baseline.json]
+    --save                計測結果をベースラインとして保存する
+    --runs=<n>            ベースライン保存時の計測回数(項目ごとに最も悪い値を保存) [default: 3]
+    --tolerance=<ratio>   悪化とみなす相対値 [default: 0.25]
+    --retries=<n>         悪化した機種を計測し直す回数 [default: 2]
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+from docopt import docopt
+from evdev import InputEvent
+
+from bench.devices import PROFILES, FakeInputDevice, PipeInputDevice, create_controller, \
+    synthetic_events
+from gamepad.metrics import LatencyHistogram
+
+# {項目名: (大きいほど良い場合True, 悪化とみなす最小の絶対値)}
+METRICS = {
+    'events_per_sec': (True, 0),
+    'batch_events_per_sec': (True, 0),
+    'pipe_events_per_sec': (True, 0),
+    'decode_p50_ns': (False, 100),
+    'decode_p90_ns': (False, 100),
+    'decode_p99_ns': (False, 200),
+    'dispatch_ns': (False, 50),
+    'peak_bytes_per_event': (False, 16),
+    'retained_bytes_per_event': (False, 16),
+    'gc_per_kevent': (False, 0.5),
+    'paced_lag_p50_us': (False, 1000),
+    'paced_lag_p99_us': (False, 2000),
+}
+
+# パイプの容量を超えないよう1回に書き込むイベント件数
+PIPE_CHUNK = 1024
+
+
+def median_of(repeat, run, min_time=0.05):
+    """
+    1回の計測が min_time 秒以上となるよう run() の呼び出し回数を決めて repeat 回計測し、
+    run() 1回あたりの処理時間(秒)の中央値を返却する。
+    最短値は一時的に速い計測に引きずられるため、ベースラインとの比較には中央値を使用する。
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        samples.append((time.perf_counter() - start) / loops)
+    return statistics.median(samples)
+
+
+def throughput(profile, events, repeat, batch_read):
+    """
+    FakeInputDevice から全イベントを処理した場合の処理件数/秒を返却する。
+    """
+    device = FakeInputDevice(events)
+    ctl = create_controller(profile, device, batch_read=batch_read)
+    update = ctl.update_state_from_batch if batch_read else ctl.update_state_from_loop
+    def run():
+        device.rewind()
+        while device.remaining > 0:
+            update()
+    return len(events) / median_of(repeat, run)
+
+
+def pipe_throughput(profile, events, repeat):
+    """
+    PipeInputDevice 経由で全イベントを1件ずつ処理した場合の処理件数/秒(中央値)を返却する。
+    書き込み時間を含まないよう、書き込みは計測区間の外で行う。
+    """
+    device = PipeInputDevice()
+    ctl = create_controller(profile, device)
+    try:
+        samples = []
+        for _ in range(repeat):
+            elapsed = 0.0
+            for offset in range(0, len(events), PIPE_CHUNK):
+                chunk = events[offset:offset + PIPE_CHUNK]
+                device.write(chunk)
+                start = time.perf_counter()
+                for _ in range(len(chunk)):
+                    ctl.update_state_from_loop()
+                elapsed += time.perf_counter() - start
+            samples.append(elapsed)
+    finally:
+        device.close()
+    return len(events) / statistics.median(samples)
+
+
+def timer_overhead(samples=10000):
+    """
+    perf_counter_ns() を2回呼び出す時間(ナノ秒、中央値)を返却する。
+    """
+    clock = time.perf_counter_ns
+    overheads = []
+    for _ in range(samples):
+        start = clock()
+        overheads.append(clock() - start)
+    overheads.sort()
+    return overheads[len(overheads) // 2]
+
+
+def decode_latency(ctl, events, repeat):
+    """
+    イベント1件ごとのデコード時間をヒストグラムへ記録し、p50/p90/p99(ナノ秒)を返却する。
+    繰り返しごとにヒストグラムを作成し、各パーセンタイルの中央値を採用する。
+    """
+    clock = time.perf_counter_ns
+    decode_id = ctl._decoder.decode_id
+    overhead = timer_overhead()
+    samples = {}
+    for _ in range(repeat):
+        histogram = LatencyHistogram()
+        for event in events:
+            start = clock()
+            decode_id(event)
+            histogram.record(clock() - start - overhead)
+        for p in (50, 90, 99):
+            name = 'decode_p{}_ns'.format(p)
+            samples.setdefault(name, []).append(histogram.percentile(p) * 1e9)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def dispatch_cost(ctl, events, repeat):
+    """
+    デコード済みの値1件あたりの状態反映、func_map 呼び出しの時間(ナノ秒)を返却する。
+    """
+    decoded = []
+    for event in events:
+        button_id, val = ctl._decoder.decode_id(event)
+        if button_id is not None:
+            decoded.append((button_id, val, event.sec + event.usec / 1000000.0))
+    dispatch_id = ctl._dispatch_id
+    def run():
+        for button_id, val, timestamp in decoded:
+            dispatch_id(button_id, val, timestamp)
+    return median_of(repeat, run) / len(decoded) * 1e9
+
+
+def memory(profile, events):
+    """
+    全イベント処理中のメモリ確保量と世代0のGC回数をイベント1件あたりの値で返却する。
+    1回目の処理で状態を安定させた後、2回目の処理を計測する。
+    """
+    device = FakeInputDevice(events)
+    ctl = create_controller(profile, device)
+    def run():
+        device.rewind()
+        while device.remaining > 0:
+            ctl.update_state_from_loop()
+    run()
+    collections = [0]
+    def on_gc(phase, info):
+        if phase == 'start' and info['generation'] == 0:
+            collections[0] += 1
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    gc.callbacks.append(on_gc)
+    try:
+        run()
+    finally:
+        gc.callbacks.remove(on_gc)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'peak_bytes_per_event': (peak - base) / float(len(events)),
+        'retained_bytes_per_event': max(0, current - base) / float(len(events)),
+        'gc_per_kevent': collections[0] * 1000.0 / len(events),
+    }
+
+
+def paced_lag(profile, frames, rate, seconds):
+    """
+    rate のフレーム頻度で書き込み時刻をタイムスタンプとしたイベントをパイプへ書き込み、
+    別スレッドで待ち受けるコントローラの書き込みからデコードまでの遅延(マイクロ秒)を返却する。
+    """
+    device = PipeInputDevice()
+    ctl = create_controller(profile, device, batch_read=True, metrics=True)
+    template = synthetic_events(profile, min(frames, int(rate * seconds)), rate)
+    # フレーム(EV_SYN 区切り)単位に分割
+    batches, batch = [], []
+    for event in template:
+        batch.append(event)
+        if event.type == 0:
+            batches.append(batch)
+            batch = []
+    stop = threading.Event()
+    def reader():
+        while not stop.is_set():
+            for event in ctl.read_events():
+                ctl.dispatch_event(event)
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    for batch in batches:
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sec, usec = divmod(time.time_ns() // 1000, 1000000)
+        device.write([InputEvent(sec, usec, event.type, event.code, event.value) for event in batch])
+    time.sleep(0.1)
+    stop.set()
+    # 待機中の読み込みを終わらせる
+    device.write(batches[-1])
+    thread.join()
+    device.close()
+    histogram = ctl.metrics.kernel_to_decode
+    return {'paced_lag_p50_us': histogram.percentile(50) * 1e6,
+        'paced_lag_p99_us': histogram.percentile(99) * 1e6}
+
+
+def run_profile(profile, frames, rate, repeat, paced):
+    """
+    1機種分の全項目を計測する。
+    """
+    events = synthetic_events(profile, frames, rate)
+    result = {
+        'events_per_sec': throughput(profile, events, repeat, False),
+        'batch_events_per_sec': throughput(profile, events, repeat, True),
+        'pipe_events_per_sec': pipe_throughput(profile, events, repeat),
+    }
+    ctl = create_controller(profile, FakeInputDevice([]))
+    result.update(decode_latency(ctl, events, repeat))
+    result['dispatch_ns'] = dispatch_cost(ctl, events, repeat)
+    result.update(memory(profile, events))
+    if paced > 0:
+        result.update(paced_lag(profile, frames, rate, paced))
+    return result
+
+
+def is_worse(name, value, expected, tolerance):
+    """
+    計測値がベースラインより許容範囲を超えて悪化しているかどうかを返却する。
+    """
+    higher_is_better, slack = METRICS[name]
+    if higher_is_better:
+        return value < expected * (1 - tolerance) and expected - value > slack
+    return value > expected * (1 + tolerance) and value - expected > slack
+
+
+def envelope(runs):
+    """
+    複数回の計測結果から項目ごとに最も悪い値を求める(ベースラインとして保存する値)。
+    """
+    worst = {}
+    for results in runs:
+        for profile, result in results.items():
+            target = worst.setdefault(profile, {})
+            for name, value in result.items():
+                higher_is_better, _ = METRICS[name]
+                if name not in target:
+                    target[name] = value
+                elif higher_is_better:
+                    target[name] = min(target[name], value)
+                else:
+                    target[name] = max(target[name], value)
+    return worst
+
+
+def compare(results, baseline, tolerance):
+    """
+    ベースラインと比較し、悪化した (機種, 項目名) のリストを返却する。
+    """
+    regressions = []
+    for profile, result in sorted(results.items()):
+        base = baseline.get(profile)
+        if base is None:
+            print('[bench] {}: no baseline'.format(profile))
+            continue
+        for name, value in sorted(result.items()):
+            if name not in base:
+                continue
+            expected = base[name]
+            worse = is_worse(name, value, expected, tolerance)
+            change = (value - expected) / expected if expected else 0.0
+            print('[bench] {:<10} {:<26} {:>14.1f} (baseline {:>14.1f}, {:+7.1%}) {}'.format(
+                profile, name, value, expected, change, 'REGRESSION' if worse else 'ok'))
+            if worse:
+                regressions.append((profile, name))
+    return regressions
+
+
+def host():
+    """
+    ベースラインを保存したホストの情報を返却する。
+    """
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+        'node': platform.node(), 'cpus': os.cpu_count()}
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profiles = args['<profile>'] or sorted(PROFILES)
+    settings = {'frames': int(args['--frames']), 'rate': int(args['--rate'])}
+    repeat = int(args['--repeat'])
+    paced = float(args['--paced'])
+    path = args['--baseline']
+
+    def measure(targets):
+        results = {}
+        for profile in targets:
+            results[profile] = run_profile(profile, settings['frames'], settings['rate'], repeat, paced)
+            for name, value in sorted(results[profile].items()):
+                print('[bench] {:<10} {:<26} {:>14.1f}'.format(profile, name, value))
+        return results
+
+    if args['--save']:
+        # 計測環境の揺らぎを含めるため、複数回の計測で最も悪い値を保存する
+        results = envelope([measure(profiles) for _ in range(int(args['--runs']))])
+        saved = {'host': host(), 'settings': settings, 'profiles': {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                saved['profiles'] = json.load(f).get('profiles', {})
+        saved['profiles'].update(results)
+        with open(path, 'w') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        print('[bench] baseline saved to {}'.format(path))
+        sys.exit(0)
+
+    if not os.path.exists(path):
+        print('[bench] no baseline at {} (run with --save first)'.format(path))
+        sys.exit(0)
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('settings') != settings:
+        print('[bench] baseline settings {} differ from {}'.format(baseline.get('settings'), settings))
+        sys.exit(2)
+    if baseline.get('host') != host():
+        print('[bench] warning: baseline was saved on {}'.format(baseline.get('host')))
+    tolerance = float(args['--tolerance'])
+    regressions = compare(measure(profiles), baseline['profiles'], tolerance)
+    # 一時的な揺らぎを除くため、悪化した機種を計測し直し、毎回悪化した項目のみを回帰とする
+    for attempt in range(int(args['--retries'])):
+        if not regressions:
+            break
+        print('[bench] retry {}: {}'.format(attempt + 1, regressions))
+        retried = measure(sorted(set(profile for profile, _ in regressions)))
+        regressions = [(profile, name) for profile, name in regressions
+            if is_worse(name, retried[profile][name], baseline['profiles'][profile][name], tolerance)]
+    if regressions:
+        for profile, name in regressions:
+            print('[bench] REGRESSION {} {}'.format(profile, name))
+        print('[bench] {} regression(s)'.format(len(regressions)))
+        sys.exit(1)
+    print('[bench] no regression')
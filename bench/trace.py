@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+デバッグ出力の方式によるイベント1件あたりの処理時間を比較するベンチマーク。
+従来の verbose(イベントごとに print() で同期出力)と、
+トレースログ(リングバッファへ追加し別スレッドで書き込み)とを比較する。
+出力先はどちらも同じファイルとする(端末への出力はさらに遅くなる)。
+リポジトリのトップディレクトリで実行すること。
+
+Usage:
+    trace.py <profile> [--frames=<n>] [--output=<path>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help           ヘルプ表示
+    --frames=<n>        処理するフレーム数 [default: 20000]
+    --output=<path>     出力先ファイルパス [default: /tmp/gamepad_trace.jsonl]
+"""
+import time
+
+from docopt import docopt
+
+from bench.devices import FakeInputDevice, create_controller, synthetic_events
+from gamepad.trace import TraceLog
+
+
+def elapsed(ctl, events):
+    """
+    全イベントを dispatch_event() で処理した所要時間(秒)を返却する。
+    """
+    dispatch_event = ctl.dispatch_event
+    start = time.perf_counter()
+    for event in events:
+        dispatch_event(event)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    output = args['--output']
+    events = synthetic_events(profile, int(args['--frames']))
+
+    # デバッグ出力なし
+    ctl = create_controller(profile, FakeInputDevice([]))
+    none_sec = elapsed(ctl, events)
+
+    # 従来の verbose 相当(デコードのたびに同期出力)
+    # dispatch_event() はデコードテーブルの decode_id() を直接呼び出すため、そちらを差し替える
+    ctl = create_controller(profile, FakeInputDevice([]))
+    decoder = ctl.decoder
+    decode_id = decoder.decode_id
+    with open(output, 'w') as out:
+        def print_decode_id(event):
+            button_id, val = decode_id(event)
+            btn = None if button_id is None else decoder.names[button_id]
+            print('code: [', event.code,  '] val:[', event.value, '] type:[', event.type, ']', file=out)
+            print('name: [', btn, '] value=(', val ,')', file=out)
+            return button_id, val
+        decoder.decode_id = print_decode_id
+        print_sec = elapsed(ctl, events)
+    with open(output) as f:
+        printed = sum(1 for _ in f)
+    if printed != 2 * len(events):
+        raise AssertionError('print variant wrote {} lines for {} events'.format(printed, len(events)))
+
+    # トレースログ
+    trace = TraceLog(output, capacity=len(events))
+    ctl = create_controller(profile, FakeInputDevice([]), trace=trace)
+    trace_sec = elapsed(ctl, events)
+    start = time.perf_counter()
+    trace.close()
+    flush_sec = time.perf_counter() - start
+
+    count = len(events)
+    print('[bench] no output : {:8.1f} ns/event'.format(none_sec / count * 1e9))
+    print('[bench] print     : {:8.1f} ns/event'.format(print_sec / count * 1e9))
+    print('[bench] trace log : {:8.1f} ns/event (written {}, dropped {}, final flush {:.3f} sec)'.format(
+        trace_sec / count * 1e9, trace.written, trace.dropped, flush_sec))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NumPy による一括正規化(normalize_arrays)とイベント1件ずつのデコード処理とを
+比較するベンチマーク。両者の結果が一致することも確認する。
+リポジトリのトップディレクトリで実行すること。numpy パッケージが必要。
+
+Usage:
+    vectorize.py <profile> [--events=<n>]
+
+Arguments:
+    <profile>       f710_xi, f710_di, jc_u3912t のいずれか
+
+Options:
+    -h --help       ヘルプ表示
+    --events=<n>    イベント件数 [default: 1000000]
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+from docopt import docopt
+from evdev import ecodes
+
+from bench.devices import FakeInputDevice, PROFILES, create_controller, disable_debounce
+
+Event = namedtuple('Event', ['type', 'code', 'value'])
+
+
+def random_arrays(profile, count, seed=0):
+    """
+    イベント構成に沿った (type, code, value) の乱数配列を生成する。
+    """
+    rng = np.random.default_rng(seed)
+    axes = PROFILES[profile]['axes']
+    btn_type, btn_code, btn_value = PROFILES[profile]['button']
+    codes_list = sorted(axes)
+    kind = rng.integers(0, 10, count)
+    types = np.full(count, ecodes.EV_ABS, dtype=np.uint16)
+    codes = np.array(codes_list, dtype=np.uint16)[rng.integers(0, len(codes_list), count)]
+    low = np.array([axes[code][0] for code in codes_list])
+    high = np.array([axes[code][1] for code in codes_list])
+    index = np.searchsorted(codes_list, codes)
+    values = rng.integers(low[index], high[index] + 1).astype(np.int32)
+    # 1割をボタン、1割をEV_SYNとする
+    types[kind == 0] = btn_type
+    codes[kind == 0] = btn_code
+    values[kind == 0] = btn_value
+    types[kind == 1] = ecodes.EV_SYN
+    codes[kind == 1] = 0
+    values[kind == 1] = 0
+    return types, codes, values
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+    profile = args['<profile>']
+    count = int(args['--events'])
+
+    # ゲート(debounce)は押下間隔に依存するため無効にして比較する
+    ctl = disable_debounce(create_controller(profile, FakeInputDevice([])))
+    types, codes, values = random_arrays(profile, count)
+
+    start = time.perf_counter()
+    scalar = {}
+    for event in map(Event, types.tolist(), codes.tolist(), values.tolist()):
+        btn, val = ctl.decoder.decode(event)
+        if btn is not None:
+            scalar.setdefault(btn, []).append(val)
+    scalar_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector = ctl.normalize_arrays(types, codes, values)
+    vector_sec = time.perf_counter() - start
+
+    # 結果の一致を確認
+    assert sorted(scalar) == sorted(vector), (sorted(scalar), sorted(vector))
+    for btn, vals in scalar.items():
+        assert np.allclose(np.array(vals, dtype=np.float64), vector[btn]), btn
+
+    print('[bench] scalar    : {:8.3f} sec ({:.0f} events/sec)'.format(scalar_sec, count / scalar_sec))
+    print('[bench] vectorized: {:8.3f} sec ({:.0f} events/sec)'.format(vector_sec, count / vector_sec))
@@ -5,42 +5,170 @@
 キャラクタデバイス  /dev/input/js0 として認識されている
 ジョイスティックのボタン操作を行うとどのようなコードが
 出力されているのかを確認するためのプログラム。
+オプション --trace を指定した場合は画面表示の代わりにトレースログ(JSONL)ファイルへ記録し、
+view で記録済みのトレースログを後から表示できる。
+オプション --calibrate を指定した場合はアナログスティックの中央値、可動範囲、あそびを学習し、
+終了時(Ctrl+C)に設定ファイルと同じディレクトリのキャッシュファイルへ保存する。
+スティックから手を離した状態をしばらく続け、各スティックを上下左右の端まで倒してから終了すること。
+capture で実機の入力を記録ファイル(.gpev)へ記録し、ボタン名ごとのイベントレート、
+イベント間隔の分布とジッタ、あそびの範囲内の割合、重複/無変化イベントの割合と
+設定値(analog_stick_epsilone など)の推奨値を表示する。analyze は記録済みのファイルを集計する。
 
 Usage:
-    check.py (logicool) [--direct_input]
-    check.py (elecom)
+    check.py (logicool) [--direct_input] [--trace=<path>] [--calibrate]
+    check.py (elecom) [--trace=<path>] [--calibrate]
+    check.py view <path> [--button=<name>]
+    check.py capture <path> (logicool [--direct_input] | elecom | config <config_path>) [--seconds=<s>] [--hz=<n>]
+    check.py analyze <path> (logicool [--direct_input] | elecom | config <config_path>) [--hz=<n>]
 
 Options:
-    -h --help       ヘルプ表示
-    --direct_input  Direct Inputモードで使用
-    --debug         デバッグモードで実行
+    -h --help           ヘルプ表示
+    --direct_input      Direct Inputモードで使用
+    --trace=<path>      トレースログ出力先ファイルパス
+    --button=<name>     指定したボタン名のレコードのみ表示
+    --calibrate         アナログスティックのキャリブレーションを行う
+    --seconds=<s>       記録時間(秒、未指定時はCtrl+Cまで記録)
+    --hz=<n>            制御ループの周波数 [default: 20]
+    --debug             デバッグモードで実行
 """
 from docopt import docopt
 
+from gamepad.config import load_config, resource_path
+from gamepad.trace import format_record, read_trace
+
+
+def view(path, button=None):
+    """
+    記録済みのトレースログを表示し、最後にボタン名ごとの件数を表示する。
+
+    引数
+        path    トレースログファイルパス
+        button  表示対象のボタン名(デフォルトNone→全レコード)
+    戻り値
+        なし
+    """
+    counts = {}
+    last_seq = -1
+    dropped = 0
+    for record in read_trace(path):
+        # 連番の欠落はリングバッファから溢れたレコード
+        dropped += record['seq'] - last_seq - 1
+        last_seq = record['seq']
+        counts[record['btn']] = counts.get(record['btn'], 0) + 1
+        if button is None or record['btn'] == button:
+            print(format_record(record))
+    for btn, count in sorted(counts.items(), key=lambda item: str(item[0])):
+        print('[check] {}: {} events'.format(btn, count))
+    print('[check] dropped: {} events'.format(dropped))
+
+
+def config_path_of(args):
+    """
+    コマンドライン引数に対応する設定ファイルパスを返却する。
+    """
+    if args['config']:
+        return args['<config_path>']
+    if args['logicool']:
+        return resource_path('logicool', 'f710_di.yml' if args['--direct_input'] else 'f710_xi.yml')
+    return resource_path('elecom', 'jc_u3912t.yml')
+
+
+def capture(path, config_path, seconds=None):
+    """
+    設定ファイルの device_search_term に合致するデバイスの入力を記録ファイルへ記録する。
+
+    引数
+        path        記録先ファイルパス
+        config_path 設定ファイルパス
+        seconds     記録時間(秒、デフォルトNone→Ctrl+Cまで記録)
+    戻り値
+        count       記録したイベント件数
+    """
+    from gamepad.discovery import classify_devices, single_device
+    from gamepad.replay import record
+    term = load_config(config_path)['device_search_term']
+    device = single_device(classify_devices([term])[term])
+    if device is None:
+        raise SystemExit('[check] device not found: {}'.format(term))
+    print('[check] capture {} to {} (stop with Ctrl+C)'.format(device.name, path))
+    print('[check] leave the sticks at rest for a while, then move every stick and button')
+    try:
+        return record(device, path, seconds)
+    finally:
+        device.close()
+
+
+def analyze(path, config_path, hz=20):
+    """
+    記録ファイルのイベント列を集計し、入力特性と設定値の推奨値を表示する。
+
+    引数
+        path        記録ファイルパス
+        config_path 設定ファイルパス
+        hz          制御ループの周波数(デフォルト20)
+    戻り値
+        report      gamepad.profile.SessionProfile.to_dict() の戻り値
+    """
+    from gamepad.profile import SessionProfile, format_report
+    from gamepad.replay import ReplayDevice
+    device = ReplayDevice(path)
+    try:
+        report = SessionProfile(load_config(config_path), hz=hz).observe_all(device.read_loop()).to_dict()
+    finally:
+        device.close()
+    for line in format_report(report):
+        print('[check] ' + line)
+    return report
+
 if __name__ == "__main__":
 
     # 検索対象文字列に合致するコントローラオブジェクトを生成する
     # 妥当性検査(Debug)モードで実行する
     print('[check] start')
     args = docopt(__doc__)
+    trace = args['--trace']
+    calibrate = args['--calibrate']
+
+    if args['view']:
+        view(args['<path>'], args['--button'])
+        raise SystemExit(0)
+
+    if args['capture'] or args['analyze']:
+        config_path = config_path_of(args)
+        if args['capture']:
+            seconds = args['--seconds']
+            count = capture(args['<path>'], config_path, None if seconds is None else float(seconds))
+            print('[check] {} events captured'.format(count))
+        analyze(args['<path>'], config_path, float(args['--hz']))
+        raise SystemExit(0)
 
     if args['logicool']:
         # ELECOM製 JC-U3912T ゲームパッドの場合
         from logicool import JoystickController
         if args['--direct_input']:
             print('[check] use F710 with DirectInput mode')
-            ctl = JoystickController(config_path='logicool/f710_di.yml', verbose=True)
+            ctl = JoystickController(config_path=resource_path('logicool', 'f710_di.yml'), verbose=True, trace=trace, calibrate=calibrate)
         else:
             print('[check] use F710 with X-Input mode')
-            ctl = JoystickController(config_path='logicool/f710_xi.yml', verbose=True)
+            ctl = JoystickController(config_path=resource_path('logicool', 'f710_xi.yml'), verbose=True, trace=trace, calibrate=calibrate)
     elif args['elecom']:
         from elecom import JoystickController
         print('[check] use JC-U3912T')
-        ctl = JoystickController(config_path='elecom/jc_u3912t.yml', verbose=True)
+        ctl = JoystickController(config_path=resource_path('elecom', 'jc_u3912t.yml'), verbose=True, trace=trace, calibrate=calibrate)
 
     # イベント待受ループを開始する
     # 妥当性検査モードがTrueなのでジョイスティックのボタンやアナログスティックを操作したら
     # そのボタン名、値が１行ごとに表示される。
     print('[check] push joystick button to view it\'s name and value')
-    ctl.update()
+    if trace is not None:
+        print('[check] trace to {} (view it with: python check.py view {})'.format(trace, trace))
+    try:
+        ctl.update()
+    except KeyboardInterrupt:
+        # 残りのトレースを書き込む
+        ctl.trace.close()
+        if calibrate:
+            for btn, entry in sorted(ctl.save_calibration().items()):
+                print('[check] {}: {}'.format(btn, entry))
+            print('[check] calibration saved to {}'.format(ctl.calibrator.path))
     print('[check] end')
\ No newline at end of file
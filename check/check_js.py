@@ -6,73 +6,76 @@
 キャラクタデバイス  /dev/input/js0 として認識されている
 ジョイスティックのボタン操作を行うとどのようなコードが
 出力されているのかを確認するためのプログラム。
+axis/ボタンの名前は各コントローラの設定ファイル(decode セクション)から求める。
 
 fcntl パッケージを使用するため、Windows環境では動作しない。
+
+Usage:
+    check_js.py (logicool) [--direct_input] [--device=<path>]
+    check_js.py (elecom) [--device=<path>]
+    check_js.py config <path> [--device=<path>]
+
+Options:
+    -h --help           ヘルプ表示
+    --direct_input      Direct Inputモードの設定ファイルを使用
+    --device=<path>     ジョイスティックキャラクタデバイスパス [default: /dev/input/js0]
 """
 import array
+import os
+import sys
 import time
 import struct
 from fcntl import ioctl
 
+from docopt import docopt
+from evdev import ecodes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gamepad.config import load_config, resource_path
+from gamepad.engine import compile_decoder
+from gamepad.jsdev import HID_BUTTON_SCAN_BASE
+
 axis_states = {}            # 方向状態辞書{方向名:状態}:init()にて書き込まれる
 button_states = {}          # ボタン状態辞書{ボタン名,状態}:init()にて書き込まれる
 axis_map = []               # 方向マップ[方向名]:init()にて書き込まれる
 button_map = []             # ボタンマップ[ボタン名]:init()にて書き込まれる
 jsdev = None                # ジョイスティックキャラクタデバイス ファイルオブジェクト
 dev_fn = '/dev/input/js0'   # ジョイスティックキャラクタデバイス パス
+decoder = None              # 設定ファイルから構築したデコードテーブル:load_names()にて書き込まれる
+
+
+def load_names(config_path):
+    """
+    設定ファイルの decode セクションからデコードテーブルを構築する。
+    js ドライバの axis/ボタン割り当て(ABS_*/BTN_* コード)から名前を引くために使用する。
+
+    引数
+        config_path     設定ファイルパス
+    戻り値
+        なし
+    """
+    global decoder
+    decoder = compile_decoder(load_config(config_path))
+
+
+def axis_name(axis):
+    """
+    ABS_* コードに対応する名前を返却する。
+    """
+    entry = decoder.entries().get((ecodes.EV_ABS, axis))
+    return decoder.names[entry[0]] if entry is not None else 'unknown(0x%02x)' % axis
+
+
+def button_name(index, btn):
+    """
+    js ボタン番号、BTN_* コードに対応する名前を返却する。
+    EV_MSC のスキャンコードで扱う設定の場合はボタン番号から名前を引く。
+    """
+    entries = decoder.entries()
+    entry = entries.get((ecodes.EV_KEY, btn)) or \
+        entries.get((ecodes.EV_MSC, HID_BUTTON_SCAN_BASE + index))
+    return decoder.names[entry[0]] if entry is not None else 'unknown(0x%03x)' % btn
 
-# ifdef ELECOM JC-U3912T
-'''
-axis_names = {
-            0:  'left_stick_horz',
-            1:  'left_stick_vert',
-            2:  'right_stick_vert',
-            3:  'right_stick_horz', # unknown 0x10 or x011
-            4:  'dpad_horz', # unknown 0x10 or 0x11
-            5:  'dpad_vert'
-}
-
-button_names = {
-            0: '1',   # square
-            1: '2',   # triangle
-            2: '3',   # cross
-            3: '4',   # circle
-            4: '5',   # L1
-            5: '6',   # R1
-            6: '7',   # L2
-            7: '8',   # R2
-            8: 'left_stick_pressure', # 9_pressure
-            9: 'right_stick_pressure', # 10_pressure
-            10: '11', # select
-            11: '12'  # start
-}
-'''
-
-#ifdef Logicool F710
-axis_names = {
-            0:  'left_stick_horz',
-            1:  'left_stick_vert',
-            2:  'LT_pressure',
-            3:  'right_stick_horz',
-            4:  'right_stick_vert',
-            5:  'RT_pressure',
-            6:  'dpad_horz',
-            7:  'dpad_vert',
-}
-
-button_names = {
-            0:  'A',     # cross
-            1:  'B',     # circle
-            2:  'X',     # square
-            3:  'Y',     # triangle
-            4:  'LB',    # L1
-            5:  'RB',    # R1
-            6:  'BACK',  # select
-            7:  'START', # start
-
-            9:  'left_stick_pressure',
-            10: 'right_stick_pressure',
-}
 
 def init():
     print('Opening %s...' % dev_fn)
@@ -101,10 +104,10 @@ def init():
 
         print('***** axis_name list')
         for axis in buf[:num_axes]:
-            axis_name = axis_names.get(axis, 'unknown(0x%02x)' % axis)
-            axis_map.append(axis_name)
-            axis_states[axis_name] = 0.0
-            print(' ', axis_name)
+            name = axis_name(axis)
+            axis_map.append(name)
+            axis_states[name] = 0.0
+            print(' ', name)
             print('    = 0x%02x' % axis)
 
         # Get the button map.
@@ -112,11 +115,11 @@ def init():
         ioctl(jsdev, 0x80406a34, buf) # JSIOCGBTNMAP
 
         print('***** button_name list')
-        for btn in buf[:num_buttons]:
-            btn_name = button_names.get(btn, 'unknown(0x%03x)' % btn)
-            button_map.append(btn_name)
-            button_states[btn_name] = 0
-            print(' ', btn_name)
+        for index, btn in enumerate(buf[:num_buttons]):
+            name = button_name(index, btn)
+            button_map.append(name)
+            button_states[name] = 0
+            print(' ', name)
             print('    = 0x%03x' % btn)
 
         JS_FORMAT = "IhBB" 
@@ -130,4 +133,12 @@ def init():
             event = jsdev.read(JS_SIZE)
 
 if __name__ == '__main__':
+    args = docopt(__doc__)
+    dev_fn = args['--device']
+    if args['logicool']:
+        load_names(resource_path('logicool', 'f710_di.yml' if args['--direct_input'] else 'f710_xi.yml'))
+    elif args['elecom']:
+        load_names(resource_path('elecom', 'jc_u3912t.yml'))
+    else:
+        load_names(args['<path>'])
     init()
\ No newline at end of file
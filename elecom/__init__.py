@@ -1 +1 @@
-from .part import JoystickController
\ No newline at end of file
+from .part import JoystickController, AsyncJoystickController
\ No newline at end of file
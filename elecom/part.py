@@ -11,13 +11,24 @@ pip install -e .
 各ボタン/各axisにどの機能が割り振られているかは、
 コントロールクラス JoystickController の self.func_map を参照のこと。
 """
-import time
-import evdev
-from evdev import ecodes
 
-from donkeypart_bluetooth_game_controller import BluetoothGameController
+from gamepad import GameController
+from gamepad.config import resource_path
+from gamepad.discovery import classify_devices, single_device, open_device
+from gamepad.aio import AsyncControllerMixin
 
-class JoystickController(BluetoothGameController):
+# JC-U3912T のデバイス名に含まれる検索対象文字列
+SEARCH_TERM = 'smart jc-u3912t'
+# 本パッケージのコントローラで扱うデバイスの検索対象文字列(gamepad.manager で使用)
+SEARCH_TERMS = (SEARCH_TERM,)
+# decode セクションのない設定ファイルで使用する既定値(gamepad.engine 参照)
+DECODE = {'analog': {'deadzone': 1}, 'routes': [
+    {'type': 'EV_ABS', 'key': 'code', 'map': 'code_map', 'normalize': 'analog',
+        'dpad': 'dpad_target', 'skip': 'button_map_target'},
+    {'type': 'EV_MSC', 'key': 'value', 'map': 'button_map', 'normalize': 'press'},
+]}
+
+class JoystickController(GameController):
     '''
     JC-U3912T ゲームパッド用コントローラクラス。
     manage.pyを編集し、ジョイスティックコントローラとして本コントローラをimportし
@@ -28,31 +39,42 @@ class JoystickController(BluetoothGameController):
         event_input_device=None, 
         config_path=None, 
         device_search_term=None, 
-        verbose=False):
+        verbose=False,
+        **kwargs):
         '''
         コンストラクタ。
         親クラスの実装を処理後、ELECOM製JC-U3912T固有の設定に対応できるように
         引数で与えられた項目をもとにいくつかのインスタンス変数を初期化・上書きする。
 
         引数
-            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクト(デフォルトNone→device_search_termで検索する)
+            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクトもしくはデバイスパス(デフォルトNone→device_search_termで検索する)
             config_path           設定ファイルパス(デフォルトNone)
             device_search_term    検索対象文字列(デフォルトNone)
             verbose               デバッグモード(デフォルトFalse)
+            kwargs                その他 gamepad.GameController の引数(batch_read など)
         戻り値
             なし
         '''
         # デフォルト値の設定
-        if config_path:
-            config_path = 'elecom/jc_u3912t.yml'
-        if device_search_term:
-            device_search_term = 'smart jc-u3912t'
+        if config_path is None:
+            config_path = resource_path('elecom', 'jc_u3912t.yml')
+        if device_search_term is None:
+            device_search_term = SEARCH_TERM
+        # デバイスパスが指定された場合はデバイスを開く(/dev/input/js* にも対応)
+        # 子プロセスで読み込む場合(isolate)は開かず、子プロセスで開く
+        if not kwargs.get('isolate'):
+            event_input_device = open_device(event_input_device)
+            if event_input_device is None:
+                # 接続中の全デバイスを1回だけ走査して検索
+                event_input_device = single_device(
+                    classify_devices([device_search_term])[device_search_term])
 
         super(JoystickController, self).__init__(
             event_input_device=event_input_device, 
             config_path=config_path, 
             device_search_term=device_search_term, 
-            verbose=verbose)
+            verbose=verbose,
+            **kwargs)
 
         # コードマップ(event.type==3)
         self.code_map = self.config.get('code_map')
@@ -81,78 +103,27 @@ class JoystickController(BluetoothGameController):
             '3': self.decrement_throttle_scale,    # スロットル倍率減少
         }
 
-    def read_loop(self):
+        # デコードテーブルを構築
+        self.decoder = self._compile_decoder()
+
+    def _decode_spec(self):
         """
-        イベントデバイスから１件読み取り、対象のボタン名、値を返却する。
-        親クラスの実装のままでは JC-U3912T 固有のイベントキャラクタデバイス
-        フォーマットに対応できないため、本メソッドをオーバライドして対応している。
+        デコードテーブルの構築に使用する decode セクションを返却する。
+        decode セクションのない設定ファイルの場合は既定値を使用する。
 
         引数
             なし
         戻り値
-            btn     対象のボタン名
-            val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+            spec        decode セクション(辞書)
         """
-        try:
-            # イベントデバイスから1件イベントを読み込む
-            event = next(self.device.read_loop())
-            # code値から対象のボタン名を取得
-            btn = self.code_map.get(event.code)
-            if btn in self.button_map_target:
-                # event.value値から詳細ボタン名を取得
-                btn = self.btn_map.get(event.value)
-
-            # アナログジョイスティック/DPAD(3)の場合
-            if event.type == ecodes.EV_ABS:
-                # アナログジョイスティック/DPADへ入力すると
-                # 入力時に1イベント以上、離脱時に1イベント直列に発生する
-                if self.verbose:
-                    print('type == ecodes.EV_ABS -> analog/dpad')
-                if btn in self.dpad_target:
-                    if self.verbose:
-                        print(btn, ' is in dpad_tareget')
-                    # 上/左:-1 中央:0 sita 下/右:1
-                    val = event.value * 1.0 
-                else:
-                    if self.verbose:
-                        print(btn, ' is not in dpad_target')
-                    # 中央位置の場合
-                    if event.value == self.analog_stick_zero_value:
-                        val = 0.0
-                    # 中央位置以外の場合
-                    else:
-                        val = ((event.value - self.analog_stick_zero_value) * 1.0) \
-                            / ((self.analog_stick_max_value - self.analog_stick_min_value) / 2.0)
-            # 通常ボタン(4)の場合
-            elif event.type == ecodes.EV_MSC:
-                if self.verbose:
-                    print('type == ecodes.EV_ABS -> not analog/dpad')
-                # JC-U3912T ではボタン離脱イベントは存在しない
-                val = 1
-            # その他のイベントの場合
-            else:
-                if self.verbose:
-                    print('unknown type: ', event.type)
-                    print('code: [', event.code,  '] val:[', event.value, '] type:[', event.type, ']')
-                # ボタン名, 値ともにNoneを返却
-                return None, None
-
-            # デバッグコード
-            if self.verbose:
-                print('code: [', event.code,  '] val:[', event.value, '] type:[', event.type, ']')
-                print('name: [', btn, '] value=(', val ,')')
+        return self.config.get('decode') or DECODE
 
-            # ボタン名、値の返却
-            return btn, val
 
-        # OSエラー発生時
-        except OSError as e:
-            print('OSError: Likely lost connection with controller. Trying to reconnect now. Error: {}'.format(e))
-            # 0.1秒待機
-            time.sleep(.1)
-            # 検索文字列self.device_search_term と合致するイベントデバイスオブジェクトを取得し
-            # インスタンス変数 self.device へ格納する（やりなおし）
-            self.load_device(self.device_search_term)
-            # ボタン名, 値ともにNoneを返却
-            return None, None
-    
\ No newline at end of file
+class AsyncJoystickController(AsyncControllerMixin, JoystickController):
+    """
+    JC-U3912T 用 asyncio 版コントローラクラス。
+    events() で非同期にボタン名、値を取得でき、gamepad.aio.multiplex()/run_all() を
+    使用すると1つのイベントループ上で複数のゲームパッドを待ち受けることができる。
+    update() は専用イベントループを起動するため、従来通り run_threaded() でも使用できる。
+    """
+    pass
@@ -0,0 +1,3 @@
+from .part import GameController
+from .aio import AsyncControllerMixin, multiplex, run_all
+from .manager import ControllerManager, discover_controllers
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio 版コントローラ用の Mixin クラスおよびユーティリティ関数。
+
+evdev の非同期読み込み(fdの読み込み可能通知)を使用するため、
+デバイスごとにスレッドを用意することなく、1つのイベントループ上で
+複数のゲームパッドや他のセンサ入力を同時に待ち受けることができる。
+"""
+import asyncio
+import time
+
+from .batch import coalesce_events
+
+
+class AsyncControllerMixin:
+    """
+    GameController のサブクラスと組み合わせて使用する asyncio 対応 Mixin クラス。
+    継承時は本クラスを先頭に指定すること。
+
+    class AsyncJoystickController(AsyncControllerMixin, JoystickController):
+        pass
+
+    isolate を指定した場合は update() のみ使用でき、子プロセス上のイベントループで読み込む。
+    """
+    async def raw_events(self):
+        """
+        デバイスから読み込んだイベントを返却する非同期イテレータ。
+        batch_read が True の場合は、読み込み可能になった時点で溜まっている
+        全イベントを同一axisの最新値にまとめてから返却する。
+
+        引数
+            なし
+        戻り値
+            event   evdev.InputEvent オブジェクト
+        """
+        if self.isolate:
+            raise ValueError('events are read in the child process with isolate; use update()')
+        reader = None
+        while True:
+            try:
+                if self.batch_read:
+                    batch = coalesce_events(list(await self.device.async_read()))
+                else:
+                    if reader is None:
+                        reader = self.device.async_read_loop()
+                    batch = [await reader.__anext__()]
+            # デバイス側の入力が終了した場合(再生デバイスなど)
+            except (StopAsyncIteration, EOFError):
+                self._end_of_input()
+                return
+            # OSエラー発生時は再接続処理をスレッドプール上で実行する
+            except OSError as e:
+                reader = None
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._reconnect, e)
+                continue
+            for event in batch:
+                yield event
+
+    async def events(self):
+        """
+        デコード済みの (ボタン名, 値) を返却する非同期イテレータ。
+
+        引数
+            なし
+        戻り値
+            (btn, val)  対象のボタン名, 押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+        """
+        async for event in self.raw_events():
+            btn, val = self.decode(event)
+            if btn is not None:
+                yield btn, val
+
+    # run_async() を実行中のタスクとイベントループ(shutdown() で停止するため保持)
+    _async_task = None
+    _async_loop = None
+
+    async def run_async(self):
+        """
+        イベントを待ち受け、状態へ反映し func_map 上の関数を呼び出すコルーチン。
+        shutdown() が呼び出された場合は終了する。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        if self._stopped:
+            return
+        self._async_task = asyncio.current_task()
+        self._async_loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        flusher = asyncio.ensure_future(self._flush_pending(wake))
+        try:
+            async for event in self.raw_events():
+                self.dispatch_event(event)
+                if self._stopped:
+                    return
+                if self._flushable:
+                    wake.set()
+        except asyncio.CancelledError:
+            # shutdown() による取り消しは正常終了とする
+            if not self._stopped:
+                raise
+        finally:
+            flusher.cancel()
+            self._async_task = None
+            self._async_loop = None
+
+    def shutdown(self):
+        """
+        イベント待受を停止する。run_async() を実行中の場合はタスクを取り消し、
+        async_read() で待機中のコルーチンも終了させる。
+        """
+        self._stopped = True
+        task, loop = self._async_task, self._async_loop
+        if task is not None and loop is not None and not loop.is_closed():
+            # 別スレッドから呼び出される場合があるためイベントループ上で取り消す
+            loop.call_soon_threadsafe(task.cancel)
+        super().shutdown()
+
+    async def _flush_pending(self, wake):
+        """
+        入力フィルタが値を保留している間、通知時刻に保留中の値を通知するコルーチン。
+        スティックを保持してイベントが発生しない間も値を収束させる。
+
+        引数
+            wake    イベント処理後に通知される asyncio.Event オブジェクト
+        戻り値
+            なし
+        """
+        while True:
+            due = self._next_flush() if self._flushable else None
+            if due is None:
+                # 保留中の値が発生するまで待つ
+                await wake.wait()
+                wake.clear()
+                continue
+            await asyncio.sleep(max(0.0, due - time.time()))
+            self._flush_filters(time.time())
+
+    def update(self):
+        """
+        同期版 run_threaded() 契約向けのアダプタ。
+        Vehicle フレームワークのスレッド上で専用イベントループを起動する。
+        isolate を指定した場合は子プロセスを起動し、子プロセス上で専用イベントループを起動する。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        if self.isolate:
+            self._run_isolated()
+            return
+        asyncio.run(self.run_async())
+
+
+async def multiplex(*sources):
+    """
+    複数の非同期イテレータを1つにまとめる非同期ジェネレータ。
+    ゲームパッドの events() やセンサ入力など任意の非同期イテレータを渡すことができる。
+
+    引数
+        sources     非同期イテレータ(可変長)
+    戻り値
+        (index, item)   発生元のsources上の位置, 発生したデータ
+    """
+    queue = asyncio.Queue()
+    # 終了通知用オブジェクト
+    done = object()
+
+    async def pump(index, source):
+        try:
+            async for item in source:
+                await queue.put((index, item, None))
+        except Exception as e:
+            # 例外は呼び出し元で再送出する
+            await queue.put((index, done, e))
+        else:
+            await queue.put((index, done, None))
+
+    tasks = [asyncio.ensure_future(pump(index, source))
+        for index, source in enumerate(sources)]
+    remaining = len(tasks)
+    try:
+        while remaining > 0:
+            index, item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                remaining -= 1
+                continue
+            yield index, item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_all(*controllers):
+    """
+    複数のコントローラの run_async() を1つのイベントループ上で同時に実行する。
+
+    引数
+        controllers AsyncControllerMixin を継承したコントローラ(可変長)
+    戻り値
+        なし
+    """
+    await asyncio.gather(*(ctl.run_async() for ctl in controllers))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+イベントキャラクタデバイスからのまとめ読み(バッチ読み込み)用関数群。
+
+evdev の read_loop() は1回の呼び出しにつき1イベントしか返さないため、
+アナログスティック操作中のように毎秒数百件のイベントが発生する場合は
+イベント件数分のシステムコールとPython側の往復が発生する。
+本モジュールでは、読み取り可能になった時点でfd上に溜まっている全イベントを
+一括で取得し、同一axisのイベントを最新値のみにまとめる。
+"""
+import select
+
+from evdev import ecodes
+
+
+def drain_events(device, timeout=None):
+    """
+    デバイス上に溜まっている全イベントを一括で読み込む。
+    読み込めるイベントが存在しない場合は、select でfdが読み取り可能になるまで待機する。
+
+    引数
+        device      InputDevice オブジェクト(もしくは read()/fd を持つ互換オブジェクト)
+        timeout     待機上限秒数(デフォルトNone→無期限に待機)
+    戻り値
+        events      イベントオブジェクトのリスト(タイムアウト時は空リスト)
+    """
+    while True:
+        try:
+            return list(device.read())
+        except BlockingIOError:
+            # 読み込み可能になるまで待機
+            readable, _, _ = select.select([device.fd], [], [], timeout)
+            if not readable:
+                return []
+
+
+def coalesce_events(events):
+    """
+    イベントリストを間引く。
+    EV_ABS は同一codeの最新イベントのみを残し、EV_SYN は除外する。
+    ボタン系イベント(EV_KEY/EV_MSC)は押下/離脱の順序が意味を持つため全件残す。
+    残したイベントの相対順序は元のリスト上の順序を維持する。
+
+    引数
+        events      イベントオブジェクトのリスト
+    戻り値
+        coalesced   間引き後のイベントオブジェクトのリスト
+    """
+    coalesced = []
+    seen_abs = set()
+    # 後ろから走査し、各axisの最後のイベントのみ採用する
+    for event in reversed(events):
+        if event.type == ecodes.EV_SYN:
+            continue
+        if event.type == ecodes.EV_ABS:
+            if event.code in seen_abs:
+                continue
+            seen_abs.add(event.code)
+        coalesced.append(event)
+    coalesced.reverse()
+    return coalesced
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+アナログスティックのオンラインキャリブレーション。
+
+設定ファイルの中央値、あそび(analog_stick_zero_value, analog_stick_epsilone)は
+機種ごとの固定値のため、中央値がずれた個体ではスティックから手を離しても
+ゼロにならず、微小な値の変化が通知され続ける。
+キャリブレーションモードでは、軸ごとに入力値の度数分布を集計し、
+  中央値    静止中の入力値の平均。静止中の入力値は、幅が可動範囲の rest_band 倍の両側分の
+            区間のうち入力値の件数が最も多いもの(度数分布の最頻区間)とし、
+            設定ファイル上の中央値から大きくずれた個体でも学習できるようにする
+  あそび    静止中の入力値の標準偏差 × sigmas
+  可動範囲  入力値の最小値、最大値(中央値から両側へ sweep 以上倒した場合のみ採用)
+を学習する。カーネルは値が変化した場合のみイベントを発生させるため、
+端まで倒して保持している間の件数は増えず、静止中の揺らぎが最頻区間となる。
+イベント処理中は直近の最頻区間に入った入力値の件数、平均、偏差平方和を逐次更新し
+(Welford 法)、度数分布からの最頻区間の再計算は保存時のみ行う。
+結果は設定ファイルと同じディレクトリのキャッシュファイル
+(<設定ファイル名>.calibration.yml)へ保存し、次回起動時に各軸の正規化関数へ埋め込む。
+保存はイベント処理スレッドではなくバックグラウンドスレッドで行う。
+あそびは設定ファイルの値より小さくしない。
+"""
+import bisect
+import math
+import os
+import threading
+
+import yaml
+
+# キャッシュファイル名の接尾辞
+CACHE_SUFFIX = '.calibration.yml'
+
+
+def cache_path(config_path):
+    """
+    設定ファイルに対応するキャッシュファイルのパスを返却する。
+
+    引数
+        config_path     設定ファイルパス
+    戻り値
+        path            キャッシュファイルパス
+    """
+    return os.path.splitext(config_path)[0] + CACHE_SUFFIX
+
+
+def load_calibration(path):
+    """
+    キャッシュファイルを読み込む。存在しない場合は空の辞書を返却する。
+
+    引数
+        path            キャッシュファイルパス
+    戻り値
+        calibration     {ボタン名: {center, deadzone, min, max, samples}}
+    """
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def save_calibration(path, calibration):
+    """
+    キャッシュファイルへ書き込む。書き込み途中の内容を読み込まないよう置き換えで保存する。
+
+    引数
+        path            キャッシュファイルパス
+        calibration     {ボタン名: {center, deadzone, min, max, samples}}
+    戻り値
+        なし
+    """
+    temp = path + '.tmp'
+    with open(temp, 'w') as f:
+        yaml.safe_dump(calibration, f, default_flow_style=False)
+    os.replace(temp, path)
+
+
+def apply_calibration(entry, zero_low, zero_high, middle, max_value, min_value):
+    """
+    キャリブレーション結果を analog_normalizer() の引数へ反映する。
+
+    引数
+        entry       1軸分のキャリブレーション結果(None の場合は反映しない)
+        zero_low    設定ファイル上のゼロ範囲の下限
+        zero_high   設定ファイル上のゼロ範囲の上限
+        middle      設定ファイル上の中央値
+        max_value   設定ファイル上の最大値
+        min_value   設定ファイル上の最小値
+    戻り値
+        zero_low, zero_high, middle, max_value, min_value
+    """
+    if entry is None:
+        return zero_low, zero_high, middle, max_value, min_value
+    center = entry['center']
+    deadzone = max(entry['deadzone'], (zero_high - zero_low) / 2.0)
+    if entry.get('max') is not None:
+        max_value = entry['max']
+    if entry.get('min') is not None:
+        min_value = entry['min']
+    return center - deadzone, center + deadzone, center, max_value, min_value
+
+
+def _rest_cluster(histogram, band, middle):
+    """
+    度数分布から静止中とみなす区間の中心と、区間内の入力値の件数、平均、偏差平方和を求める
+    (AxisStats.refresh() 参照)。
+    """
+    values = sorted(histogram)
+    if not values:
+        return middle, 0, middle, 0.0
+    # 幅 band × 2 の区間のうち件数が最も多いもの(尺取り法)
+    best, best_left, total, left = -1, 0, 0, 0
+    for right, value in enumerate(values):
+        total += histogram[value]
+        while value - values[left] > 2.0 * band:
+            total -= histogram[values[left]]
+            left += 1
+        if total > best:
+            best, best_left, best_right = total, left, right
+    window = values[best_left:best_right + 1]
+    center = sum(value * histogram[value] for value in window) / float(best)
+    # 区間の平均から両側 band 以内を静止中とする
+    selected = values[bisect.bisect_left(values, center - band):bisect.bisect_right(values, center + band)]
+    count = sum(histogram[value] for value in selected)
+    mean = sum(value * histogram[value] for value in selected) / float(count)
+    m2 = sum(histogram[value] * (value - mean) ** 2 for value in selected)
+    return center, count, mean, m2
+
+
+class AxisStats:
+    """
+    アナログスティック1軸分の入力値の度数分布。
+    """
+    def __init__(self, middle, max_value, min_value, rest_band=0.05):
+        """
+        コンストラクタ。
+
+        引数
+            middle      設定ファイル上の中央値
+            max_value   設定ファイル上の最大値
+            min_value   設定ファイル上の最小値
+            rest_band   静止中とみなす範囲(可動範囲の半分に対する割合、デフォルト0.05)
+        戻り値
+            なし
+        """
+        self.middle = middle
+        self.max_value = max_value
+        self.min_value = min_value
+        self.band = (max_value - min_value) / 2.0 * rest_band
+        # {入力値: 件数}
+        self.histogram = {}
+        # 入力値の最小値、最大値
+        self.low = None
+        self.high = None
+        # (静止中とみなす区間の中心, 区間内の入力値の件数, 平均, 偏差平方和)
+        # 保存スレッドからの refresh() と競合しないよう、常にタプルごと置き換える
+        self._rest = (middle, 0, middle, 0.0)
+
+    def observe(self, value):
+        """
+        入力値を1件集計する。
+
+        引数
+            value   event.value
+        戻り値
+            なし
+        """
+        histogram = self.histogram
+        histogram[value] = histogram.get(value, 0) + 1
+        if self.low is None or value < self.low:
+            self.low = value
+        if self.high is None or value > self.high:
+            self.high = value
+        center, count, mean, m2 = self._rest
+        if center - self.band <= value <= center + self.band:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            self._rest = (center, count, mean, m2 + delta * (value - mean))
+
+    def refresh(self):
+        """
+        度数分布から静止中とみなす区間を求め直し、区間内の入力値の件数、平均、偏差平方和を再集計する。
+        幅 band × 2 の区間のうち件数が最も多いものを求め、
+        その平均から両側 band 以内の入力値を静止中とする。
+        度数分布を整列するため、イベント処理中ではなく保存時や集計結果の出力時に呼び出す。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        self._rest = _rest_cluster(dict(self.histogram), self.band, self.middle)
+
+    def rest(self):
+        """
+        静止中の入力値の件数、平均、標準偏差を返却する。
+        直近の refresh() で求めた区間(未実行の場合は設定ファイル上の中央値から両側 band 以内)に
+        入った入力値を対象とする。
+
+        引数
+            なし
+        戻り値
+            count       静止中の入力値の件数
+            mean        静止中の入力値の平均(件数0の場合は設定ファイル上の中央値)
+            std         静止中の入力値の標準偏差
+        """
+        _, count, mean, m2 = self._rest
+        return count, mean, math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+
+    @property
+    def count(self):
+        """
+        静止中の入力値の件数。
+        """
+        return self.rest()[0]
+
+    @property
+    def mean(self):
+        """
+        静止中の入力値の平均。
+        """
+        return self.rest()[1]
+
+    @property
+    def std(self):
+        """
+        静止中の入力値の標準偏差。
+        """
+        return self.rest()[2]
+
+    def result(self, sigmas=3.0, sweep=0.8):
+        """
+        集計結果を返却する。
+
+        引数
+            sigmas      あそびとする標準偏差の倍数(デフォルト3.0)
+            sweep       可動範囲を採用する倒し量(中央値から設定ファイル上の端までに対する割合、デフォルト0.8)
+        戻り値
+            entry       {center, deadzone, min, max, samples}(端まで倒していない側は None)
+        """
+        center = self.mean
+        high = self.high if self.high is not None \
+            and self.high - center >= sweep * (self.max_value - center) else None
+        low = self.low if self.low is not None \
+            and center - self.low >= sweep * (center - self.min_value) else None
+        return {
+            'center': float(center),
+            'deadzone': float(self.std * sigmas),
+            'max': high,
+            'min': low,
+            'samples': self.count,
+        }
+
+
+class Calibrator:
+    """
+    キャリブレーションモードで各軸の入力値を集計し、キャッシュファイルへ保存するクラス。
+    """
+    def __init__(self, path, base=None, rest_band=0.05, sigmas=3.0, sweep=0.8,
+        min_samples=200, save_every=5000):
+        """
+        コンストラクタ。
+
+        引数
+            path        キャッシュファイルパス
+            base        既存のキャリブレーション結果(集計件数の足りない軸はこの値を保存する)
+            rest_band   中央付近とみなす範囲(可動範囲の半分に対する割合、デフォルト0.05)
+            sigmas      あそびとする標準偏差の倍数(デフォルト3.0)
+            sweep       可動範囲を採用する倒し量の割合(デフォルト0.8)
+            min_samples 結果を採用する中央付近の入力値の最小件数(デフォルト200)
+            save_every  キャッシュファイルへ保存する間隔(入力値の件数、デフォルト5000、
+                        保存はバックグラウンドスレッドで行う)
+        戻り値
+            なし
+        """
+        self.path = path
+        self.base = dict(base or {})
+        self.rest_band = rest_band
+        self.sigmas = sigmas
+        self.sweep = sweep
+        self.min_samples = min_samples
+        self.save_every = save_every
+        self.axes = {}
+        self.pending = 0
+        # バックグラウンドでの保存要求、保存スレッド(最初の保存要求時に開始)
+        self._save_requested = threading.Event()
+        self._saver = None
+        self._lock = threading.Lock()
+
+    def wrap(self, btn, normalizer, middle, max_value, min_value):
+        """
+        入力値を集計してから正規化する関数を生成する。
+
+        引数
+            btn         ボタン名
+            normalizer  正規化関数
+            middle      設定ファイル上の中央値
+            max_value   設定ファイル上の最大値
+            min_value   設定ファイル上の最小値
+        戻り値
+            observing   入力値を集計する正規化関数
+        """
+        stats = self.axes.get(btn)
+        if stats is None:
+            stats = self.axes[btn] = AxisStats(middle, max_value, min_value, self.rest_band)
+        observe = stats.observe
+        def observing(value):
+            observe(value)
+            self.pending += 1
+            if self.pending >= self.save_every:
+                self.request_save()
+            return normalizer(value)
+        # ベクトル化処理(gamepad.vectorize)向けにパラメータと集計しない元の関数を保持
+        observing.params = normalizer.params
+        observing.unwrapped = normalizer
+        return observing
+
+    def result(self):
+        """
+        既存の結果に、集計件数が min_samples 以上の軸の集計結果を上書きして返却する。
+
+        引数
+            なし
+        戻り値
+            calibration     {ボタン名: {center, deadzone, min, max, samples}}
+        """
+        calibration = dict(self.base)
+        for btn, stats in self.axes.items():
+            if stats.count >= self.min_samples:
+                calibration[btn] = stats.result(self.sigmas, self.sweep)
+        return calibration
+
+    def request_save(self):
+        """
+        バックグラウンドスレッドでの保存を要求する。イベント処理スレッドから呼び出す。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        self.pending = 0
+        if self._saver is None:
+            self._saver = threading.Thread(target=self._save_loop,
+                name='gamepad-calibration', daemon=True)
+            self._saver.start()
+        self._save_requested.set()
+
+    def _save_loop(self):
+        """
+        保存スレッド本体。保存要求のたびに保存する。
+        """
+        while True:
+            self._save_requested.wait()
+            self._save_requested.clear()
+            self.save()
+
+    def save(self):
+        """
+        集計結果をキャッシュファイルへ保存する。書き込めない場合は警告を表示する。
+
+        引数
+            なし
+        戻り値
+            calibration     保存した結果
+        """
+        with self._lock:
+            for stats in self.axes.values():
+                stats.refresh()
+            calibration = self.result()
+            try:
+                save_calibration(self.path, calibration)
+            except OSError as e:
+                print('Cannot save calibration to {}: {}'.format(self.path, e))
+        return calibration
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+設定ファイル(YAML)の読み込み。
+
+設定ファイルはカレントディレクトリからの相対パスではなく、各パッケージ内の
+リソースとして解決する。読み込み結果はプロセス内でキャッシュし、
+同じ設定ファイルを使うコントローラを複数生成しても解析は1回のみとなる。
+"""
+import copy
+import functools
+import os
+
+import yaml
+
+try:
+    from importlib.resources import files as _resource_files
+except ImportError:
+    _resource_files = None
+
+
+def resource_path(package, name):
+    """
+    パッケージ内のリソースファイルのパスを返却する。
+
+    引数
+        package     パッケージ名('logicool' など)
+        name        リソースファイル名('f710_xi.yml' など)
+    戻り値
+        path        リソースファイルの絶対パス
+    """
+    if _resource_files is not None:
+        return str(_resource_files(package).joinpath(name))
+    module = __import__(package)
+    return os.path.join(os.path.dirname(os.path.abspath(module.__file__)), name)
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path, mtime):
+    """
+    設定ファイルを解析する(キャッシュ対象)。
+    """
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def load_config(path):
+    """
+    設定ファイルを読み込む。同じ内容のファイルは2回目以降キャッシュから返却する。
+    呼び出し元が変更してもキャッシュに影響しないよう複製を返却する。
+
+    引数
+        path    設定ファイルパス
+    戻り値
+        config  設定内容(辞書)
+    """
+    path = os.path.abspath(path)
+    return copy.deepcopy(_load(path, os.path.getmtime(path)))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+アナログスティックの応答曲線(エクスポネンシャル、デュアルレート、折れ線)と、
+正規化から応答曲線の適用までを event.value で添字付けした表引きへ置き換える正規化関数。
+
+応答曲線は設定ファイルの curves セクションでボタン名ごとに指定する。
+    expo    エクスポネンシャル(0～1、0で線形、大きいほど中央付近が鈍くなる)
+    rate    デュアルレート(出力の最大値、デフォルト1.0)
+    points  折れ線の頂点 [[入力, 出力], ...](入力がすべて0以上の場合は原点対称とみなす)
+    invert  出力の符号を反転するかどうか(デフォルトFalse)
+適用順は points, expo, rate, invert の順。
+
+表は設定ファイル上の event.value の最小値から最大値までの全整数値について
+1度だけ計算する(ゼロ範囲、中央値、按分もあわせて表へ埋め込まれる)。
+範囲外の値や整数以外の値は従来どおり計算して返却する。
+"""
+import bisect
+
+
+def response_curve(spec):
+    """
+    curves セクションのボタン1件分の指定から応答曲線を生成する。
+
+    引数
+        spec        {expo, rate, points, invert}(Noneの場合は線形)
+    戻り値
+        curve       正規化済みの値(-1～0～1)を受け取り、応答曲線適用後の値を返却する関数
+    """
+    spec = spec or {}
+    unknown = set(spec) - {'expo', 'rate', 'points', 'invert'}
+    if unknown:
+        raise ValueError('unknown curve keys: {}'.format(sorted(unknown)))
+    expo = float(spec.get('expo', 0.0))
+    if not 0.0 <= expo <= 1.0:
+        raise ValueError('expo must be in [0, 1]: {}'.format(expo))
+    rate = float(spec.get('rate', 1.0))
+    if rate <= 0.0:
+        raise ValueError('rate must be positive: {}'.format(rate))
+    scale = -rate if spec.get('invert') else rate
+    shape = _piecewise(spec['points']) if spec.get('points') else None
+
+    def curve(x):
+        if shape is not None:
+            x = shape(x)
+        if expo:
+            x = (1.0 - expo) * x + expo * x * x * x
+        return x * scale
+    return curve
+
+
+def _piecewise(points):
+    """
+    折れ線の頂点から折れ線関数を生成する。
+    入力がすべて0以上の場合は負の入力に対して原点対称に適用する。
+    頂点の範囲外は両端の出力値とする。
+    """
+    points = sorted((float(x), float(y)) for x, y in points)
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    if len(points) < 2 or len(set(xs)) != len(xs):
+        raise ValueError('points must have at least 2 distinct inputs: {}'.format(points))
+    if xs[0] < -1.0 or xs[-1] > 1.0:
+        raise ValueError('point inputs must be in [-1, 1]: {}'.format(xs))
+    symmetric = xs[0] >= 0.0
+    last = len(xs) - 1
+
+    def interpolate(x):
+        if x <= xs[0]:
+            return ys[0]
+        if x >= xs[last]:
+            return ys[last]
+        index = bisect.bisect_right(xs, x)
+        x0, x1 = xs[index - 1], xs[index]
+        y0, y1 = ys[index - 1], ys[index]
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+    if not symmetric:
+        return interpolate
+    return lambda x: -interpolate(-x) if x < 0.0 else interpolate(x)
+
+
+def table_normalizer(normalizer, low, high, curve):
+    """
+    正規化関数と応答曲線の合成を event.value で添字付けした表引きに置き換えた関数を生成する。
+
+    引数
+        normalizer  gamepad.decoder.analog_normalizer() で生成した正規化関数
+        low         表に含める event.value の最小値
+        high        表に含める event.value の最大値
+        curve       応答曲線(response_curve() の戻り値)
+    戻り値
+        normalize   正規化関数
+    """
+    low = int(low)
+    high = int(high)
+    table = [curve(normalizer(value)) for value in range(low, high + 1)]
+
+    def normalize(value):
+        if low <= value <= high:
+            try:
+                return table[value - low]
+            except TypeError:
+                pass
+        return curve(normalizer(value))
+    # ベクトル化処理(gamepad.vectorize)向けに表と線形部分のパラメータを保持
+    normalize.params = normalizer.params
+    normalize.table = table
+    normalize.low = low
+    return normalize
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+ボタン押下のエッジ検出とチャタリング除去。
+
+判定にはイベントのカーネルタイムスタンプを使用するため、
+イベント処理が遅れた場合でも実際の操作間隔で判定できる。
+設定ファイルの debounce セクションでボタン名ごとに間隔(秒)を指定する。
+
+debounce:
+  X: 0.25
+  B: 0.25
+
+押下/離脱イベントが発生するボタン(F710 Xinputモードの EV_KEY)は、
+離脱状態からの押下のみを押下として扱い、直前に通知した押下から
+間隔未満の押下は無視する。
+押下イベントのみが発生するボタン(F710 DirectInputモード/JC-U3912T の EV_MSC)は、
+直前の押下イベント(無視したものを含む)から間隔以上空いた押下のみを通知する。
+押し続けた場合のオートリピートやチャタリングは1回の押下として扱われる。
+"""
+
+
+class ButtonGate:
+    """
+    ボタン1つ分のエッジ検出、チャタリング除去を行うクラス。
+    """
+    def __init__(self, interval=0.25, press_only=False):
+        """
+        コンストラクタ。
+
+        引数
+            interval    押下とみなす最小間隔(秒、デフォルト0.25)
+            press_only  押下イベントのみが発生するボタンの場合True(デフォルトFalse)
+        戻り値
+            なし
+        """
+        self.interval = interval
+        self.press_only = press_only
+        # 直前の押下イベント、通知した押下のタイムスタンプ
+        self.last_press = None
+        self.last_accept = None
+        self.pressed = False
+        # 無視したイベント件数
+        self.suppressed = 0
+
+    def __call__(self, value, timestamp):
+        """
+        正規化済みの値を判定する。
+
+        引数
+            value       正規化済みの値(0: 離脱, それ以外: 押下)
+            timestamp   イベントのカーネルタイムスタンプ(エポック秒)
+        戻り値
+            value       通知する値(無視する場合None)
+        """
+        if value == 0:
+            # 離脱は状態が変わる場合のみ通知する
+            if not self.pressed:
+                self.suppressed += 1
+                return None
+            self.pressed = False
+            return value
+        if self.press_only:
+            last = self.last_press
+            self.last_press = timestamp
+            accept = last is None or timestamp - last >= self.interval
+        else:
+            accept = not self.pressed and (self.last_accept is None
+                or timestamp - self.last_accept >= self.interval)
+            self.pressed = True
+        if not accept:
+            self.suppressed += 1
+            return None
+        self.last_accept = timestamp
+        return value
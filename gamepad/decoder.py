@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+イベントデコードテーブル。
+
+設定ファイルの内容から (event.type, event.code) もしくは (event.type, event.value)
+をキーとし、ボタンIDと正規化関数の組を値とする辞書を起動時に1度だけ構築する。
+イベント1件あたりの処理は辞書検索1回と正規化関数呼び出し1回のみとなる。
+
+ボタンIDはテーブル構築時にボタン名ごとに0から順に採番する整数で、
+ボタン名(文字列)は設定ファイルと外部API(decode() や func_map)でのみ使用する。
+
+設定ファイルの debounce セクションで指定したボタンは、エントリにゲート
+(gamepad.debounce.ButtonGate)を付与し、カーネルタイムスタンプによる
+エッジ検出・チャタリング除去を行う。ゲートが無視したイベントは対象外イベントと同様に扱う。
+
+大半のイベント(アナログスティックなど)を1回の辞書検索で処理できるよう、
+ゲートを持たない event.code キーのエントリ(table)と、
+event.value をキーとするエントリ(value_table)、ゲートを持つエントリ(gated)は別の辞書に保持し、
+後者の2つは table に見つからなかった場合のみ検索する。
+"""
+from .debounce import ButtonGate
+
+
+class Decoder:
+    """
+    コンパイル済みイベントデコーダ。
+    """
+    def __init__(self):
+        """
+        コンストラクタ。空のデコードテーブルを生成する。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        # {(event.type, event.code): (ボタンID, 正規化関数)}(ゲートを持たないエントリ)
+        self.table = {}
+        # {(event.type, event.value): (ボタンID, 正規化関数, ゲートもしくはNone)}
+        self.value_table = {}
+        # {(event.type, event.code): (ボタンID, 正規化関数, ゲート)}
+        self.gated = {}
+        # event.value をキーとして扱う event.type の集合, gated にエントリを持つ event.type の集合
+        self.value_keyed = frozenset()
+        self.gated_types = frozenset()
+        # ボタンID順のボタン名, {ボタン名: ボタンID}
+        self.names = []
+        self.ids = {}
+
+    def button_id(self, name):
+        """
+        ボタン名に対応するボタンIDを返却する。未登録の場合は採番する。
+
+        引数
+            name        ボタン名
+        戻り値
+            button_id   ボタンID
+        """
+        button_id = self.ids.get(name)
+        if button_id is None:
+            button_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = button_id
+        return button_id
+
+    def add(self, event_type, code, name, normalizer):
+        """
+        event.code をキーとするエントリを追加する。
+
+        引数
+            event_type  event.type
+            code        event.code
+            name        ボタン名
+            normalizer  event.value を受け取り正規化済みの値を返却する関数
+        戻り値
+            なし
+        """
+        self._store((event_type, code), (self.button_id(name), normalizer, None))
+
+    def add_value_keyed(self, event_type, value, name, normalizer):
+        """
+        event.value をキーとするエントリを追加する(EV_MSCのスキャンコードなど)。
+
+        引数
+            event_type  event.type
+            value       event.value
+            name        ボタン名
+            normalizer  event.value を受け取り正規化済みの値を返却する関数
+        戻り値
+            なし
+        """
+        if event_type not in self.value_keyed:
+            self.value_keyed = self.value_keyed | {event_type}
+            # event.code をキーとして登録済みのエントリは参照されなくなるため value_table へ移す
+            for table in (self.table, self.gated):
+                for key in [key for key in table if key[0] == event_type]:
+                    entry = table.pop(key)
+                    self.value_table[key] = entry if len(entry) == 3 else entry + (None,)
+            self.gated_types = frozenset(key[0] for key in self.gated)
+        self._store((event_type, value), (self.button_id(name), normalizer, None))
+
+    def _store(self, key, entry):
+        """
+        エントリをキーの種類とゲートの有無に応じた辞書へ格納する。
+        """
+        if key[0] in self.value_keyed:
+            self.value_table[key] = entry
+        elif entry[2] is not None:
+            self.table.pop(key, None)
+            self.gated[key] = entry
+        else:
+            self.gated.pop(key, None)
+            self.table[key] = entry[:2]
+        self.gated_types = frozenset(key[0] for key in self.gated)
+
+    def entries(self):
+        """
+        全エントリを返却する。
+
+        引数
+            なし
+        戻り値
+            entries     {(event.type, event.code or event.value): (ボタンID, 正規化関数, ゲートもしくはNone)}
+        """
+        entries = {key: (button_id, normalizer, None)
+            for key, (button_id, normalizer) in self.table.items()}
+        entries.update(self.gated)
+        entries.update(self.value_table)
+        return entries
+
+    def set_debounce(self, name, interval):
+        """
+        ボタン名に対応する全エントリにエッジ検出・チャタリング除去のゲートを付与する。
+        押下時のみイベントが発生するボタン(press_normalizer)は押下間隔で判定する。
+
+        引数
+            name        ボタン名
+            interval    押下とみなす最小間隔(秒)
+        戻り値
+            gate        付与した gamepad.debounce.ButtonGate オブジェクト(未登録のボタン名の場合None)
+        """
+        button_id = self.ids.get(name)
+        if button_id is None:
+            return None
+        entries = [(key, entry) for key, entry in self.entries().items() if entry[0] == button_id]
+        press_only = any(entry[1] is press_normalizer for _, entry in entries)
+        gate = ButtonGate(interval, press_only=press_only)
+        for key, entry in entries:
+            self._store(key, (button_id, entry[1], gate))
+        return gate
+
+    def normalizers(self, name):
+        """
+        ボタン名に対応する全エントリの正規化関数を返却する。
+
+        引数
+            name        ボタン名
+        戻り値
+            normalizers 正規化関数のリスト(未登録のボタン名の場合空)
+        """
+        button_id = self.ids.get(name)
+        return [entry[1] for entry in self.entries().values() if entry[0] == button_id]
+
+    def replace_normalizer(self, name, replace):
+        """
+        ボタン名に対応する全エントリの正規化関数を差し替える。
+        複数のエントリで共有している正規化関数は差し替え後も共有する。
+
+        引数
+            name        ボタン名
+            replace     元の正規化関数を受け取り、差し替える正規化関数を返却する関数
+        戻り値
+            なし
+        """
+        button_id = self.ids.get(name)
+        replaced = {}
+        for key, (entry_id, normalizer, gate) in self.entries().items():
+            if entry_id != button_id:
+                continue
+            if id(normalizer) not in replaced:
+                replaced[id(normalizer)] = replace(normalizer)
+            self._store(key, (entry_id, replaced[id(normalizer)], gate))
+
+    def configure_debounce(self, config):
+        """
+        設定ファイルの debounce セクションの内容をもとにゲートを付与する。
+
+        引数
+            config      {ボタン名: 間隔(秒)}(Noneの場合は何もしない)
+        戻り値
+            gates       {ボタン名: gamepad.debounce.ButtonGate オブジェクト}
+        """
+        gates = {}
+        for name, interval in (config or {}).items():
+            gate = self.set_debounce(name, float(interval))
+            if gate is not None:
+                gates[name] = gate
+        return gates
+
+    def decode_id(self, event):
+        """
+        イベント1件をボタンID、値へ変換する。
+
+        引数
+            event       evdev.InputEvent オブジェクト
+        戻り値
+            button_id   対象のボタンID(対象外イベントの場合None)
+            val         正規化済みの値(対象外イベントの場合None)
+        """
+        event_type = event.type
+        entry = self.table.get((event_type, event.code))
+        if entry is not None:
+            return entry[0], entry[1](event.value)
+        # table に無いイベント(event.value をキーとするエントリ、ゲートを持つエントリ、対象外)
+        if event_type in self.value_keyed:
+            entry = self.value_table.get((event_type, event.value))
+        elif event_type in self.gated_types:
+            entry = self.gated.get((event_type, event.code))
+        else:
+            return None, None
+        if entry is None:
+            return None, None
+        button_id, normalizer, gate = entry
+        val = normalizer(event.value)
+        if gate is not None:
+            val = gate(val, event.sec + event.usec / 1000000.0)
+            if val is None:
+                return None, None
+        return button_id, val
+
+    def decode(self, event):
+        """
+        イベント1件をボタン名、値へ変換する。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            btn     対象のボタン名(対象外イベントの場合None)
+            val     正規化済みの値(対象外イベントの場合None)
+        """
+        # decode_id() と同じ処理(呼び出しを1段減らすため展開している)
+        event_type = event.type
+        entry = self.table.get((event_type, event.code))
+        if entry is not None:
+            return self.names[entry[0]], entry[1](event.value)
+        if event_type in self.value_keyed:
+            entry = self.value_table.get((event_type, event.value))
+        elif event_type in self.gated_types:
+            entry = self.gated.get((event_type, event.code))
+        else:
+            return None, None
+        if entry is None:
+            return None, None
+        button_id, normalizer, gate = entry
+        val = normalizer(event.value)
+        if gate is not None:
+            val = gate(val, event.sec + event.usec / 1000000.0)
+            if val is None:
+                return None, None
+        return self.names[button_id], val
+
+
+def analog_normalizer(zero_low, zero_high, middle, max_value, min_value):
+    """
+    アナログスティック用正規化関数を生成する。
+    (zero_low, zero_high) の開区間内の値は0、それ以外は middle を中心に
+    [-1, 1] の範囲へ按分する。
+
+    引数
+        zero_low    ゼロとみなす範囲の下限(この値自体は含まない)
+        zero_high   ゼロとみなす範囲の上限(この値自体は含まない)
+        middle      中央値
+        max_value   event.value の最大値
+        min_value   event.value の最小値
+    戻り値
+        normalizer  正規化関数
+    """
+    half_length = (max_value - min_value) / 2.0
+    # event.value は整数のため、比較は整数同士、減算は浮動小数点数で行えるよう型を揃える
+    zero_low, zero_high = (int(bound) if float(bound).is_integer() else bound
+        for bound in (zero_low, zero_high))
+    middle = float(middle)
+    def normalize(value):
+        if zero_low < value < zero_high:
+            return 0.0
+        return (value - middle) / half_length
+    # ベクトル化処理(gamepad.vectorize)向けにパラメータを保持
+    normalize.params = (zero_low, zero_high, middle, half_length)
+    return normalize
+
+
+def dpad_normalizer(value):
+    """
+    十字キー用正規化関数。-1,0,1 のいずれかをそのまま浮動小数点数で返却する。
+    """
+    return value * 1.0
+
+
+def button_normalizer(value):
+    """
+    EV_KEY ボタン用正規化関数。0 以外は 1 とする。
+    """
+    return 0 if value == 0 else 1
+
+
+def press_normalizer(value):
+    """
+    押下時のみイベントが発生するボタン用正規化関数。常に 1 を返却する。
+    """
+    return 1
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+接続中のイベントデバイスの検索。
+
+/dev/input/event* を1回だけ走査し、既知の全検索対象文字列に対して同時に分類する。
+検索対象文字列ごとに走査し直す必要がないため、起動時間を短縮できる。
+"""
+import os
+
+from evdev import InputDevice, list_devices
+
+from .jsdev import JoystickDevice
+
+
+def classify_devices(search_terms, paths=None, opener=InputDevice):
+    """
+    接続中の全イベントデバイスを1回の走査で検索対象文字列ごとに分類する。
+    どの検索対象文字列にも合致しないデバイスは閉じる。
+
+    引数
+        search_terms    検索対象文字列(小文字)のリスト
+        paths           走査対象デバイスパスのリスト(デフォルトNone→evdev.list_devices())
+        opener          パスからデバイスオブジェクトを生成する関数(デフォルトevdev.InputDevice)
+    戻り値
+        found           {検索対象文字列: [合致したデバイスオブジェクト]}
+    """
+    found = {term: [] for term in search_terms}
+    for path in (list_devices() if paths is None else paths):
+        try:
+            device = opener(path)
+        except OSError:
+            continue
+        name = device.name.lower()
+        matched = False
+        for term in search_terms:
+            if term in name:
+                found[term].append(device)
+                matched = True
+        if not matched:
+            device.close()
+    return found
+
+
+def single_device(devices):
+    """
+    合致したデバイスが1件のみの場合にそのデバイスを返却する。
+    0件もしくは複数件の場合は親クラス側の検索処理に委ねるためNoneを返却する。
+
+    引数
+        devices     デバイスオブジェクトのリスト
+    戻り値
+        device      デバイスオブジェクトもしくはNone
+    """
+    if len(devices) == 1:
+        return devices[0]
+    for device in devices:
+        device.close()
+    return None
+
+
+def open_device(device):
+    """
+    デバイスパスが指定された場合はデバイスを開く。
+    /dev/input/js* の場合は JoystickDevice、それ以外は evdev.InputDevice として開く。
+    デバイスオブジェクトもしくはNoneが指定された場合はそのまま返却する。
+
+    引数
+        device      デバイスパス、デバイスオブジェクトもしくはNone
+    戻り値
+        device      デバイスオブジェクトもしくはNone
+    """
+    if not isinstance(device, str):
+        return device
+    if os.path.basename(device).startswith('js'):
+        return JoystickDevice(device)
+    return InputDevice(device)
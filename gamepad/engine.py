@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+設定ファイルの decode セクションからデコードテーブルを構築する汎用デコードエンジン。
+
+イベント種別ごとの振り分け、value をキーとするボタン、アナログスティックの正規化、
+十字キーの扱いをすべて設定ファイルで記述するため、新しいゲームパッドは
+設定ファイルの追加のみで対応できる。構築は起動時に1回だけ行い、
+イベント処理は gamepad.decoder.Decoder の辞書引きのみとなる。
+
+decode:
+  # アナログスティックの正規化
+  # (zero - deadzone, zero + deadzone) の開区間内の値は0、それ以外は zero を中心に
+  # [-1, 1] の範囲へ按分する。未指定の項目は analog_stick_min_value, analog_stick_max_value,
+  # analog_stick_zero_value, analog_stick_epsilone の値を使用する。
+  analog: {min: 0, max: 255, zero: 128, deadzone: 1}
+  # イベント種別ごとの振り分け(上から順に登録)
+  routes:
+    - type: EV_ABS            # evdev.ecodes の名前もしくは数値
+      key: code               # ボタン名を引くキー(code もしくは value)
+      map: code_map           # {キー: ボタン名}(文字列の場合は同じ設定ファイル上のキー名)
+      normalize: analog       # analog, dpad, button(0以外は1), press(常に1)
+      dpad: dpad_target       # normalize を dpad とするボタン名のリスト(文字列の場合はキー名)
+      skip: button_map_target # 登録しないボタン名のリスト(文字列の場合はキー名)
+    - type: EV_MSC
+      key: value
+      map: button_map
+      normalize: press
+"""
+from evdev import ecodes
+
+from .decoder import Decoder, analog_normalizer, button_normalizer, dpad_normalizer, \
+    press_normalizer
+
+# normalize に指定できる analog 以外の正規化関数
+NORMALIZERS = {
+    'dpad': dpad_normalizer,
+    'button': button_normalizer,
+    'press': press_normalizer,
+}
+
+
+def _resolve(config, item, default):
+    """
+    文字列の場合は同じ設定ファイル上のキー名として値を引く。
+    """
+    if item is None:
+        return default
+    if isinstance(item, str):
+        return config.get(item, default)
+    return item
+
+
+def _event_type(name):
+    """
+    イベント種別名(EV_ABS など)を数値へ変換する。
+    """
+    if isinstance(name, int):
+        return name
+    if name not in ecodes.ecodes or not name.startswith('EV_'):
+        raise ValueError('unknown event type: {}'.format(name))
+    return ecodes.ecodes[name]
+
+
+def analog_domain(config, spec=None):
+    """
+    decode セクションの analog の値から analog_normalizer() の引数を求める。
+
+    引数
+        config      設定内容(辞書)
+        spec        decode セクション(デフォルトNone→config から取得)
+    戻り値
+        zero_low, zero_high, middle, max_value, min_value
+    """
+    spec = config.get('decode') if spec is None else spec
+    analog = (spec or {}).get('analog') or {}
+    min_value = analog.get('min', config.get('analog_stick_min_value', -32768))
+    max_value = analog.get('max', config.get('analog_stick_max_value', 32767))
+    zero = analog.get('zero', config.get('analog_stick_zero_value', (max_value + min_value) / 2.0))
+    deadzone = analog.get('deadzone', config.get('analog_stick_epsilone', 0))
+    return zero - deadzone, zero + deadzone, zero, max_value, min_value
+
+
+def compile_decoder(config, spec=None, analog=None):
+    """
+    decode セクションからデコードテーブルを構築する。
+
+    引数
+        config      設定内容(辞書、map などのキー名の参照先)
+        spec        decode セクション(デフォルトNone→config から取得)
+        analog      アナログスティックの正規化関数を生成する関数
+                    analog(ボタン名, zero_low, zero_high, middle, max_value, min_value)
+                    (デフォルトNone→gamepad.decoder.analog_normalizer)
+    戻り値
+        decoder     gamepad.decoder.Decoder オブジェクト
+    """
+    spec = config.get('decode') if spec is None else spec
+    if not spec or not spec.get('routes'):
+        raise ValueError('config has no decode routes')
+    domain = analog_domain(config, spec)
+    if analog is None:
+        analog = lambda btn, *domain: analog_normalizer(*domain)
+    # 同じボタン名を複数のキーへ割り当てた場合は正規化関数を共有する
+    shared = {}
+    decoder = Decoder()
+    for route in spec['routes']:
+        event_type = _event_type(route['type'])
+        key = route.get('key', 'code')
+        if key == 'code':
+            add = decoder.add
+        elif key == 'value':
+            add = decoder.add_value_keyed
+        else:
+            raise ValueError('unknown decode key: {}'.format(key))
+        kind = route.get('normalize', 'analog')
+        if kind != 'analog' and kind not in NORMALIZERS:
+            raise ValueError('unknown normalizer: {}'.format(kind))
+        dpad = set(_resolve(config, route.get('dpad'), []))
+        skip = set(_resolve(config, route.get('skip'), []))
+        for value, btn in _resolve(config, route.get('map'), {}).items():
+            if btn in skip:
+                continue
+            if btn in dpad:
+                normalizer = dpad_normalizer
+            elif kind == 'analog':
+                normalizer = shared.get(btn)
+                if normalizer is None:
+                    normalizer = shared[btn] = analog(btn, *domain)
+            else:
+                normalizer = NORMALIZERS[kind]
+            add(event_type, value, btn, normalizer)
+    return decoder
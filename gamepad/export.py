@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+func_map へ渡した全イベントの列形式チャンクファイルへの書き出しと、
+tub レコードのタイムスタンプへの整列。
+
+Vehicle の tub には1周期に1回 run_threaded() の戻り値のみが記録されるため、
+周期の間のスティック操作は失われる。EventExporter は gamepad.ring.EventRing を
+バックグラウンドスレッドで読み出し、(カーネルタイムスタンプ, ボタンID, 値) の各列を
+チャンク単位の NumPy ファイルへ書き出す。イベント処理スレッドはリングバッファへの
+書き込みのみを行うため、運転ループの処理は遅くならない。
+
+出力ディレクトリの構成は以下の通り。ボタンIDはディレクトリ内で共通とし、
+既存のディレクトリへ追記する場合は既存のボタン名の後ろへ新しいボタン名を追加する。
+  meta.json             {version, names: [ボタンIDの順のボタン名], chunks, events, dropped}
+  chunk_000000.npz      列 t(float64, エポック秒), button(uint16), value(float64),
+                        names(書き出し時点のボタンIDの順のボタン名)
+
+align は tub レコードのタイムスタンプごとにボタン名ごとの値を以下の方式で求める。
+  hold      直前のイベントの値(既定、イベントは値の変化時のみ発生するため実際の入力値と一致する)
+  linear    前後のイベントの値の線形補間
+  mean      直前のレコードからの区間の時間加重平均(周期内の操作を平均した値)
+
+numpy パッケージが必要。
+
+Usage:
+    export.py info <export_dir>
+    export.py align <export_dir> <tub_dir> <output> [--method=<name>] [--key=<name>] [--offset=<sec>] [--button=<name>]...
+
+Options:
+    -h --help           ヘルプ表示
+    --method=<name>     整列方式(hold, linear, mean) [default: hold]
+    --key=<name>        tub レコードのタイムスタンプのキー(デフォルト→_timestamp_ms もしくは milliseconds)
+    --offset=<sec>      tub のタイムスタンプへ加算する秒数 [default: 0]
+    --button=<name>     出力するボタン名(デフォルト→全ボタン)
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+from .ring import EventRing
+
+# 出力ディレクトリのフォーマットバージョン
+VERSION = 2
+META_NAME = 'meta.json'
+CHUNK_FORMAT = 'chunk_{:06d}.npz'
+METHODS = ('hold', 'linear', 'mean')
+
+
+class EventExporter:
+    """
+    リングバッファ上のイベントをチャンクファイルへ書き出すクラス。
+    """
+    def __init__(self, directory, ring=None, chunk=65536, interval=0.1):
+        """
+        コンストラクタ。出力ディレクトリを作成し、書き込みスレッドを開始する。
+
+        引数
+            directory   出力ディレクトリパス(既存のチャンクファイルがある場合は続きから追記する)
+            ring        読み出し元の gamepad.ring.EventRing オブジェクト(デフォルトNone→容量4096で生成)
+            chunk       1チャンクファイルあたりの最大イベント件数(デフォルト65536)
+            interval    リングバッファの読み出し間隔(秒、デフォルト0.1)
+        戻り値
+            なし
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.ring = EventRing(4096) if ring is None else ring
+        self.interval = interval
+        self.chunks = len(glob.glob(os.path.join(directory, 'chunk_*.npz')))
+        # 既存の出力のボタン名(ボタンIDの順)、イベント件数、破棄件数を引き継ぐ
+        meta = _load_meta(directory)
+        self.names = list(meta.get('names', []))
+        self.events = meta.get('events', 0)
+        self._dropped = meta.get('dropped', 0)
+        # リングバッファのボタンID → ディレクトリ内のボタンID
+        self._lookup = np.empty(0, dtype=np.uint16)
+        self._reader = self.ring.reader()
+        self._timestamps = np.empty(chunk, dtype=np.float64)
+        self._buttons = np.empty(chunk, dtype=np.uint16)
+        self._values = np.empty(chunk, dtype=np.float64)
+        self._fill = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='gamepad-export', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def dropped(self):
+        """
+        読み出しが追いつかずリングバッファ上で上書きされたイベント件数(本オブジェクトでの書き出し分)。
+        """
+        return self._reader.dropped
+
+    def _directory_ids(self):
+        """
+        リングバッファのボタンIDからディレクトリ内のボタンIDへの変換表を返却する。
+        リングバッファへ新しいボタン名が登録された場合は作り直す。
+        """
+        ring_names = list(self.ring.names)
+        if len(self._lookup) != len(ring_names):
+            for name in ring_names:
+                if name not in self.names:
+                    self.names.append(name)
+            self._lookup = np.array([self.names.index(name) for name in ring_names],
+                dtype=np.uint16)
+        return self._lookup
+
+    def _run(self):
+        """
+        書き込みスレッド本体。
+        """
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+        self._write_chunk()
+
+    def _drain(self):
+        """
+        リングバッファ上のイベントを全てチャンクへ移し、満杯のチャンクを書き出す。
+        """
+        size = len(self._timestamps)
+        while True:
+            fill = self._fill
+            count = self._reader.read_into(self._timestamps[fill:],
+                self._buttons[fill:], self._values[fill:])
+            self._fill += count
+            if self._fill == size:
+                self._write_chunk()
+            elif count == 0:
+                return
+
+    def _write_chunk(self):
+        """
+        チャンクファイル1個と meta.json を書き出す。
+        書き込み途中のファイルを読み込まないよう置き換えで保存する。
+        """
+        fill = self._fill
+        if fill == 0:
+            return
+        path = os.path.join(self.directory, CHUNK_FORMAT.format(self.chunks))
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, t=self._timestamps[:fill],
+                button=self._directory_ids()[self._buttons[:fill]],
+                value=self._values[:fill], names=np.array(self.names))
+        os.replace(path + '.tmp', path)
+        self.chunks += 1
+        self.events += fill
+        self._fill = 0
+        meta = {'version': VERSION, 'names': list(self.names),
+            'chunks': self.chunks, 'events': self.events, 'dropped': self._dropped + self.dropped}
+        temp = os.path.join(self.directory, META_NAME + '.tmp')
+        with open(temp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp, os.path.join(self.directory, META_NAME))
+
+    def close(self):
+        """
+        書き込みスレッドを停止し、残りのイベントを書き出す。
+        本メソッドはプロセス終了時にも自動で呼び出される。
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+
+def _load_meta(directory):
+    """
+    出力ディレクトリの meta.json を読み込む。存在しない場合は空の辞書を返却する。
+    """
+    path = os.path.join(directory, META_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_export(directory):
+    """
+    出力ディレクトリの全チャンクを読み込み、タイムスタンプ順に連結する。
+    ボタン名を持つチャンクはチャンク内のボタン名でボタンIDを解釈する。
+
+    引数
+        directory   出力ディレクトリパス
+    戻り値
+        timestamps  カーネルタイムスタンプ(エポック秒)の float64 配列
+        buttons     ボタンIDの uint16 配列
+        values      値の float64 配列
+        names       ボタンIDの順のボタン名のリスト
+    """
+    names = list(_load_meta(directory).get('names', []))
+    columns = {'t': [], 'button': [], 'value': []}
+    for path in sorted(glob.glob(os.path.join(directory, 'chunk_*.npz'))):
+        with np.load(path) as chunk:
+            for key, arrays in columns.items():
+                arrays.append(chunk[key])
+            if 'names' in chunk.files:
+                chunk_names = [str(name) for name in chunk['names']]
+                for name in chunk_names:
+                    if name not in names:
+                        names.append(name)
+                lookup = np.array([names.index(name) for name in chunk_names], dtype=np.uint16)
+                columns['button'][-1] = lookup[columns['button'][-1]]
+    if not columns['t']:
+        return np.empty(0), np.empty(0, dtype=np.uint16), np.empty(0), names
+    timestamps, buttons, values = (np.concatenate(columns[key]) for key in ('t', 'button', 'value'))
+    order = np.argsort(timestamps, kind='stable')
+    return timestamps[order], buttons[order], values[order], names
+
+
+def resample(timestamps, values, ticks, method='hold', initial=0.0):
+    """
+    1ボタン分のイベント列を指定時刻の値へ変換する。
+
+    引数
+        timestamps  イベントのタイムスタンプ(昇順)の配列
+        values      イベントの値の配列
+        ticks       値を求める時刻(昇順)の配列
+        method      hold, linear, mean のいずれか(デフォルトhold)
+        initial     最初のイベントより前の値(デフォルト0.0)
+    戻り値
+        resampled   ticks と同じ長さの float64 配列
+    """
+    ticks = np.asarray(ticks, dtype=np.float64)
+    if len(timestamps) == 0:
+        return np.full(len(ticks), initial, dtype=np.float64)
+    # 各時刻の直前のイベント番号(-1 は最初のイベントより前)
+    index = np.searchsorted(timestamps, ticks, side='right') - 1
+    held = np.where(index >= 0, values[np.maximum(index, 0)], initial)
+    if method == 'hold':
+        return held
+    if method == 'linear':
+        return np.where(index >= 0, np.interp(ticks, timestamps, values), initial)
+    if method != 'mean':
+        raise ValueError('unknown method: {}'.format(method))
+    # 階段関数の最初のイベントからの積分値を各イベント時刻で求めておき、区間の差分で平均する
+    steps = np.concatenate(([0.0], np.cumsum(np.diff(timestamps) * values[:-1])))
+    base = np.maximum(index, 0)
+    integral = np.where(index >= 0,
+        steps[base] + (ticks - timestamps[base]) * values[base],
+        (ticks - timestamps[0]) * initial)
+    widths = np.diff(ticks)
+    mean = held.copy()
+    valid = widths > 0
+    mean[1:][valid] = np.diff(integral)[valid] / widths[valid]
+    return mean
+
+
+def align(timestamps, buttons, values, names, ticks, method='hold', targets=None):
+    """
+    書き出したイベント列をボタン名ごとに指定時刻の値へ変換する。
+
+    引数
+        timestamps  load_export() の戻り値
+        buttons     load_export() の戻り値
+        values      load_export() の戻り値
+        names       load_export() の戻り値
+        ticks       値を求める時刻(エポック秒、昇順)の配列
+        method      hold, linear, mean のいずれか(デフォルトhold)
+        targets     対象のボタン名のリスト(デフォルトNone→全ボタン)
+    戻り値
+        aligned     {ボタン名: ticks と同じ長さの float64 配列}
+    """
+    if method not in METHODS:
+        raise ValueError('unknown method: {}'.format(method))
+    # ボタンIDごとに1回の安定ソートで分割する(各ボタン内のタイムスタンプ順は保たれる)
+    order = np.argsort(buttons, kind='stable')
+    bounds = np.searchsorted(buttons[order], np.arange(len(names) + 1))
+    aligned = {}
+    for button_id, name in enumerate(names):
+        if targets is not None and name not in targets:
+            continue
+        selected = order[bounds[button_id]:bounds[button_id + 1]]
+        aligned[name] = resample(timestamps[selected], values[selected], ticks, method)
+    return aligned
+
+
+def tub_timestamps(tub_dir, key=None):
+    """
+    tub のレコードのタイムスタンプ(エポック秒)をレコード順に返却する。
+    catalog_*.catalog(tub v2)もしくは record_*.json(tub v1)を読み込む。
+    key 未指定の場合は _timestamp_ms(エポックミリ秒)、なければ milliseconds
+    (meta.json の start からのミリ秒)を使用する。
+
+    引数
+        tub_dir     tub ディレクトリパス
+        key         タイムスタンプのキー(デフォルトNone)
+    戻り値
+        indexes     レコード番号の配列
+        ticks       タイムスタンプ(エポック秒)の float64 配列
+    """
+    records = []
+    catalogs = glob.glob(os.path.join(tub_dir, 'catalog_*.catalog'))
+    if catalogs:
+        for path in sorted(catalogs, key=lambda path: int(path.rsplit('_', 1)[1].split('.')[0])):
+            with open(path) as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+        indexes = [record.get('_index', number) for number, record in enumerate(records)]
+    else:
+        paths = glob.glob(os.path.join(tub_dir, 'record_*.json'))
+        numbered = sorted((int(os.path.basename(path)[7:-5]), path) for path in paths)
+        for _, path in numbered:
+            with open(path) as f:
+                records.append(json.load(f))
+        indexes = [number for number, _ in numbered]
+    if not records:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if key is None:
+        key = '_timestamp_ms' if '_timestamp_ms' in records[0] else 'milliseconds'
+    ticks = np.array([record[key] for record in records], dtype=np.float64)
+    if key == 'milliseconds':
+        with open(os.path.join(tub_dir, 'meta.json')) as f:
+            ticks = ticks / 1000.0 + json.load(f)['start']
+    elif key.endswith('_ms'):
+        ticks = ticks / 1000.0
+    return np.array(indexes, dtype=np.int64), ticks
+
+
+if __name__ == '__main__':
+    from docopt import docopt
+    args = docopt(__doc__)
+    timestamps, buttons, values, names = load_export(args['<export_dir>'])
+    if args['info']:
+        if len(timestamps) > 0:
+            print('[export] {} events, {:.3f} sec'.format(len(timestamps), timestamps[-1] - timestamps[0]))
+        for button_id, name in enumerate(names):
+            print('[export] {}: {} events'.format(name, int(np.count_nonzero(buttons == button_id))))
+    elif args['align']:
+        indexes, ticks = tub_timestamps(args['<tub_dir>'], args['--key'])
+        ticks = ticks + float(args['--offset'])
+        order = np.argsort(ticks, kind='stable')
+        aligned = align(timestamps, buttons, values, names, ticks[order],
+            args['--method'], args['--button'] or None)
+        columns = {name: np.empty(len(ticks)) for name in aligned}
+        for name, column in aligned.items():
+            columns[name][order] = column
+        np.savez(args['<output>'], index=indexes, t=ticks, **columns)
+        print('[export] {} records, {} buttons ({}) -> {}'.format(
+            len(ticks), len(columns), args['--method'], args['<output>']))
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+デコード後、func_map 呼び出し前に適用する入力フィルタ。
+
+設定ファイルの filters セクションでボタン名ごとにフィルタの並びを指定する。
+
+filters:
+  LEFT_STICK_X:
+    - {type: ema, alpha: 0.6}           # 指数平滑化
+    - {type: threshold, delta: 0.01}    # 前回通知値からの変化量が小さい場合は通知しない
+    - {type: rate_limit, max_hz: 100}   # 通知頻度の上限
+
+各フィルタは (値, タイムスタンプ) を受け取り、通知する値もしくは
+通知しない場合 None を返却する。ニュートラル(0)への復帰は常に通知する。
+
+スティックを保持している間はイベントが発生しないため、保留中の値や
+収束途中の値を持つフィルタ(ema, rate_limit)は flush() を持ち、次に flush() で
+値を返却できる時刻を next_flush() で返却する。GameController はイベントを待つ間も
+この時刻にタイムアウトして flush() を呼び出す。
+"""
+
+
+class ExponentialSmoothing:
+    """
+    指数平滑化フィルタ。
+    新しい入力がない間も settle 秒ごとに最新の入力値へ近づけ、最終的に一致させる。
+    """
+    def __init__(self, alpha=0.5, settle=0.02, epsilon=0.001):
+        """
+        コンストラクタ。
+
+        引数
+            alpha   最新値の重み(0より大きく1以下、デフォルト0.5)
+            settle  入力がない間に最新の入力値へ近づける間隔(秒、デフォルト0.02)
+            epsilon 最新の入力値との差がこの値未満になった場合は一致させる(デフォルト0.001)
+        戻り値
+            なし
+        """
+        self.alpha = alpha
+        self.settle = settle
+        self.epsilon = epsilon
+        self.value = None
+        # 最新の入力値、最後に値を更新したタイムスタンプ
+        self.target = None
+        self.last_time = None
+
+    def __call__(self, value, timestamp):
+        self.target = value
+        self.last_time = timestamp
+        # ニュートラルへの復帰は平滑化せず即座に反映する
+        if self.value is None or value == 0:
+            self.value = value
+        else:
+            self.value = self.alpha * value + (1.0 - self.alpha) * self.value
+        return self.value
+
+    def next_flush(self):
+        """
+        最新の入力値へ収束していない場合、次に flush() で値を返却する時刻を返却する。
+
+        引数
+            なし
+        戻り値
+            due     タイムスタンプ(収束済みの場合None)
+        """
+        if self.last_time is None or self.value == self.target:
+            return None
+        return self.last_time + self.settle
+
+    def flush(self, timestamp):
+        """
+        入力がないまま settle 秒経過していれば、最新の入力値へ1段階近づけた値を返却する。
+
+        引数
+            timestamp   現在のタイムスタンプ
+        戻り値
+            value       通知する値(なければNone)
+        """
+        due = self.next_flush()
+        if due is None or timestamp < due:
+            return None
+        value = self.alpha * self.target + (1.0 - self.alpha) * self.value
+        if abs(self.target - value) < self.epsilon:
+            value = self.target
+        self.value = value
+        self.last_time = timestamp
+        return value
+
+
+class ChangeThreshold:
+    """
+    前回通知した値からの変化量が閾値未満の場合は通知しないフィルタ。
+    """
+    def __init__(self, delta=0.01):
+        """
+        コンストラクタ。
+
+        引数
+            delta   通知する最小変化量(デフォルト0.01)
+        戻り値
+            なし
+        """
+        self.delta = delta
+        self.last = None
+
+    def __call__(self, value, timestamp):
+        last = self.last
+        if last is not None and abs(value - last) < self.delta \
+                and not (value == 0 and last != 0):
+            return None
+        self.last = value
+        return value
+
+
+class RateLimiter:
+    """
+    通知頻度の上限を設けるフィルタ。
+    間隔内に発生した値は保留し、間隔経過後の flush() で通知する。
+    """
+    def __init__(self, max_hz=100):
+        """
+        コンストラクタ。
+
+        引数
+            max_hz  1秒あたりの最大通知回数(デフォルト100)
+        戻り値
+            なし
+        """
+        self.interval = 1.0 / max_hz
+        self.last_time = None
+        self.pending = None
+
+    def __call__(self, value, timestamp):
+        if timestamp is None or self.last_time is None or value == 0 \
+                or timestamp - self.last_time >= self.interval:
+            self.last_time = timestamp
+            self.pending = None
+            return value
+        self.pending = value
+        return None
+
+    def next_flush(self):
+        """
+        保留中の値がある場合、flush() で値を返却できる時刻を返却する。
+
+        引数
+            なし
+        戻り値
+            due     タイムスタンプ(保留中の値がない場合None)
+        """
+        if self.pending is None:
+            return None
+        return self.last_time + self.interval
+
+    def flush(self, timestamp):
+        """
+        保留中の値があり、間隔が経過していれば返却する。
+
+        引数
+            timestamp   現在のタイムスタンプ
+        戻り値
+            value       通知する値(なければNone)
+        """
+        if self.pending is None or timestamp - self.last_time < self.interval:
+            return None
+        value = self.pending
+        self.pending = None
+        self.last_time = timestamp
+        return value
+
+
+# 設定ファイル上の type 名とフィルタクラスの対応
+FILTER_TYPES = {
+    'ema': ExponentialSmoothing,
+    'threshold': ChangeThreshold,
+    'rate_limit': RateLimiter,
+}
+
+
+class FilterPipeline:
+    """
+    1つのボタン名に適用するフィルタの並び。
+    """
+    def __init__(self, filters):
+        """
+        コンストラクタ。
+
+        引数
+            filters     フィルタオブジェクトのリスト(先頭から順に適用)
+        戻り値
+            なし
+        """
+        self.filters = filters
+
+    def __call__(self, value, timestamp):
+        """
+        フィルタを順に適用する。
+
+        引数
+            value       正規化済みの値
+            timestamp   イベントのタイムスタンプ
+        戻り値
+            value       通知する値(通知しない場合None)
+        """
+        for f in self.filters:
+            value = f(value, timestamp)
+            if value is None:
+                return None
+        return value
+
+    def next_flush(self):
+        """
+        フィルタのうち最も早く flush() で値を返却できる時刻を返却する。
+
+        引数
+            なし
+        戻り値
+            due     タイムスタンプ(該当するフィルタがない場合None)
+        """
+        due = None
+        for f in self.filters:
+            next_flush = getattr(f, 'next_flush', None)
+            if next_flush is None:
+                continue
+            time = next_flush()
+            if time is not None and (due is None or time < due):
+                due = time
+        return due
+
+    def flush(self, timestamp):
+        """
+        保留中の値を持つフィルタから値を取り出し、後続のフィルタを適用する。
+
+        引数
+            timestamp   現在のタイムスタンプ
+        戻り値
+            value       通知する値(なければNone)
+        """
+        for index, f in enumerate(self.filters):
+            flush = getattr(f, 'flush', None)
+            if flush is None:
+                continue
+            value = flush(timestamp)
+            if value is None:
+                continue
+            for following in self.filters[index + 1:]:
+                value = following(value, timestamp)
+                if value is None:
+                    break
+            return value
+        return None
+
+
+def build_filters(config):
+    """
+    設定ファイルの filters セクションからボタン名ごとのフィルタを生成する。
+
+    引数
+        config      {ボタン名: [{type: フィルタ種別, 引数名: 値, ...}, ...]}
+    戻り値
+        pipelines   {ボタン名: FilterPipeline オブジェクト}
+    """
+    pipelines = {}
+    for btn, specs in (config or {}).items():
+        filters = []
+        for spec in specs:
+            spec = dict(spec)
+            filter_type = spec.pop('type')
+            if filter_type not in FILTER_TYPES:
+                raise ValueError('unknown filter type: {}'.format(filter_type))
+            filters.append(FILTER_TYPES[filter_type](**spec))
+        pipelines[btn] = FilterPipeline(filters)
+    return pipelines
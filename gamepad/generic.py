@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+設定ファイルのみで動作する汎用ゲームパッド用partクラス。
+
+デバイスの検索対象文字列、デコードテーブル(decode セクション、gamepad.engine 参照)、
+func_map をすべて設定ファイルから読み込むため、新しいゲームパッドは
+設定ファイルを用意するだけで使用できる。
+
+# ボタン名: 呼び出すメソッド名
+func_map:
+  LEFT_STICK_X: update_angle
+  RIGHT_STICK_Y: update_throttle
+  X: toggle_recording
+  B: toggle_drive_mode
+"""
+from .config import load_config
+from .discovery import classify_devices, single_device, open_device
+from .part import GameController
+
+
+class JoystickController(GameController):
+    """
+    設定ファイルのみで動作する汎用コントローラクラス。
+    Vehiecleフレームワークに準拠している。
+    """
+    def __init__(self,
+        event_input_device=None,
+        config_path=None,
+        device_search_term=None,
+        verbose=False,
+        **kwargs):
+        """
+        コンストラクタ。
+        設定ファイルの内容からデバイスを検索し、func_map、デコードテーブルを構築する。
+
+        引数
+            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクトもしくはデバイスパス(デフォルトNone→device_search_termで検索する)
+            config_path           設定ファイルパス(必須)
+            device_search_term    検索対象文字列(デフォルトNone→設定ファイルの device_search_term)
+            verbose               デバッグモード(デフォルトFalse)
+            kwargs                その他 gamepad.GameController の引数(batch_read など)
+        戻り値
+            なし
+        """
+        if config_path is None:
+            raise ValueError('config_path is required')
+        if device_search_term is None:
+            device_search_term = load_config(config_path).get('device_search_term')
+        # デバイスパスが指定された場合はデバイスを開く(/dev/input/js* にも対応)
+        # 子プロセスで読み込む場合(isolate)は開かず、子プロセスで開く
+        if not kwargs.get('isolate'):
+            event_input_device = open_device(event_input_device)
+            if event_input_device is None:
+                # 接続中の全デバイスを1回だけ走査して検索
+                event_input_device = single_device(
+                    classify_devices([device_search_term])[device_search_term])
+
+        super(JoystickController, self).__init__(
+            event_input_device=event_input_device,
+            config_path=config_path,
+            device_search_term=device_search_term,
+            verbose=verbose,
+            **kwargs)
+
+        # アナログ/DPADの正負反転補正
+        self.y_axis_direction = self.config.get('axis_direction', -1)
+        # 独自関数マップ(key:ボタン名, value:呼び出すメソッド名)
+        func_map = self.config.get('func_map')
+        if func_map:
+            self.func_map = {btn: getattr(self, name) for btn, name in func_map.items()}
+
+        # デコードテーブルを構築
+        self.decoder = self._compile_decoder()
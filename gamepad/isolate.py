@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+イベントの読み込みとデコードを子プロセスで行うための関数群。
+
+カメラ入力や前処理、推論と同じプロセスで update() スレッドを動かすと、
+GIL の取り合いによりスティック操作の反映が数十ミリ秒遅れることがある。
+GameController(isolate=True) の場合は、同じ設定のコントローラを子プロセスで生成して
+イベントの読み込み、デコード、func_map の呼び出しを行い、操作状態を共有メモリ
+(gamepad.shm)経由で親プロセスへ返す。親プロセスの run_threaded() は共有メモリから
+最新の値を読み出すだけのため、親プロセスの負荷に影響されない。
+
+子プロセスは spawn で起動するため、コントローラクラス(もしくは生成関数)と
+その引数は pickle 可能である必要がある。
+
+親プロセスではデバイスを開かず(DeferredDevice)、ボタンの状態(state)も更新されない。
+親プロセスで参照できる操作状態は run_threaded() の戻り値のみとなる。
+"""
+import multiprocessing
+
+
+class DeferredDevice:
+    """
+    isolate モードの親プロセスでデバイスの代わりに保持するオブジェクト。
+    デバイスは開かず、子プロセスへ渡すデバイスパスのみを保持する。
+    """
+    fd = None
+
+    def __init__(self, device):
+        """
+        コンストラクタ。
+
+        引数
+            device      デバイスパス、デバイスオブジェクトもしくはNone(子プロセスで検索する)
+        戻り値
+            なし
+        """
+        self.path = device if device is None or isinstance(device, str) \
+            else getattr(device, 'path', None)
+
+    def close(self):
+        """
+        何もしない(デバイスを開いていないため)。
+        """
+
+
+def start_reader(factory, kwargs, shm_name):
+    """
+    読み込み用の子プロセスを起動する。
+
+    引数
+        factory     コントローラクラスもしくは生成関数
+        kwargs      factory へ渡す引数の辞書(shm は本関数で指定する)
+        shm_name    操作状態を書き込む共有メモリのブロック名
+    戻り値
+        process     multiprocessing.Process オブジェクト
+    """
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=_reader_main, args=(factory, kwargs, shm_name),
+        name='gamepad-reader', daemon=True)
+    process.start()
+    return process
+
+
+def _reader_main(factory, kwargs, shm_name):
+    """
+    子プロセス本体。コントローラを生成し、イベント待受ループを実行する。
+    """
+    ctl = factory(shm=shm_name, **kwargs)
+    ctl.update()
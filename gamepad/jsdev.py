@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+ジョイスティックキャラクタデバイス(/dev/input/js*)読み込み用バックエンド。
+
+起動時に ioctl で axis/ボタンの割り当て(ABS_*/BTN_* コード)を取得し、
+読み込み可能になった時点で溜まっている全イベントを事前確保したバッファへ一括で読み込み、
+struct.iter_unpack で展開する。展開したイベントは evdev.InputDevice と同じ
+(type, code, value) 形式へ変換するため、各コントローラのデコードテーブルと
+func_map をそのまま使用できる。
+
+fcntl パッケージを使用するため、Windows環境では動作しない。
+"""
+import array
+import os
+import select
+import struct
+import time
+
+from evdev import InputEvent, ecodes
+
+# ioctl 番号(linux/joystick.h)
+JSIOCGAXES = 0x80016a11
+JSIOCGBUTTONS = 0x80016a12
+JSIOCGNAME_BASE = 0x80006a13
+JSIOCGAXMAP = 0x80406a32
+JSIOCGBTNMAP = 0x80406a34
+
+# js_event 構造体(time[ms], value, type, number)
+JS_FORMAT = 'IhBB'
+JS_SIZE = struct.calcsize(JS_FORMAT)
+JS_EVENT_BUTTON = 0x01
+JS_EVENT_AXIS = 0x02
+JS_EVENT_INIT = 0x80
+
+# js ドライバが axis 値を変換する範囲
+JS_AXIS_MAX = 32767
+
+# HID ボタン1のスキャンコード(EV_MSC/MSC_SCAN の値)
+HID_BUTTON_SCAN_BASE = 0x90001
+
+
+def js_ranges(config):
+    """
+    設定ファイルから axis ごとの元の値の範囲を求める。
+    js ドライバは axis 値を [-32767, 32767] へ変換するため、
+    evdev と同じ値へ戻す際に使用する。
+    十字キーは [-1, 1]、trigger_button_target のボタンは
+    [trigger_button_release_value, trigger_button_push_value]、
+    それ以外はアナログスティックの範囲とする。
+
+    引数
+        config      設定内容(辞書)
+    戻り値
+        ranges      {ABSコード: (最小値, 最大値)}(設定ファイルに無いコードは含まない)
+    """
+    stick = (config.get('analog_stick_min_value', -32768),
+        config.get('analog_stick_max_value', 32767))
+    trigger = (config.get('trigger_button_release_value', 0),
+        config.get('trigger_button_push_value', 255))
+    dpad_target = config.get('dpad_target') or []
+    trigger_target = config.get('trigger_button_target') or []
+    code_map = config.get('ev_abs_code_map') or config.get('code_map') or {}
+    ranges = {}
+    for code, btn in code_map.items():
+        if btn in dpad_target:
+            ranges[code] = (-1, 1)
+        elif btn in trigger_target:
+            ranges[code] = trigger
+        else:
+            ranges[code] = stick
+    return ranges
+
+
+class JoystickDevice:
+    """
+    /dev/input/js* を evdev.InputDevice 互換のインターフェイスで読み込むクラス。
+    """
+    def __init__(self, path='/dev/input/js0', fd=None, name=None,
+        axis_map=None, button_map=None, buffer_events=64):
+        """
+        コンストラクタ。
+        デバイスを開き、ioctl でデバイス名と axis/ボタンの割り当てを取得する。
+        axis_map/button_map を指定した場合は ioctl を使用しない。
+
+        引数
+            path            ジョイスティックキャラクタデバイスパス(デフォルト'/dev/input/js0')
+            fd              オープン済みのファイルディスクリプタ(デフォルトNone→pathを開く)
+            name            デバイス名(デフォルトNone→ioctlで取得)
+            axis_map        js axis番号順の ABS_* コードのリスト(デフォルトNone→ioctlで取得)
+            button_map      js ボタン番号順の BTN_* コードのリスト(デフォルトNone→ioctlで取得)
+            buffer_events   一括読み込みするイベント件数の上限(デフォルト64)
+        戻り値
+            なし
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK) if fd is None else fd
+        self.name = name if name is not None else self._ioctl_name()
+        self.axis_map = axis_map if axis_map is not None else self._ioctl_axis_map()
+        self.button_map = button_map if button_map is not None else self._ioctl_button_map()
+        # 読み込み用バッファ(事前確保)
+        self._buffer = bytearray(JS_SIZE * buffer_events)
+        self._view = memoryview(self._buffer)
+        # js タイムスタンプ(ミリ秒)からエポックミリ秒への補正値(最初の読み込み時に決定)
+        self._epoch_offset = None
+        self._pending = []
+        # js 番号で添字付けした変換表(configure() で再構築)
+        self._compile({}, False)
+
+    def _ioctl(self, request, buf):
+        from fcntl import ioctl
+        ioctl(self.fd, request, buf)
+        return buf
+
+    def _ioctl_name(self):
+        buf = self._ioctl(JSIOCGNAME_BASE + (0x10000 * 64), array.array('B', [0] * 64))
+        return buf.tobytes().split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+    def _ioctl_axis_map(self):
+        num_axes = self._ioctl(JSIOCGAXES, array.array('B', [0]))[0]
+        return list(self._ioctl(JSIOCGAXMAP, array.array('B', [0] * 0x40))[:num_axes])
+
+    def _ioctl_button_map(self):
+        num_buttons = self._ioctl(JSIOCGBUTTONS, array.array('B', [0]))[0]
+        return list(self._ioctl(JSIOCGBTNMAP, array.array('H', [0] * 200))[:num_buttons])
+
+    def configure(self, config):
+        """
+        設定ファイルの内容から値の変換方法を設定する。
+        ボタンを EV_KEY で扱わない設定(EV_MSCのスキャンコードで扱う設定)の場合は、
+        js ボタン番号 n を HID スキャンコード 0x90001 + n として通知する。
+
+        引数
+            config      設定内容(辞書)
+        戻り値
+            なし
+        """
+        self._compile(js_ranges(config), not config.get('ev_key_code_map'))
+
+    def _compile(self, ranges, msc_buttons):
+        """
+        js axis/ボタン番号で添字付けした変換表を構築する。
+        axis は (ABSコード, 最小値, 1あたりの増分)、
+        ボタンは (event.type, event.code, 固定の event.value もしくはNone) とする。
+        範囲が設定されていない axis はアナログスティックのデフォルトの範囲とする。
+        """
+        self._axes = []
+        for code in self.axis_map:
+            min_value, max_value = ranges.get(code, (-32768, 32767))
+            self._axes.append((code, min_value, (max_value - min_value) / (2.0 * JS_AXIS_MAX)))
+        if msc_buttons:
+            # js ボタン番号は1バイトのため全番号分を用意
+            self._buttons = [(ecodes.EV_MSC, ecodes.MSC_SCAN, HID_BUTTON_SCAN_BASE + number)
+                for number in range(256)]
+        else:
+            self._buttons = [(ecodes.EV_KEY, code, None) for code in self.button_map]
+
+    def read(self):
+        """
+        溜まっている全イベント(最大 buffer_events 件)を一括で読み込む。
+        読み込めるイベントが存在しない場合は BlockingIOError を送出する。
+
+        引数
+            なし
+        戻り値
+            events      evdev.InputEvent オブジェクトのリスト
+        """
+        # read_one() で読み込み済みのイベントを優先
+        if self._pending:
+            events = self._pending[::-1]
+            self._pending = []
+            return events
+        size = os.readv(self.fd, [self._buffer])
+        size -= size % JS_SIZE
+        if size and self._epoch_offset is None:
+            self._epoch_offset = int(time.time() * 1000) - struct.unpack_from(JS_FORMAT, self._buffer)[0]
+        # 変換は1件ごとのメソッド呼び出しを避けるためここへ展開している
+        offset = self._epoch_offset
+        ev_abs = ecodes.EV_ABS
+        axes = self._axes
+        buttons = self._buttons
+        num_axes = len(axes)
+        num_buttons = len(buttons)
+        events = []
+        append = events.append
+        for tval, value, js_type, number in struct.iter_unpack(JS_FORMAT, self._view[:size]):
+            sec, msec = divmod(offset + tval, 1000)
+            if js_type & JS_EVENT_AXIS:
+                if number < num_axes:
+                    code, min_value, step = axes[number]
+                    append(InputEvent(sec, msec * 1000, ev_abs, code,
+                        round(min_value + (value + JS_AXIS_MAX) * step)))
+            elif js_type & JS_EVENT_BUTTON:
+                if number >= num_buttons:
+                    continue
+                event_type, code, fixed = buttons[number]
+                if fixed is None:
+                    # 起動時の初期状態通知のうち未押下のものは押下イベントと区別できないため除外
+                    if not (js_type & JS_EVENT_INIT and value == 0):
+                        append(InputEvent(sec, msec * 1000, event_type, code, value))
+                # evdev は押下時のみスキャンコードを通知するため、離脱(value 0)は除外
+                elif value:
+                    append(InputEvent(sec, msec * 1000, event_type, code, fixed))
+        return events
+
+    def read_one(self):
+        """
+        イベントを1件返却する。読み込めるイベントが存在しない場合はNoneを返却する。
+        """
+        if not self._pending:
+            try:
+                self._pending = self.read()
+            except BlockingIOError:
+                return None
+            self._pending.reverse()
+        return self._pending.pop() if self._pending else None
+
+    def read_loop(self):
+        """
+        イベントを1件ずつ返却するジェネレータ。イベントが存在しない場合は待機する。
+        """
+        while True:
+            event = self.read_one()
+            if event is None:
+                select.select([self.fd], [], [])
+                continue
+            yield event
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        """
+        デバイスを閉じる。
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
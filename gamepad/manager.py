@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+複数のゲームパッドを1つのスレッドで待ち受けるマネージャpart。
+
+各コントローラのイベントデバイスのfdを selectors(Linuxでは epoll)へ登録し、
+読み込み可能になったデバイスのイベントのみをまとめて読み込む。
+イベントはデバイスごとのコントローラ(設定ファイル、デコードテーブル、func_map)で処理する。
+デバイスごとにスレッドを用意する必要がないため、台数が増えてもスレッド切り替えが増えない。
+
+切断されたデバイスの再接続は別スレッドで行い、他のデバイスの処理は継続する。
+"""
+import importlib
+import os
+import selectors
+import threading
+import time
+
+from .batch import coalesce_events
+from .discovery import classify_devices
+
+# discover_controllers() で検索するベンダーパッケージ
+# 各パッケージの part モジュールは SEARCH_TERMS と JoystickController を持つ
+DEFAULT_VENDORS = ('logicool', 'elecom')
+
+
+def discover_controllers(vendors=DEFAULT_VENDORS, **kwargs):
+    """
+    接続中の全イベントデバイスを1回だけ走査し、各ベンダーパッケージの
+    検索対象文字列に合致したデバイスごとにコントローラを生成する。
+
+    引数
+        vendors     ベンダーパッケージ名のリスト(デフォルト logicool, elecom)
+        kwargs      各 JoystickController のコンストラクタへ渡すその他の引数
+    戻り値
+        controllers JoystickController オブジェクトのリスト
+    """
+    factories = {}
+    for vendor in vendors:
+        module = importlib.import_module(vendor + '.part')
+        for term in module.SEARCH_TERMS:
+            factories[term] = module.JoystickController
+    found = classify_devices(list(factories))
+    controllers = []
+    for term, devices in found.items():
+        for device in devices:
+            controllers.append(factories[term](event_input_device=device, **kwargs))
+    return controllers
+
+
+class ControllerManager:
+    """
+    複数のコントローラを1つの selectors ループで処理するpartクラス。
+    run_threaded() は最後に操作されたコントローラの値を返却するため、
+    複数のゲームパッド間で操作を引き継ぐことができる。
+    操作とみなすのは func_map 上の関数へ中立(0)以外の値を渡した場合のみで、
+    EV_SYN、あそびの範囲内の揺らぎ、func_map にないボタン、入力フィルタで除外された値では
+    引き継がない(机上の予備のゲームパッドが操作を奪わない)。
+    """
+    def __init__(self, controllers, batch_read=True):
+        """
+        コンストラクタ。各コントローラのデバイスのfdを登録する。
+        デバイスは select 可能なfdを持つ必要があるため、isolate を指定したコントローラ
+        (子プロセスで読み込む)や、fdを持たない再生デバイス(gamepad.replay.ReplayDevice)を
+        使用するコントローラは管理できない。
+
+        引数
+            controllers     GameController オブジェクトのリスト(デバイスはfdを持つこと)
+            batch_read      同一axisのイベントを最新値にまとめるかどうか(デフォルトTrue)
+        戻り値
+            なし
+        """
+        if len(controllers) == 0:
+            raise ValueError('no controllers to manage')
+        for ctl in controllers:
+            if getattr(ctl, 'isolate', False):
+                raise ValueError('controllers with isolate read in their own process '
+                    'and cannot be managed: {}'.format(getattr(ctl.device, 'path', None)))
+            fd = getattr(ctl.device, 'fd', None)
+            if not isinstance(fd, int) or fd < 0:
+                raise ValueError('device has no file descriptor to select on: {}'.format(
+                    getattr(ctl.device, 'name', ctl.device)))
+        self.controllers = list(controllers)
+        self.batch_read = batch_read
+        # 最後に操作されたコントローラの位置
+        self.active = 0
+        self.running = True
+        self._closed = False
+        self._thread = None
+        self._selector = selectors.DefaultSelector()
+        # 再接続完了、停止要求の通知用パイプ
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self._reconnected = []
+        self._lock = threading.Lock()
+        for index in range(len(self.controllers)):
+            self._register(index)
+
+    def _register(self, index):
+        """
+        コントローラのデバイスのfdを登録する。
+        """
+        self._selector.register(self.controllers[index].device.fd,
+            selectors.EVENT_READ, index)
+
+    def poll(self, timeout=None):
+        """
+        読み込み可能になったデバイスのイベントを処理する。
+
+        引数
+            timeout     待機上限秒数(デフォルトNone→いずれかが読み込み可能になるまで待機)
+        戻り値
+            count       処理したイベント件数
+        """
+        count = 0
+        for key, _ in self._selector.select(timeout):
+            index = key.data
+            if index is None:
+                self._drain_wakeup()
+                continue
+            ctl = self.controllers[index]
+            try:
+                events = list(ctl.device.read())
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                self._selector.unregister(key.fd)
+                threading.Thread(target=self._reconnect, args=(index, e),
+                    name='gamepad-reconnect-{}'.format(index), daemon=True).start()
+                continue
+            if self.batch_read:
+                events = coalesce_events(events)
+            engaged = ctl.engaged
+            for event in events:
+                ctl.dispatch_event(event)
+            if ctl.engaged != engaged:
+                self.active = index
+            count += len(events)
+        return count
+
+    def _reconnect(self, index, error):
+        """
+        再接続スレッド本体。再接続後にイベントループへ通知する。
+        """
+        self.controllers[index]._reconnect(error)
+        with self._lock:
+            if self._closed:
+                return
+            self._reconnected.append(index)
+            os.write(self._wakeup_w, b'\0')
+
+    def _drain_wakeup(self):
+        """
+        通知を読み捨て、再接続したデバイスを登録し直す。
+        """
+        try:
+            while os.read(self._wakeup_r, 64):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            reconnected, self._reconnected = self._reconnected, []
+        for index in reconnected:
+            self._register(index)
+
+    def update(self):
+        """
+        スレッドで実行されるイベント待受ループ。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        self._thread = threading.current_thread()
+        while self.running:
+            # 入力フィルタが値を保留している間は期限までに待受を打ち切り、保留中の値を通知する
+            due = self._next_flush()
+            self.poll(None if due is None else max(0.0, due - time.time()))
+            if due is not None:
+                self.flush()
+
+    def _next_flush(self):
+        """
+        全コントローラの入力フィルタが保留中の値を通知できる最も早い時刻を返却する。
+        """
+        times = [ctl._next_flush() for ctl in self.controllers if ctl._flushable]
+        times = [due for due in times if due is not None]
+        return min(times) if times else None
+
+    def flush(self):
+        """
+        入力フィルタの保留中の値のうち、通知時刻に達したものを通知する。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        now = time.time()
+        for ctl in self.controllers:
+            if ctl._flushable:
+                ctl._flush_filters(now)
+
+    def run_threaded(self, img_arr=None):
+        """
+        最後に操作されたコントローラの run_threaded() の値を返却する。
+
+        引数
+            img_arr     未使用
+        戻り値
+            outputs     対象コントローラの run_threaded() の戻り値
+        """
+        return self.controllers[self.active].run_threaded(img_arr)
+
+    def outputs(self):
+        """
+        全コントローラの run_threaded() の値を返却する。
+
+        引数
+            なし
+        戻り値
+            outputs     各コントローラの run_threaded() の戻り値のリスト
+        """
+        return [ctl.run_threaded() for ctl in self.controllers]
+
+    def shutdown(self):
+        """
+        イベント待受ループを停止し、ループの終了を待ってから
+        各コントローラを停止して selector と通知用パイプを閉じる。
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self.running = False
+            os.write(self._wakeup_w, b'\0')
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._lock:
+            self._closed = True
+            self._selector.close()
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+        for ctl in self.controllers:
+            ctl.shutdown()
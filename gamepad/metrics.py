@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+イベント処理の計測値(カウンタ、処理段ごとの遅延ヒストグラム)。
+
+コントローラを metrics 指定付きで生成した場合のみ計測版のイベント処理が使用される。
+指定しない場合は計測処理を一切経由しないため、処理負荷は増えない。
+
+計測する遅延は以下の2段。
+  kernel_to_decode      カーネルタイムスタンプ → デコード完了(エポック時刻で比較)
+  decode_to_dispatch    デコード完了 → 入力フィルタ、func_map 呼び出し完了
+"""
+import json
+import time
+
+from evdev import ecodes
+
+
+class LatencyHistogram:
+    """
+    HDR(High Dynamic Range)形式の遅延ヒストグラム。
+    ナノ秒単位の整数値を、2のべき乗ごとの区間を 2**(significant_bits-1) 個に
+    等分したバケットで数える。相対誤差は 1/2**(significant_bits-1) 以下となる。
+    """
+    def __init__(self, significant_bits=5):
+        """
+        コンストラクタ。
+
+        引数
+            significant_bits    バケット分割の有効ビット数(デフォルト5→相対誤差1/16以下)
+        戻り値
+            なし
+        """
+        self.significant_bits = significant_bits
+        self._linear = 1 << significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self.reset()
+
+    def reset(self):
+        """
+        記録済みの値を全て破棄する。
+        """
+        self.counts = [0] * self._linear
+        self.count = 0
+        self.total = 0
+
+    def _upper(self, index):
+        """
+        バケット番号に対応する値の上限(ナノ秒)を返却する。
+        """
+        if index < self._linear:
+            return index
+        shift, top = divmod(index - self._linear, self._half)
+        shift += 1
+        return ((top + self._half + 1) << shift) - 1
+
+    def record(self, value):
+        """
+        値を1件記録する。負の値(時計のずれ)は0として扱う。
+
+        引数
+            value       遅延(ナノ秒、整数)
+        戻り値
+            なし
+        """
+        if value < 0:
+            value = 0
+        if value < self._linear:
+            index = value
+        else:
+            shift = value.bit_length() - self.significant_bits
+            index = self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def _bounds(self):
+        """
+        値が記録されている最小、最大のバケット番号を返却する。
+        """
+        indexes = [index for index, count in enumerate(self.counts) if count]
+        return indexes[0], indexes[-1]
+
+    def percentile(self, p):
+        """
+        パーセンタイル値を返却する。
+
+        引数
+            p       パーセンタイル(0～100)
+        戻り値
+            value   遅延(秒、記録がない場合None)
+        """
+        if self.count == 0:
+            return None
+        target = max(1, int(self.count * p / 100.0 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                break
+        return self._upper(index) / 1e9
+
+    def to_dict(self):
+        """
+        集計値を辞書で返却する(単位は秒、min/max はバケット上限値)。
+
+        引数
+            なし
+        戻り値
+            summary     count, min, mean, p50, p90, p99, max をキーとする辞書
+        """
+        if self.count == 0:
+            return {'count': 0}
+        lowest, highest = self._bounds()
+        return {
+            'count': self.count,
+            'min': self._upper(lowest) / 1e9,
+            'mean': self.total / self.count / 1e9,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self._upper(highest) / 1e9,
+        }
+
+
+class Metrics:
+    """
+    コントローラ1台分の計測値。
+    """
+    def __init__(self, dump_interval=None, dump=None):
+        """
+        コンストラクタ。
+
+        引数
+            dump_interval   計測値を出力する間隔(秒、デフォルトNone→出力しない)
+            dump            計測値の辞書を受け取る出力関数(デフォルトNone→JSONで標準出力へ表示)
+        戻り値
+            なし
+        """
+        self.dump_interval = dump_interval
+        self.dump = dump or _print_metrics
+        self._next_dump = None if dump_interval is None else time.monotonic() + dump_interval
+        self.reset()
+
+    def reset(self):
+        """
+        計測値を全て破棄する。
+        """
+        # {event.type: 件数}
+        self.events = {}
+        # {ボタン名: デコード件数}
+        self.buttons = {}
+        # デコードテーブルに存在しないイベント件数(EV_SYN を含む)
+        self.unmapped = 0
+        # 入力フィルタにより func_map を呼び出さなかった件数
+        self.filtered = 0
+        # 再接続回数
+        self.reconnects = 0
+        self.kernel_to_decode = LatencyHistogram()
+        self.decode_to_dispatch = LatencyHistogram()
+
+    def count_event(self, event_type, btn):
+        """
+        イベント1件を数える。
+
+        引数
+            event_type  event.type
+            btn         デコード後のボタン名(対象外の場合None)
+        戻り値
+            なし
+        """
+        events = self.events
+        events[event_type] = events.get(event_type, 0) + 1
+        if btn is None:
+            self.unmapped += 1
+        else:
+            buttons = self.buttons
+            buttons[btn] = buttons.get(btn, 0) + 1
+
+    def to_dict(self):
+        """
+        計測値を辞書で返却する。event.type は EV_* 名で表す。
+
+        引数
+            なし
+        戻り値
+            metrics     計測値の辞書
+        """
+        return {
+            'events': {_event_type_name(t): n for t, n in self.events.items()},
+            'buttons': dict(self.buttons),
+            'unmapped': self.unmapped,
+            'filtered': self.filtered,
+            'reconnects': self.reconnects,
+            'kernel_to_decode': self.kernel_to_decode.to_dict(),
+            'decode_to_dispatch': self.decode_to_dispatch.to_dict(),
+        }
+
+    def maybe_dump(self, now=None):
+        """
+        出力間隔が経過していれば計測値を出力する。
+
+        引数
+            now     現在時刻(time.monotonic()、デフォルトNone→取得する)
+        戻り値
+            なし
+        """
+        if self._next_dump is None:
+            return
+        now = time.monotonic() if now is None else now
+        if now >= self._next_dump:
+            self._next_dump = now + self.dump_interval
+            self.dump(self.to_dict())
+
+
+def _event_type_name(event_type):
+    """
+    event.type を EV_* 名へ変換する。
+    """
+    return ecodes.EV.get(event_type, str(event_type))
+
+
+def _print_metrics(metrics):
+    """
+    デフォルトの出力関数。
+    """
+    print('[metrics] {}'.format(json.dumps(metrics, sort_keys=True)))
@@ -0,0 +1,831 @@
+# -*- coding: utf-8 -*-
+"""
+各社ゲームパッド用partクラスの共通基底クラス。
+donkeypart_bluetooth_game_controller パッケージのクラスを基底クラスとして使用するため、
+先にインストールしておく必要がある。
+
+git clone https://github.com/autorope/donkeypart_bluetooth_game_controller.git
+cd donkeypart_bluetooth_game_controller
+pip install -e .
+
+イベント1件の解釈は設定ファイルの decode セクションから汎用デコードエンジン
+(gamepad.engine)で構築したデコードテーブル(gamepad.decoder.Decoder)で行い、
+デバイスからの読み込み方式や func_map への振り分けは本クラスで共通化している。
+"""
+import os
+import select
+import sys
+import time
+
+from donkeypart_bluetooth_game_controller import BluetoothGameController
+
+from .batch import drain_events, coalesce_events
+from .calibration import Calibrator, apply_calibration, cache_path, load_calibration
+from .config import load_config
+from .curves import response_curve, table_normalizer
+from .decoder import analog_normalizer
+from .engine import compile_decoder
+from .discovery import open_device
+from .filters import build_filters
+from .isolate import DeferredDevice, start_reader
+from .jsdev import JoystickDevice
+from .metrics import Metrics
+from .reconnect import Reconnector
+from .ring import EventRing
+from .shm import StatePublisher, StateReader
+from .state import ControlSnapshot, ControllerState, input_age
+from .trace import TraceLog
+
+
+class GameController(BluetoothGameController):
+    """
+    ゲームパッド用partクラスの共通基底クラス。
+    サブクラスは初期化処理の最後に self.decoder へデコードテーブルを格納する。
+    格納時にボタンIDで添字付けした状態、func_map、入力フィルタの配列を構築する。
+    """
+    def __init__(self,
+        event_input_device=None,
+        config_path=None,
+        device_search_term=None,
+        verbose=False,
+        batch_read=False,
+        report_input_age=False,
+        metrics=None,
+        report_metrics=False,
+        trace=None,
+        ring=None,
+        shm=None,
+        isolate=False,
+        calibrate=False,
+        export=None):
+        """
+        コンストラクタ。
+        親クラスの初期化処理を実行後、読み込み方式を設定する。
+
+        引数
+            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクトもしくはデバイスパス
+                                  (/dev/input/js* の場合は JoystickDevice を使用、デフォルトNone→device_search_termで検索する)
+            config_path           設定ファイルパス(デフォルトNone)
+            device_search_term    検索対象文字列(デフォルトNone)
+            verbose               デバッグモード(デフォルトFalse、trace 未指定の場合は標準出力へトレースを表示)
+            batch_read            まとめ読みモード(デフォルトFalse)
+            report_input_age      run_threaded() の戻り値に入力経過秒数を追加するかどうか(デフォルトFalse)
+            metrics               計測を行う場合 True もしくは gamepad.metrics.Metrics オブジェクト(デフォルトNone)
+            report_metrics        run_threaded() の戻り値に計測値の辞書を追加するかどうか(デフォルトFalse)
+            trace                 トレースログ出力先ファイルパスもしくは gamepad.trace.TraceLog オブジェクト(デフォルトNone)
+            ring                  デコード済みイベントを書き込むリングバッファの容量もしくは
+                                  gamepad.ring.EventRing オブジェクト(デフォルトNone→使用しない)
+            shm                   操作状態を公開する共有メモリのブロック名もしくは
+                                  gamepad.shm.StatePublisher オブジェクト(デフォルトNone→公開しない、
+                                  True の場合は'gamepad_state')
+            isolate               イベントの読み込みとデコードを子プロセスで行う場合 True もしくは
+                                  子プロセスでコントローラを生成する関数(デフォルトFalse、
+                                  ring, metrics, trace, export とは併用できない、
+                                  親プロセスではデバイスを開かず state も更新されないため
+                                  操作状態は run_threaded() の戻り値から参照すること)
+            calibrate             アナログスティックの中央値、可動範囲、あそびを学習するかどうか
+                                  (デフォルトFalse、学習結果は設定ファイルと同じディレクトリへ保存する)
+            export                func_map へ渡したイベントを書き出すディレクトリパスもしくは
+                                  gamepad.export.EventExporter オブジェクト(デフォルトNone→書き出さない、
+                                  numpy パッケージが必要)
+        戻り値
+            なし
+        """
+        # 子プロセスで読み込む場合、親プロセスではデバイスを開かない
+        super(GameController, self).__init__(
+            event_input_device=DeferredDevice(event_input_device) if isolate
+                else open_device(event_input_device),
+            config_path=config_path,
+            device_search_term=device_search_term,
+            verbose=verbose)
+        if isolate and (ring is not None or metrics or trace is not None or export is not None):
+            raise ValueError('ring, metrics, trace and export are not available with isolate')
+        self.config_path = config_path
+        # アナログスティックのキャリブレーション結果(正規化関数の構築時に反映)
+        calibration_path = cache_path(config_path) if config_path is not None else None
+        self.calibration = load_calibration(calibration_path)
+        self.calibrator = Calibrator(calibration_path, self.calibration) \
+            if calibrate and calibration_path is not None else None
+        # True の場合 update() はfd上の全イベントをまとめて処理する
+        self.batch_read = batch_read
+        # デコードテーブル(サブクラスで構築)
+        self.decoder = None
+        # トレースログ(書き込みはバックグラウンドスレッドで行う)
+        if trace is None and verbose and not isolate:
+            trace = TraceLog(sys.stdout, text=True)
+        elif isinstance(trace, str):
+            trace = TraceLog(trace)
+        self.trace = trace
+        # デコード済みイベントのリングバッファ(複数コントローラで共有可能)
+        self.ring = EventRing(ring) if isinstance(ring, int) else ring
+        # リングバッファ上のイベントをバックグラウンドスレッドでチャンクファイルへ書き出す
+        if isinstance(export, str):
+            from .export import EventExporter
+            export = EventExporter(export, self.ring)
+        if export is not None and self.ring is None:
+            self.ring = export.ring
+        self.export = export
+        # 別プロセス向けに操作状態を書き込む共有メモリ
+        if shm is True:
+            shm = StatePublisher()
+        elif isinstance(shm, str):
+            shm = StatePublisher(shm)
+        # 子プロセスで読み込む場合は子プロセスが書き込んだ共有メモリから値を読み出す
+        self.isolate = isolate
+        self.process = None
+        self._stopped = False
+        self._reader = None
+        self._own_shm = None
+        if isolate:
+            if shm is None:
+                # 終了時に削除するプロセス固有のブロック
+                shm = self._own_shm = StatePublisher(
+                    'gamepad_state_{}_{}'.format(os.getpid(), id(self)))
+            self._reader = StateReader(shm.name)
+        self.shm = shm
+        # ジョイスティックキャラクタデバイスの場合は設定ファイルから値の変換方法を設定
+        if isinstance(self.device, JoystickDevice):
+            self.device.configure(self.config)
+            self.reconnector = Reconnector(self.device_search_term,
+                opener=self._open_js_device, prefix='js')
+        else:
+            # 再接続処理(接続中のデバイスのパス、物理IDをキャッシュ)
+            self.reconnector = Reconnector(self.device_search_term,
+                opener=self.get_input_device)
+        self.reconnector.remember(self.device)
+        # run_threaded() 向けスナップショット
+        self.report_input_age = report_input_age
+        self.angle_time = None
+        self.throttle_time = None
+        # 入力フィルタ(設定ファイルの filters セクション)
+        self.filters = build_filters(self.config.get('filters'))
+        # 処理中イベントのカーネルタイムスタンプ
+        self._event_time = None
+        # func_map 上の関数へ中立(0)以外の値を渡した回数(複数台の操作の引き継ぎ判定に使用)
+        self.engaged = 0
+        self._publish()
+        # 計測値(指定した場合のみ計測版のイベント処理へ差し替える)
+        self.metrics = Metrics() if metrics is True else metrics
+        self.report_metrics = report_metrics and self.metrics is not None
+        if self.metrics is not None:
+            self.dispatch_event = self._dispatch_event_measured
+
+    def _load_config(self, config_path):
+        """
+        設定ファイルを読み込む。同じ設定ファイルの解析結果はプロセス内でキャッシュされる。
+
+        引数
+            config_path     設定ファイルパス
+        戻り値
+            config          設定内容(辞書)
+        """
+        return load_config(config_path)
+
+    def _decode_spec(self):
+        """
+        デコードテーブルの構築に使用する decode セクションを返却する。
+        既定値を持つサブクラスはオーバーライドする。
+
+        引数
+            なし
+        戻り値
+            spec        decode セクション(辞書)
+        """
+        return self.config.get('decode')
+
+    def _compile_decoder(self):
+        """
+        設定ファイルの decode セクションからデコードテーブルを構築する。
+        ゼロ範囲や中央値などの計算はここで1度だけ行い、正規化関数へ埋め込む。
+
+        引数
+            なし
+        戻り値
+            decoder     gamepad.decoder.Decoder オブジェクト
+        """
+        decoder = compile_decoder(self.config, self._decode_spec(), self._analog_normalizer)
+        if self.verbose:
+            print('decode table: ', decoder.entries())
+        return decoder
+
+    def _analog_normalizer(self, btn, zero_low, zero_high, middle, max_value, min_value):
+        """
+        アナログスティック1軸分の正規化関数を生成する。
+        キャリブレーション結果がある軸は学習した中央値、あそび、可動範囲を埋め込み、
+        設定ファイルの curves セクションに応答曲線がある軸は event.value で添字付けした表引きへ置き換え、
+        キャリブレーションモードの場合は入力値を集計する関数で包む。
+
+        引数
+            btn         ボタン名
+            zero_low    設定ファイル上のゼロ範囲の下限(この値自体は含まない)
+            zero_high   設定ファイル上のゼロ範囲の上限(この値自体は含まない)
+            middle      設定ファイル上の中央値
+            max_value   event.value の最大値
+            min_value   event.value の最小値
+        戻り値
+            normalizer  正規化関数
+        """
+        normalizer = analog_normalizer(*apply_calibration(self.calibration.get(btn),
+            zero_low, zero_high, middle, max_value, min_value))
+        curves = self.config.get('curves') or {}
+        if btn in curves:
+            normalizer = table_normalizer(normalizer, min_value, max_value,
+                response_curve(curves[btn]))
+        if self.calibrator is not None:
+            normalizer = self.calibrator.wrap(btn, normalizer, middle, max_value, min_value)
+        return normalizer
+
+    def save_calibration(self):
+        """
+        キャリブレーションモードの集計結果を保存し、デコードテーブルへ反映する。
+        ボタンの状態は初期化されるため、スティックから手を離した状態で呼び出すこと。
+
+        引数
+            なし
+        戻り値
+            calibration     {ボタン名: {center, deadzone, min, max, samples}}
+        """
+        if self.calibrator is None:
+            return self.calibration
+        self.calibration = self.calibrator.save()
+        self.decoder = self._compile_decoder()
+        return self.calibration
+
+    @property
+    def decoder(self):
+        """
+        デコードテーブル(gamepad.decoder.Decoder オブジェクト)。
+        """
+        return self._decoder
+
+    @decoder.setter
+    def decoder(self, decoder):
+        self._decoder = decoder
+        # 設定ファイルの debounce セクションのボタンにエッジ検出・チャタリング除去を付与
+        # {ボタン名: gamepad.debounce.ButtonGate オブジェクト}
+        self.debounce = {}
+        if decoder is not None:
+            self.debounce = decoder.configure_debounce(self.config.get('debounce'))
+            self.bind()
+
+    def bind(self):
+        """
+        デコードテーブルのボタンIDで添字付けした状態、func_map 上の関数、
+        入力フィルタの配列を構築する。
+        初期化後に func_map や filters を変更した場合は本メソッドを呼び出すこと。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        names = self._decoder.names
+        self.state = ControllerState(names)
+        self._values = self.state.values
+        self._handlers = [self.func_map.get(name) for name in names]
+        # リングバッファへはボタンIDをそのまま(共有時は登録順のオフセットを加えて)書き込む
+        self._ring_offset = self.ring.register(names) if self.ring is not None else 0
+        self._bind_throttle()
+        self._pipelines = [self.filters.get(name) for name in names]
+        # 保留中の値を持ちうるフィルタ(rate_limit)を含むもの
+        self._flushable = [(button_id, pipeline)
+            for button_id, pipeline in enumerate(self._pipelines)
+            if pipeline is not None and any(hasattr(f, 'flush') for f in pipeline.filters)]
+
+    def _bind_throttle(self):
+        """
+        応答曲線の表を持つ軸のうち func_map で update_throttle() を割り当てた軸は、
+        呼び出す関数を y_axis_direction と throttle_scale を掛けた係数を1回掛けるだけの
+        _set_throttle() へ差し替える。デコードテーブル、状態、リングバッファ、入力フィルタには
+        係数を掛ける前の値が渡る。update_throttle() をオーバーライドしたサブクラスや
+        キャリブレーションモードでは差し替えない。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        if type(self).update_throttle is not GameController.update_throttle:
+            return
+        decoder = self._decoder
+        for button_id, name in enumerate(decoder.names):
+            normalizers = decoder.normalizers(name)
+            if normalizers and all(hasattr(n, 'table') for n in normalizers) \
+                    and self._handlers[button_id] == self.update_throttle:
+                self._handlers[button_id] = self._set_throttle
+
+    def _update_throttle_factor(self):
+        """
+        _set_throttle() で掛ける y_axis_direction と throttle_scale の積を求め直す。
+        親クラスの初期化中(片方のみ設定済み)にも呼び出される。
+        """
+        self._throttle_factor = getattr(self, '_y_axis_direction', 1) \
+            * getattr(self, '_throttle_scale', 1.0)
+
+    @property
+    def throttle_scale(self):
+        """
+        スロットル倍率。変更時は _set_throttle() で掛ける係数も更新する。
+        """
+        return self._throttle_scale
+
+    @throttle_scale.setter
+    def throttle_scale(self, scale):
+        self._throttle_scale = scale
+        self._update_throttle_factor()
+
+    @property
+    def y_axis_direction(self):
+        """
+        スロットルの向き(1,-1)。変更時は _set_throttle() で掛ける係数も更新する。
+        """
+        return self._y_axis_direction
+
+    @y_axis_direction.setter
+    def y_axis_direction(self, direction):
+        self._y_axis_direction = direction
+        self._update_throttle_factor()
+
+    def decode(self, event):
+        """
+        イベント1件をボタン名、値へ変換する。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            btn     対象のボタン名
+            val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+        """
+        btn, val = self.decoder.decode(event)
+        # デバッグ用トレース(端末やファイルへの書き込みは別スレッドで行う)
+        if self.trace is not None:
+            self.trace.record(event, btn, val)
+        return btn, val
+
+    def normalize_arrays(self, types, codes, values):
+        """
+        記録済みイベント列(NumPy配列)を一括で正規化する。
+        正規化の仕様は decode() と同一である。numpy パッケージが必要。
+
+        引数
+            types       event.type の配列
+            codes       event.code の配列
+            values      event.value の配列
+        戻り値
+            normalized  {ボタン名: 正規化済みの値の配列}
+        """
+        from .vectorize import normalize_arrays
+        return normalize_arrays(self.decoder, types, codes, values)
+
+    def read_loop(self):
+        """
+        イベントデバイスから１件読み取り、対象のボタン名、値を返却する。
+
+        引数
+            なし
+        戻り値
+            btn     対象のボタン名
+            val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+        """
+        try:
+            # イベントデバイスから1件イベントを読み込む
+            event = next(self.device.read_loop())
+            return self.decode(event)
+
+        # 再生デバイスなどで入力が終了した場合
+        except StopIteration:
+            self._end_of_input()
+            return None, None
+        # OSエラー発生時
+        except OSError as e:
+            self._reconnect(e)
+            # ボタン名, 値ともにNoneを返却
+            return None, None
+
+    def read_events(self):
+        """
+        イベントデバイス上に溜まっている全イベントを読み取り、
+        同一axisのイベントを最新値にまとめたイベントのリストを返却する。
+        イベントが存在しない場合は読み込み可能になるまで待機する。
+
+        引数
+            なし
+        戻り値
+            events      evdev.InputEvent オブジェクトのリスト
+        """
+        try:
+            return coalesce_events(drain_events(self.device))
+        # 再生デバイスなどで入力が終了した場合
+        except EOFError:
+            self._end_of_input()
+            return []
+        # OSエラー発生時
+        except OSError as e:
+            self._reconnect(e)
+            return []
+
+    def read_batch(self):
+        """
+        read_events() で読み取ったイベントをボタン名、値のリストへ変換する。
+
+        引数
+            なし
+        戻り値
+            decoded     (ボタン名, 値) タプルのリスト
+        """
+        return [self.decode(event) for event in self.read_events()]
+
+    def update_state_from_loop(self):
+        """
+        イベントを1件読み取り、状態へ反映し func_map 上の関数を呼び出す。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        try:
+            # イベントデバイスから1件イベントを読み込む
+            event = next(self.device.read_loop())
+        # 再生デバイスなどで入力が終了した場合
+        except StopIteration:
+            self._end_of_input()
+            return
+        # OSエラー発生時
+        except OSError as e:
+            self._reconnect(e)
+            return
+        self.dispatch_event(event)
+
+    def update_state_from_batch(self):
+        """
+        まとめ読みしたイベントを順番に状態へ反映し、func_map 上の関数を呼び出す。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        for event in self.read_events():
+            self.dispatch_event(event)
+
+    def dispatch_event(self, event):
+        """
+        イベント1件をデコードし、入力フィルタを適用した上で
+        イベントのタイムスタンプとともに dispatch() へ渡す。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            なし
+        """
+        button_id, val = self._decoder.decode_id(event)
+        if self.trace is not None:
+            self.trace.record(event,
+                None if button_id is None else self._decoder.names[button_id], val)
+        if button_id is not None:
+            timestamp = event.sec + event.usec / 1000000.0
+            pipeline = self._pipelines[button_id]
+            if pipeline is not None:
+                val = pipeline(val, timestamp)
+            if val is not None:
+                # _dispatch_id() と同じ処理(呼び出しを1段減らすため展開している)
+                self._values[button_id] = val
+                if self.ring is not None:
+                    self.ring.push(timestamp, button_id + self._ring_offset, val)
+                func = self._handlers[button_id]
+                if func is not None:
+                    self._event_time = timestamp
+                    if val:
+                        self.engaged += 1
+                    func(val)
+                    self._publish()
+        if self._flushable:
+            self._flush_filters(event.sec + event.usec / 1000000.0)
+
+    def _dispatch_event_measured(self, event):
+        """
+        dispatch_event() の計測版。イベント件数を数え、
+        カーネルタイムスタンプからデコード完了まで、デコード完了から
+        func_map 呼び出し完了までの遅延を記録する。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            なし
+        """
+        metrics = self.metrics
+        button_id, val = self._decoder.decode_id(event)
+        decoded = time.time_ns()
+        start = time.perf_counter_ns()
+        metrics.kernel_to_decode.record(decoded - event.sec * 1000000000 - event.usec * 1000)
+        btn = None if button_id is None else self._decoder.names[button_id]
+        metrics.count_event(event.type, btn)
+        if self.trace is not None:
+            self.trace.record(event, btn, val)
+        timestamp = event.sec + event.usec / 1000000.0
+        if button_id is not None:
+            pipeline = self._pipelines[button_id]
+            if pipeline is not None:
+                val = pipeline(val, timestamp)
+            if val is not None:
+                self._dispatch_id(button_id, val, timestamp)
+                metrics.decode_to_dispatch.record(time.perf_counter_ns() - start)
+            else:
+                metrics.filtered += 1
+        if self._flushable:
+            self._flush_filters(timestamp)
+        if metrics.dump_interval is not None:
+            metrics.maybe_dump()
+
+    def _next_flush(self):
+        """
+        入力フィルタが保留中の値を通知できる最も早い時刻を返却する。
+
+        引数
+            なし
+        戻り値
+            due     エポック秒(保留中の値がない場合None)
+        """
+        due = None
+        for _, pipeline in self._flushable:
+            time_ = pipeline.next_flush()
+            if time_ is not None and (due is None or time_ < due):
+                due = time_
+        return due
+
+    def _wait_for_input(self):
+        """
+        入力フィルタの保留中の値を通知する時刻まで、デバイスが読み込み可能になるのを待つ。
+        保留中の値がない場合やfdを持たないデバイスの場合は待たずに True を返却する
+        (読み込み処理側で待機する)。
+
+        引数
+            なし
+        戻り値
+            readable    読み込み可能になった場合 True、時刻に達した場合 False
+        """
+        due = self._next_flush()
+        fd = getattr(self.device, 'fd', None)
+        if due is None or fd is None:
+            return True
+        try:
+            readable, _, _ = select.select([fd], [], [], max(0.0, due - time.time()))
+        except (OSError, ValueError):
+            # 切断などは読み込み処理側で再接続する
+            return True
+        return bool(readable)
+
+    def _flush_filters(self, timestamp):
+        """
+        通知頻度の上限により保留されていた値のうち、間隔が経過したものを通知する。
+
+        引数
+            timestamp   現在のイベントのタイムスタンプ
+        戻り値
+            なし
+        """
+        for button_id, pipeline in self._flushable:
+            val = pipeline.flush(timestamp)
+            if val is not None:
+                self._dispatch_id(button_id, val, timestamp)
+
+    def dispatch(self, btn, val, timestamp=None):
+        """
+        ボタン名、値を状態へ反映し、func_map 上の関数を呼び出す。
+
+        引数
+            btn         対象のボタン名(Noneの場合は何もしない)
+            val         押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+            timestamp   イベントのカーネルタイムスタンプ(エポック秒、デフォルトNone)
+        戻り値
+            なし
+        """
+        # 対象外イベント、デコードテーブルにないボタン名は状態を更新しない
+        button_id = None if btn is None else self._decoder.ids.get(btn)
+        if button_id is None:
+            return
+        self._dispatch_id(button_id, val, timestamp)
+
+    def _dispatch_id(self, button_id, val, timestamp):
+        """
+        ボタンID、値を状態へ反映し、ボタンIDで添字付けした関数を呼び出す。
+
+        引数
+            button_id   対象のボタンID
+            val         押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+            timestamp   イベントのカーネルタイムスタンプ(エポック秒)
+        戻り値
+            なし
+        """
+        self._values[button_id] = val
+        if self.ring is not None:
+            self.ring.push(timestamp, button_id + self._ring_offset, val)
+        func = self._handlers[button_id]
+        if func is not None:
+            self._event_time = timestamp
+            if val:
+                self.engaged += 1
+            func(val)
+            self._publish()
+
+    def update_angle(self, val):
+        """
+        アングル値を更新し、更新したイベントのタイムスタンプを記録する。
+
+        引数
+            val     棒倒し率(-1～0～1)
+        戻り値
+            なし
+        """
+        super(GameController, self).update_angle(val)
+        self.angle_time = self._event_time
+
+    def update_throttle(self, val):
+        """
+        スロットル値を更新し、更新したイベントのタイムスタンプを記録する。
+
+        引数
+            val     棒倒し率(-1～0～1)
+        戻り値
+            なし
+        """
+        super(GameController, self).update_throttle(val)
+        self.throttle_time = self._event_time
+
+    def _set_throttle(self, val):
+        """
+        棒倒し率に y_axis_direction と throttle_scale の積を掛けてスロットル値とし、
+        更新したイベントのタイムスタンプを記録する(update_throttle() の代わりに呼び出す)。
+
+        引数
+            val     棒倒し率(-1～0～1、応答曲線適用後)
+        戻り値
+            なし
+        """
+        self.throttle = val * self._throttle_factor
+        self.throttle_time = self._event_time
+
+    def _publish(self):
+        """
+        現在の操作状態からスナップショットを生成し、参照を差し替える。
+        共有メモリを指定した場合は同じ内容を書き込む。
+        """
+        self.snapshot = ControlSnapshot(self.angle, self.throttle,
+            self.drive_mode, self.recording, self.angle_time, self.throttle_time)
+        if self.shm is not None:
+            self.shm.publish(self.snapshot)
+
+    def run_threaded(self, img_arr=None):
+        """
+        Vehicle ループから呼び出され、最新のスナップショットの値を返却する。
+
+        引数
+            img_arr     未使用
+        戻り値
+            angle       アングル値
+            throttle    スロットル値
+            drive_mode  運転モード
+            recording   記録モード
+            input_age   最新のアナログ入力イベントからの経過秒数(report_input_age が True の場合のみ)
+            metrics     計測値の辞書(report_metrics が True の場合のみ)
+        """
+        if self._reader is not None:
+            state = self._reader.read()
+            if state is not None:
+                self.snapshot = ControlSnapshot(state.angle, state.throttle, state.drive_mode,
+                    state.recording, state.angle_time, state.throttle_time)
+        snapshot = self.snapshot
+        outputs = (snapshot.angle, snapshot.throttle, snapshot.drive_mode, snapshot.recording)
+        if self.report_input_age:
+            outputs += (input_age(snapshot),)
+        if self.report_metrics:
+            outputs += (self.metrics.to_dict(),)
+        return outputs
+
+    def update(self):
+        """
+        スレッドで実行されるイベント待受ループ。
+        batch_read が True の場合はまとめ読み、それ以外は1件ずつ処理する。
+        isolate を指定した場合は子プロセスを起動し、終了した場合は起動し直す。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        if self.isolate:
+            self._run_isolated()
+            return
+        while not self._stopped:
+            # 入力フィルタが値を保留している間は期限まで待ち、入力がなければ保留中の値を通知する
+            if self._flushable and not self._wait_for_input():
+                self._flush_filters(time.time())
+                continue
+            if self.batch_read:
+                self.update_state_from_batch()
+            else:
+                self.update_state_from_loop()
+
+    def _run_isolated(self):
+        """
+        読み込み用の子プロセスを起動し、shutdown() が呼び出されるまで監視する。
+        """
+        factory = self.isolate if callable(self.isolate) else type(self)
+        while not self._stopped:
+            self.process = start_reader(factory, self._isolated_kwargs(), self.shm.name)
+            self.process.join()
+            if not self._stopped:
+                print('Reader process exited with code {}. Restarting.'.format(
+                    self.process.exitcode))
+                time.sleep(1)
+
+    def _isolated_kwargs(self):
+        """
+        子プロセスでコントローラを生成する際の引数を返却する。
+        デバイスはパスで渡すため、子プロセスで開き直される。
+
+        引数
+            なし
+        戻り値
+            kwargs      コントローラのコンストラクタへ渡す引数の辞書
+        """
+        return {
+            'event_input_device': getattr(self.device, 'path', None),
+            'config_path': self.config_path,
+            'device_search_term': self.device_search_term,
+            'verbose': self.verbose,
+            'batch_read': self.batch_read,
+            'calibrate': self.calibrator is not None,
+        }
+
+    def shutdown(self):
+        """
+        イベント待受を停止する。子プロセスで読み込んでいる場合は子プロセスを終了する。
+        キャリブレーションモードの場合は集計結果を保存し、書き出し中のイベントは全て書き出す。
+        """
+        self._stopped = True
+        if self.calibrator is not None:
+            self.calibrator.save()
+        if self.export is not None:
+            self.export.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._own_shm is not None:
+            self._own_shm.close()
+            self._own_shm = None
+        super(GameController, self).shutdown()
+
+    def _open_js_device(self, path):
+        """
+        再接続時にジョイスティックキャラクタデバイスを開く。
+
+        引数
+            path    デバイスパス
+        戻り値
+            device  JoystickDevice オブジェクト
+        """
+        device = JoystickDevice(path)
+        device.configure(self.config)
+        return device
+
+    def _end_of_input(self):
+        """
+        デバイスの入力が終了した場合(再生デバイスの再生済みなど)の処理。
+        イベント待受ループを終了する。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        self._stopped = True
+        self.running = False
+
+    def _reconnect(self, error):
+        """
+        デバイスとの接続が切れた場合の再接続処理。
+
+        引数
+            error   発生したOSError
+        戻り値
+            なし
+        """
+        print('OSError: Likely lost connection with controller. Trying to reconnect now. Error: {}'.format(error))
+        if self.metrics is not None:
+            self.metrics.reconnects += 1
+        close = getattr(self.device, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except OSError:
+                pass
+        # キャッシュ済みのパスを優先し、見つからない場合は
+        # /dev/input へのデバイス追加を待ち受けながら再検索する
+        self.device = self.reconnector.reconnect()
+        print('Reconnected to {} in {:.3f} sec'.format(
+            getattr(self.device, 'path', self.device), self.reconnector.last_latency))
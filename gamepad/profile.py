@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+記録したイベント列からゲームパッドの入力特性を集計する。
+
+制御ループの周期や設定値を決めるため、ボタン名ごとに以下を集計する。
+  rate          1秒あたりのイベント件数
+  interval      直前のイベントからの間隔(ミリ秒)の分布(p50/p90/p99)と標準偏差(ジッタ)
+  deadzone      正規化値が0となった(あそびの範囲内の)イベントの割合(アナログスティックのみ)
+  duplicate     直前と同じ event.value のイベントの割合
+  noop          直前と同じ正規化値となり操作状態の変化しないイベントの割合
+  coalesced     制御ループの1周期内に同じボタンの後続イベントで上書きされるイベントの割合
+                (batch_read=True で読み飛ばせる割合)
+アナログスティックは中央付近の入力値を gamepad.calibration.AxisStats で集計し、
+全軸の中央値のずれとノイズを含むあそび(analog_stick_epsilone)の推奨値を求める。
+"""
+import math
+
+from evdev import ecodes
+
+from .calibration import AxisStats
+from .engine import analog_domain, compile_decoder
+
+
+def percentile(values, ratio):
+    """
+    昇順に並んだ値のリストから ratio 分位の値を返却する。
+
+    引数
+        values  昇順に並んだ値のリスト
+        ratio   分位(0.0~1.0)
+    戻り値
+        value   分位の値(値がない場合None)
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+class ButtonProfile:
+    """
+    ボタン1個分のイベントの集計。
+    """
+    def __init__(self, name, period, axis=None, keyed=False):
+        """
+        コンストラクタ。
+
+        引数
+            name        ボタン名
+            period      制御ループの周期(秒)
+            axis        アナログスティックの場合は AxisStats オブジェクト(デフォルトNone)
+            keyed       event.value でボタン名を引く場合True(重複/無変化は集計しない、デフォルトFalse)
+        戻り値
+            なし
+        """
+        self.name = name
+        self.period = period
+        self.axis = axis
+        self.keyed = keyed
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.intervals = []
+        self.deadzone = 0
+        self.duplicate = 0
+        self.noop = 0
+        self.coalesced = 0
+        self._value = None
+        self._normalized = None
+
+    def observe(self, timestamp, value, normalized):
+        """
+        イベント1件を集計する。
+
+        引数
+            timestamp   カーネルタイムスタンプ(秒)
+            value       event.value
+            normalized  正規化値
+        戻り値
+            なし
+        """
+        if self.last is None:
+            self.first = timestamp
+        elif timestamp >= self.last:
+            self.intervals.append(timestamp - self.last)
+            # 同じ周期内の後続イベントで上書きされる
+            if int(timestamp / self.period) == int(self.last / self.period):
+                self.coalesced += 1
+            if value == self._value:
+                self.duplicate += 1
+            if normalized == self._normalized:
+                self.noop += 1
+        self.last = timestamp
+        self.count += 1
+        self._value = value
+        self._normalized = normalized
+        if self.axis is not None:
+            self.axis.observe(value)
+            if normalized == 0:
+                self.deadzone += 1
+
+    def to_dict(self):
+        """
+        集計結果を辞書として返却する。間隔はミリ秒単位。
+        """
+        intervals = sorted(self.intervals)
+        duration = (self.last - self.first) if self.count > 1 else 0.0
+        mean = sum(intervals) / len(intervals) if intervals else None
+        jitter = math.sqrt(sum((value - mean) ** 2 for value in intervals) / len(intervals)) \
+            if intervals else None
+        ms = lambda value: None if value is None else value * 1e3
+        return {
+            'events': self.count,
+            'rate': self.count / duration if duration > 0 else None,
+            'interval_p50': ms(percentile(intervals, 0.5)),
+            'interval_p90': ms(percentile(intervals, 0.9)),
+            'interval_p99': ms(percentile(intervals, 0.99)),
+            'interval_min': ms(intervals[0] if intervals else None),
+            'jitter': ms(jitter),
+            'deadzone': self.deadzone / float(self.count) if self.axis is not None else None,
+            'duplicate': None if self.keyed else self.duplicate / float(self.count),
+            'noop': None if self.keyed else self.noop / float(self.count),
+            'coalesced': self.coalesced / float(self.count),
+        }
+
+
+class SessionProfile:
+    """
+    設定ファイルのデコードテーブルでイベント列を集計するクラス。
+    """
+    def __init__(self, config, hz=20, rest_band=0.05, sigmas=3.0, min_samples=200):
+        """
+        コンストラクタ。
+
+        引数
+            config      設定内容(辞書、decode セクションが必要)
+            hz          制御ループの周波数(デフォルト20→Vehicleのデフォルト)
+            rest_band   中央付近とみなす範囲(可動範囲の半分に対する割合、デフォルト0.05)
+            sigmas      あそびとする標準偏差の倍数(デフォルト3.0)
+            min_samples あそびの推奨値に使用する中央付近の入力値の最小件数(デフォルト200)
+        戻り値
+            なし
+        """
+        self.config = config
+        self.decoder = compile_decoder(config)
+        # {(event.type, event.code or event.value): (ボタンID, 正規化関数, ゲート)}
+        self.entries = self.decoder.entries()
+        self.domain = analog_domain(config)
+        self.period = 1.0 / hz
+        self.rest_band = rest_band
+        self.sigmas = sigmas
+        self.min_samples = min_samples
+        self.buttons = {}
+        self.events = 0
+        self.unmapped = 0
+        self.frames = 0
+        self.first = None
+        self.last = None
+        self._frame_events = 0
+        self.frame_intervals = []
+        self._last_frame = None
+
+    def _button(self, button_id, normalizer, keyed):
+        """
+        ボタンIDに対応する集計オブジェクトを返却する。未生成の場合は生成する。
+        """
+        profile = self.buttons.get(button_id)
+        if profile is None:
+            axis = None
+            # アナログスティックの正規化関数のみ params を持つ
+            if hasattr(normalizer, 'params'):
+                _, _, middle, max_value, min_value = self.domain
+                axis = AxisStats(middle, max_value, min_value, self.rest_band)
+            profile = self.buttons[button_id] = ButtonProfile(
+                self.decoder.names[button_id], self.period, axis, keyed)
+        return profile
+
+    def observe(self, event):
+        """
+        イベント1件を集計する。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            なし
+        """
+        timestamp = event.sec + event.usec * 1e-6
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        if event.type == ecodes.EV_SYN:
+            # 空でない SYN_REPORT の間隔をデバイスの報告周期とする
+            if event.code == ecodes.SYN_REPORT and self._frame_events > 0:
+                if self._last_frame is not None and timestamp >= self._last_frame:
+                    self.frame_intervals.append(timestamp - self._last_frame)
+                self._last_frame = timestamp
+                self.frames += 1
+                self._frame_events = 0
+            return
+        self.events += 1
+        self._frame_events += 1
+        decoder = self.decoder
+        keyed = event.type in decoder.value_keyed
+        key = event.value if keyed else event.code
+        entry = self.entries.get((event.type, key))
+        if entry is None:
+            self.unmapped += 1
+            return
+        button_id, normalizer, _ = entry
+        self._button(button_id, normalizer, keyed).observe(timestamp, event.value, normalizer(event.value))
+
+    def observe_all(self, events):
+        """
+        イベント列を集計する。
+
+        引数
+            events  evdev.InputEvent オブジェクトのイテラブル
+        戻り値
+            self
+        """
+        for event in events:
+            self.observe(event)
+        return self
+
+    def refresh_axes(self):
+        """
+        アナログスティックの静止中の入力値を度数分布から再集計する(AxisStats.refresh() 参照)。
+
+        引数
+            なし
+        戻り値
+            なし
+        """
+        for profile in self.buttons.values():
+            if profile.axis is not None:
+                profile.axis.refresh()
+
+    def suggest(self):
+        """
+        集計結果から設定値の推奨値を求める。
+
+        引数
+            なし
+        戻り値
+            suggestions {設定キー: 推奨値}
+        """
+        suggestions = {}
+        zero_low, zero_high, middle, _, _ = self.domain
+        self.refresh_axes()
+        current = (zero_high - zero_low) / 2.0
+        deadzones = [abs(profile.axis.mean - middle) + profile.axis.std * self.sigmas
+            for profile in self.buttons.values()
+            if profile.axis is not None and profile.axis.count >= self.min_samples]
+        if deadzones:
+            # 設定ファイル上の中央値を基準に全軸の中央付近の入力値を含む幅
+            epsilon = int(math.ceil(max(deadzones)))
+            spec = self.config.get('decode') or {}
+            key = 'decode.analog.deadzone' if 'deadzone' in (spec.get('analog') or {}) \
+                else 'analog_stick_epsilone'
+            suggestions[key] = max(epsilon, int(math.ceil(current)))
+        total = sum(profile.count for profile in self.buttons.values())
+        coalesced = sum(profile.coalesced for profile in self.buttons.values())
+        if total > 0:
+            suggestions['batch_read'] = coalesced / float(total) >= 0.5
+        return suggestions
+
+    def to_dict(self):
+        """
+        集計結果を辞書として返却する。
+
+        引数
+            なし
+        戻り値
+            report  {duration, events, unmapped, frames, frame_*, buttons: {ボタン名: {...}}, suggest}
+        """
+        duration = (self.last - self.first) if self.first is not None else 0.0
+        intervals = sorted(self.frame_intervals)
+        ms = lambda value: None if value is None else value * 1e3
+        axes = {}
+        self.refresh_axes()
+        for profile in self.buttons.values():
+            if profile.axis is not None:
+                axes[profile.name] = {
+                    'center': profile.axis.mean if profile.axis.count else None,
+                    'noise': profile.axis.std,
+                    'min': profile.axis.low,
+                    'max': profile.axis.high,
+                    'samples': profile.axis.count,
+                }
+        return {
+            'duration': duration,
+            'events': self.events,
+            'unmapped': self.unmapped,
+            'frames': self.frames,
+            'frame_rate': self.frames / duration if duration > 0 else None,
+            'frame_p50': ms(percentile(intervals, 0.5)),
+            'frame_p99': ms(percentile(intervals, 0.99)),
+            'buttons': {profile.name: profile.to_dict()
+                for _, profile in sorted(self.buttons.items())},
+            'axes': axes,
+            'suggest': self.suggest(),
+        }
+
+
+def format_report(report):
+    """
+    集計結果を表示用の行のリストへ変換する。
+
+    引数
+        report  SessionProfile.to_dict() の戻り値
+    戻り値
+        lines   表示用文字列のリスト
+    """
+    number = lambda value, spec: '-' if value is None else format(value, spec)
+    lines = ['{:.3f} sec, {} events ({} unmapped), {} frames ({}/s, interval p50 {} ms, p99 {} ms)'.format(
+        report['duration'], report['events'], report['unmapped'], report['frames'],
+        number(report['frame_rate'], '.1f'), number(report['frame_p50'], '.2f'),
+        number(report['frame_p99'], '.2f'))]
+    lines.append('{:<16} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>6} {:>6} {:>6} {:>6}'.format(
+        'button', 'events', 'rate/s', 'p50 ms', 'p90 ms', 'p99 ms', 'min ms', 'jitter',
+        'dead', 'dup', 'noop', 'coal'))
+    for name, entry in report['buttons'].items():
+        lines.append('{:<16} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>6} {:>6} {:>6} {:>6}'.format(
+            str(name), entry['events'], number(entry['rate'], '.1f'),
+            number(entry['interval_p50'], '.2f'), number(entry['interval_p90'], '.2f'),
+            number(entry['interval_p99'], '.2f'), number(entry['interval_min'], '.2f'),
+            number(entry['jitter'], '.2f'), number(entry['deadzone'], '.1%'),
+            number(entry['duplicate'], '.1%'), number(entry['noop'], '.1%'),
+            number(entry['coalesced'], '.1%')))
+    for name, entry in sorted(report['axes'].items()):
+        lines.append('{} rest center: {} noise: {} range: [{}, {}] samples: {}'.format(
+            name, number(entry['center'], '.2f'), number(entry['noise'], '.2f'),
+            entry['min'], entry['max'], entry['samples']))
+    for key, value in sorted(report['suggest'].items()):
+        lines.append('suggest {}: {}'.format(key, value))
+    return lines
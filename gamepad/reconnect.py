@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+コントローラ切断時の再接続処理。
+
+Bluetooth/無線の瞬断後に /dev/input/event* 全件を開き直して検索するのではなく、
+最後に接続していたデバイスのパスと物理ID(phys/uniq)をキャッシュし、まずそれを試す。
+見つからない場合は inotify で /dev/input へのデバイス追加を待ち受け、
+上限付きの指数バックオフで再試行する。
+再接続に要した時間は計測値として保持する。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+# inotify 定数(linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+def _open_input_device(path):
+    """
+    デフォルトのデバイスオープン関数。
+    """
+    from evdev import InputDevice
+    return InputDevice(path)
+
+
+class HotplugWatcher:
+    """
+    inotify でディレクトリ上のデバイスノード追加・属性変更を待ち受けるクラス。
+    inotify が使用できない環境では単純な待機として振る舞う。
+    """
+    def __init__(self, input_dir='/dev/input'):
+        """
+        コンストラクタ。
+
+        引数
+            input_dir   監視対象ディレクトリ(デフォルト'/dev/input')
+        戻り値
+            なし
+        """
+        self.input_dir = input_dir
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return
+            if libc.inotify_add_watch(fd, os.fsencode(input_dir),
+                    IN_CREATE | IN_ATTRIB | IN_MOVED_TO) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    def wait(self, timeout):
+        """
+        ディレクトリ上の変化もしくはタイムアウトまで待機する。
+
+        引数
+            timeout     待機上限秒数
+        戻り値
+            changed     変化を検知した場合True
+        """
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        # 溜まっている通知を読み捨てる
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """
+        inotify のfdを閉じる。
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class Reconnector:
+    """
+    キャッシュ済みデバイスパス優先、ホットプラグ待ち受け、指数バックオフによる再接続を行うクラス。
+    """
+    def __init__(self, search_term, input_dir='/dev/input', opener=None,
+        min_delay=0.01, max_delay=2.0, prefix='event'):
+        """
+        コンストラクタ。
+
+        引数
+            search_term 検索対象文字列(小文字)
+            input_dir   イベントデバイスのディレクトリ(デフォルト'/dev/input')
+            opener      パスからデバイスオブジェクトを生成する関数(デフォルトNone→evdev.InputDevice)
+            min_delay   最初の待機秒数(デフォルト0.01)
+            max_delay   待機秒数の上限(デフォルト2.0)
+            prefix      検索対象デバイスファイル名の接頭辞(デフォルト'event')
+        戻り値
+            なし
+        """
+        self.search_term = search_term.lower()
+        self.input_dir = input_dir
+        self.opener = opener or _open_input_device
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.prefix = prefix
+        # 最後に接続していたデバイスの情報
+        self.cached_path = None
+        self.cached_phys = None
+        self.cached_uniq = None
+        # 計測値
+        self.count = 0
+        self.last_latency = None
+        self.latencies = []
+        self._watcher = None
+
+    def remember(self, device):
+        """
+        接続中のデバイスのパス、物理IDをキャッシュする。
+
+        引数
+            device  デバイスオブジェクト
+        戻り値
+            なし
+        """
+        self.cached_path = getattr(device, 'path', None)
+        self.cached_phys = getattr(device, 'phys', None) or None
+        self.cached_uniq = getattr(device, 'uniq', None) or None
+
+    def _matches(self, device, strict):
+        """
+        デバイスが再接続対象かどうかを判定する。
+        strict が True の場合はキャッシュ済みの物理IDとの一致も確認する。
+        """
+        if self.search_term not in device.name.lower():
+            return False
+        if not strict:
+            return True
+        if self.cached_uniq and getattr(device, 'uniq', None) != self.cached_uniq:
+            return False
+        if self.cached_phys and getattr(device, 'phys', None) != self.cached_phys:
+            return False
+        return True
+
+    def _open(self, path):
+        """
+        デバイスを開く。開けない場合はNoneを返却する。
+        """
+        try:
+            return self.opener(path)
+        except OSError:
+            return None
+
+    def _close(self, device):
+        """
+        対象外のデバイスを閉じる。
+        """
+        close = getattr(device, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except OSError:
+                pass
+
+    def try_once(self):
+        """
+        キャッシュ済みパス、ディレクトリ上の全デバイスの順に1回だけ検索する。
+
+        引数
+            なし
+        戻り値
+            device  見つかったデバイスオブジェクト(見つからない場合None)
+        """
+        # キャッシュ済みパスを優先
+        if self.cached_path is not None:
+            device = self._open(self.cached_path)
+            if device is not None:
+                if self._matches(device, True):
+                    return device
+                self._close(device)
+
+        # 物理IDが一致するものを優先し、なければ名前が一致する最初のデバイス
+        try:
+            names = sorted(name for name in os.listdir(self.input_dir)
+                if name.startswith(self.prefix))
+        except OSError:
+            return None
+        fallback = None
+        for name in names:
+            path = os.path.join(self.input_dir, name)
+            if path == self.cached_path:
+                continue
+            device = self._open(path)
+            if device is None:
+                continue
+            if self._matches(device, True):
+                if fallback is not None:
+                    self._close(fallback)
+                return device
+            if fallback is None and self._matches(device, False):
+                fallback = device
+            else:
+                self._close(device)
+        return fallback
+
+    def reconnect(self, timeout=None):
+        """
+        デバイスが見つかるまで再接続を試みる。
+        失敗するたびにホットプラグ通知を待ち受け、待機上限を倍にしていく。
+
+        引数
+            timeout     全体の待機上限秒数(デフォルトNone→見つかるまで)
+        戻り値
+            device      見つかったデバイスオブジェクト(タイムアウト時None)
+        """
+        start = time.monotonic()
+        delay = self.min_delay
+        # 検索中に追加されたデバイスを取りこぼさないよう先に監視を開始する
+        if self._watcher is None:
+            self._watcher = HotplugWatcher(self.input_dir)
+        while True:
+            device = self.try_once()
+            if device is not None:
+                self.last_latency = time.monotonic() - start
+                self.latencies.append(self.last_latency)
+                self.count += 1
+                self.remember(device)
+                return device
+            elapsed = time.monotonic() - start
+            if timeout is not None and elapsed >= timeout:
+                return None
+            wait = delay if timeout is None else min(delay, timeout - elapsed)
+            self._watcher.wait(wait)
+            delay = min(delay * 2, self.max_delay)
+
+    def close(self):
+        """
+        ホットプラグ監視を終了する。
+        """
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
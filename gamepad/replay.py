@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+入力イベントの記録・再生。
+
+実機のイベントデバイスから読み込んだ input_event (タイムスタンプ, type, code, value)
+を固定長バイナリとしてファイルへ記録し、mmap したファイルを evdev.InputDevice と
+同じ read_loop()/read() インターフェイス(asyncio 版は async_read_loop()/async_read())で再生する。
+再生デバイスは各コントローラの event_input_device として指定できるため、
+実機を接続していないCI環境でもデコード性能や処理遅延を計測できる。
+
+Usage:
+    replay.py record <search_term> <path> [--seconds=<s>]
+    replay.py info <path>
+
+Options:
+    -h --help       ヘルプ表示
+    --seconds=<s>   記録時間(秒) [default: 10]
+"""
+import asyncio
+import mmap
+import struct
+import time
+
+from evdev import InputEvent
+
+from .batch import drain_events
+
+# ファイル先頭のマジックナンバー, フォーマットバージョン
+MAGIC = b'GPEV'
+VERSION = 1
+HEADER_FORMAT = '<4sHH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# イベント1件のフォーマット(sec, usec, type, code, value)
+EVENT_FORMAT = '<qiHHi'
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+
+
+class EventRecorder:
+    """
+    イベントをバイナリファイルへ追記するクラス。
+    with 文で使用できる。
+    """
+    def __init__(self, path):
+        """
+        コンストラクタ。ファイルを作成し、ヘッダを書き込む。
+
+        引数
+            path    記録先ファイルパス
+        戻り値
+            なし
+        """
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, EVENT_SIZE))
+
+    def write(self, event):
+        """
+        イベント1件を書き込む。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+        戻り値
+            なし
+        """
+        self._file.write(struct.pack(EVENT_FORMAT,
+            event.sec, event.usec, event.type, event.code, event.value))
+        self.count += 1
+
+    def close(self):
+        """
+        ファイルを閉じる。
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_events(path, events):
+    """
+    イベントのリストをファイルへ書き込む。
+
+    引数
+        path    記録先ファイルパス
+        events  イベントオブジェクトのリスト
+    戻り値
+        なし
+    """
+    with EventRecorder(path) as recorder:
+        for event in events:
+            recorder.write(event)
+
+
+def record(device, path, seconds=None):
+    """
+    イベントデバイスから読み込んだイベントをファイルへ記録する。
+    イベントが発生しない間も記録時間の経過で終了するよう、残り時間を上限に待機する。
+
+    引数
+        device  evdev.InputDevice オブジェクト
+        path    記録先ファイルパス
+        seconds 記録時間(秒、デフォルトNone→中断されるまで記録)
+    戻り値
+        count   記録したイベント件数
+    """
+    deadline = None if seconds is None else time.monotonic() + seconds
+    with EventRecorder(path) as recorder:
+        try:
+            while True:
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                for event in drain_events(device, timeout):
+                    recorder.write(event)
+        except KeyboardInterrupt:
+            pass
+        return recorder.count
+
+
+class ReplayDevice:
+    """
+    記録ファイルを mmap し、evdev.InputDevice 互換のインターフェイスで再生するクラス。
+    realtime が True の場合は記録時のイベント間隔を再現し、
+    False の場合は可能な限り高速に再生する。
+    """
+    def __init__(self, path, realtime=False, burst=64, name=None):
+        """
+        コンストラクタ。
+
+        引数
+            path        記録ファイルパス
+            realtime    記録時の間隔で再生するかどうか(デフォルトFalse)
+            burst       read() 1回で返却する最大件数(デフォルト64)
+            name        デバイス名(デフォルトNone→ファイルパス)
+        戻り値
+            なし
+        """
+        self.path = path
+        self.realtime = realtime
+        self.burst = burst
+        self.name = name or path
+        self.fd = None
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, event_size = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC or event_size != EVENT_SIZE:
+            raise ValueError('{} is not an event recording'.format(path))
+        self.count = (len(self._mmap) - HEADER_SIZE) // EVENT_SIZE
+        self.position = 0
+        # 再生開始時刻(実時間, 記録上の時刻)
+        self._origin = None
+
+    @property
+    def remaining(self):
+        """
+        未再生イベント件数。
+        """
+        return self.count - self.position
+
+    def rewind(self):
+        """
+        再生位置を先頭へ戻す。
+        """
+        self.position = 0
+        self._origin = None
+
+    def close(self):
+        """
+        mmap を解放する。
+        """
+        self._mmap.close()
+
+    def as_array(self):
+        """
+        記録済みイベント全件をコピーせずにNumPy構造化配列として返却する。
+        numpy パッケージが必要。
+
+        引数
+            なし
+        戻り値
+            events  フィールド sec, usec, type, code, value を持つ構造化配列
+        """
+        import numpy as np
+        dtype = np.dtype([('sec', '<i8'), ('usec', '<i4'),
+            ('type', '<u2'), ('code', '<u2'), ('value', '<i4')])
+        return np.frombuffer(self._mmap, dtype=dtype,
+            count=self.count, offset=HEADER_SIZE)
+
+    def event_at(self, index):
+        """
+        index 番目のイベントを返却する。
+
+        引数
+            index   イベント番号
+        戻り値
+            event   evdev.InputEvent オブジェクト
+        """
+        return InputEvent(*struct.unpack_from(EVENT_FORMAT, self._mmap,
+            HEADER_SIZE + index * EVENT_SIZE))
+
+    def _delay_until(self, index):
+        """
+        realtime モードの場合、index 番目のイベントの発生時刻までの秒数を返却する(それ以外は0)。
+        """
+        if not self.realtime:
+            return 0.0
+        timestamp = self.event_at(index).timestamp()
+        if self._origin is None:
+            self._origin = (time.monotonic(), timestamp)
+        return self._origin[0] + (timestamp - self._origin[1]) - time.monotonic()
+
+    def _wait_until(self, index):
+        """
+        realtime モードの場合、index 番目のイベントの発生時刻まで待機する。
+        """
+        delay = self._delay_until(index)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _ready_until(self):
+        """
+        現時点で発生済みとみなせるイベントの終端位置を返却する。
+        """
+        end = min(self.position + self.burst, self.count)
+        if not self.realtime or self._origin is None:
+            return end
+        now = self._origin[1] + (time.monotonic() - self._origin[0])
+        ready = self.position + 1
+        while ready < end and self.event_at(ready).timestamp() <= now:
+            ready += 1
+        return ready
+
+    def read_one(self):
+        """
+        イベントを1件返却する。再生済みの場合はNoneを返却する。
+        """
+        if self.position >= self.count:
+            return None
+        self._wait_until(self.position)
+        event = self.event_at(self.position)
+        self.position += 1
+        return event
+
+    def read(self):
+        """
+        発生済みのイベントを最大burst件返却する。
+        未発生のイベントしかない場合(realtime モード)は次のイベント発生まで待機する。
+        再生済みの場合は EOFError を送出する。
+        """
+        if self.position >= self.count:
+            raise EOFError('{}: end of recording'.format(self.path))
+        self._wait_until(self.position)
+        start = self.position
+        self.position = self._ready_until()
+        return (self.event_at(index) for index in range(start, self.position))
+
+    def read_loop(self):
+        """
+        イベントを1件ずつ返却するジェネレータ。
+        """
+        while self.position < self.count:
+            yield self.read_one()
+
+    async def async_read(self):
+        """
+        read() の非同期版(asyncio 版コントローラ向け)。
+        realtime モードの待機はイベントループ上で行い、それ以外の場合も
+        他のタスクへ1度制御を譲る。再生済みの場合は EOFError を送出する。
+
+        引数
+            なし
+        戻り値
+            events      evdev.InputEvent オブジェクトのリスト(read() と同じ件数)
+        """
+        if self.position >= self.count:
+            raise EOFError('{}: end of recording'.format(self.path))
+        await asyncio.sleep(max(0.0, self._delay_until(self.position)))
+        start = self.position
+        self.position = self._ready_until()
+        return [self.event_at(index) for index in range(start, self.position)]
+
+    async def async_read_loop(self):
+        """
+        read_loop() の非同期版。イベントを1件ずつ返却する非同期ジェネレータ。
+        """
+        while self.position < self.count:
+            await asyncio.sleep(max(0.0, self._delay_until(self.position)))
+            event = self.event_at(self.position)
+            self.position += 1
+            yield event
+
+
+if __name__ == '__main__':
+    from docopt import docopt
+    args = docopt(__doc__)
+    if args['record']:
+        from .discovery import classify_devices
+        term = args['<search_term>'].lower()
+        # 合致しないデバイスは classify_devices() で閉じられる
+        devices = classify_devices([term])[term]
+        if len(devices) == 0:
+            raise SystemExit('device not found: {}'.format(args['<search_term>']))
+        device = devices[0]
+        for other in devices[1:]:
+            other.close()
+        print('[replay] record {} to {}'.format(device.name, args['<path>']))
+        try:
+            count = record(device, args['<path>'], float(args['--seconds']))
+        finally:
+            device.close()
+        print('[replay] {} events recorded'.format(count))
+    elif args['info']:
+        device = ReplayDevice(args['<path>'])
+        if device.count > 0:
+            first = device.event_at(0).timestamp()
+            last = device.event_at(device.count - 1).timestamp()
+            print('[replay] {} events, {:.3f} sec'.format(device.count, last - first))
+        else:
+            print('[replay] no events')
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+デコード済みイベントを保持する固定長リングバッファ。
+
+(タイムスタンプ, ボタンID, 値) の各列を起動時に確保した array.array に格納し、
+イベントごとにタプルやリストを生成しない。読み出し側は呼び出し元が用意した
+配列(array.array もしくは同じ型の NumPy 配列)へ memoryview 経由でまとめてコピーするため、
+コピーに伴うオブジェクト生成はバッチ単位の定数個のみとなる。
+
+書き込みはイベント処理スレッド1つ、読み出しは任意のスレッドで行う前提とする。
+読み出しが追いつかずに上書きされたレコードは破棄件数として数える。
+"""
+import array
+
+# ボタンID列、タイムスタンプ・値列の array 型コード
+BUTTON_TYPECODE = 'H'
+FLOAT_TYPECODE = 'd'
+
+
+class EventRing:
+    """
+    デコード済みイベントの固定長リングバッファ。
+    """
+    def __init__(self, capacity=1024):
+        """
+        コンストラクタ。各列の配列を確保する。
+
+        引数
+            capacity    保持する最大レコード数(2のべき乗に切り上げる、デフォルト1024)
+        戻り値
+            なし
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self.timestamps = array.array(FLOAT_TYPECODE, bytes(8 * size))
+        self.buttons = array.array(BUTTON_TYPECODE, bytes(2 * size))
+        self.values = array.array(FLOAT_TYPECODE, bytes(8 * size))
+        # 書き込み済みレコード数(単調増加)
+        self.head = 0
+        # ボタンID順のボタン名(登録したデコードテーブルのボタン名を順に連結したもの)
+        self.names = []
+        # [(登録したボタン名のタプル, ボタンIDのオフセット)]
+        self._blocks = []
+
+    def register(self, names):
+        """
+        デコードテーブルのボタン名(ボタンID順)を登録し、書き込み時に
+        デコードテーブルのボタンIDへ加えるオフセットを返却する。
+        同じ並びのボタン名を登録済みの場合は同じオフセットを返却するため、
+        同じ設定ファイルのコントローラ同士はボタンIDをそのまま書き込める。
+
+        引数
+            names       ボタンID順のボタン名のリスト
+        戻り値
+            offset      ボタンIDのオフセット(最初に登録したデコードテーブルは0)
+        """
+        names = tuple(names)
+        for registered, offset in self._blocks:
+            if registered == names:
+                return offset
+        offset = len(self.names)
+        if offset + len(names) > 1 << (8 * array.array(BUTTON_TYPECODE).itemsize):
+            raise ValueError('too many button names for ring buffer')
+        self.names.extend(names)
+        self._blocks.append((names, offset))
+        return offset
+
+    def push(self, timestamp, button_id, value):
+        """
+        レコードを1件書き込む。最も古いレコードを上書きする場合がある。
+
+        引数
+            timestamp   イベントのカーネルタイムスタンプ(エポック秒、不明な場合None)
+            button_id   ボタンID(register() で得たオフセットを加えた値)
+            value       正規化済みの値
+        戻り値
+            なし
+        """
+        index = self.head & self._mask
+        self.timestamps[index] = timestamp if timestamp is not None else float('nan')
+        self.buttons[index] = button_id
+        self.values[index] = value
+        # 全列の書き込み後に公開する
+        self.head += 1
+
+    def reader(self):
+        """
+        現在の書き込み位置から読み出す RingReader を生成する。
+
+        引数
+            なし
+        戻り値
+            reader      RingReader オブジェクト
+        """
+        return RingReader(self)
+
+
+class RingReader:
+    """
+    EventRing の読み出し位置を保持し、呼び出し元の配列へまとめてコピーするクラス。
+    """
+    def __init__(self, ring):
+        """
+        コンストラクタ。
+
+        引数
+            ring    EventRing オブジェクト
+        戻り値
+            なし
+        """
+        self.ring = ring
+        self.cursor = ring.head
+        self.dropped = 0
+        self._sources = (memoryview(ring.timestamps), memoryview(ring.buttons),
+            memoryview(ring.values))
+
+    @property
+    def available(self):
+        """
+        未読のレコード数(上書き済みのものを含む)。
+        """
+        return self.ring.head - self.cursor
+
+    def read_into(self, timestamps, buttons, values):
+        """
+        未読のレコードを呼び出し元の配列へ先頭から詰めてコピーする。
+        配列の長さを超える分は次回以降に読み出す。
+
+        引数
+            timestamps  タイムスタンプ格納先('d' 型の array.array もしくは float64 配列)
+            buttons     ボタンID格納先('H' 型の array.array もしくは uint16 配列)
+            values      値格納先('d' 型の array.array もしくは float64 配列)
+        戻り値
+            count       格納した有効なレコード数(コピー中に上書きされたものは含まない)
+        """
+        ring = self.ring
+        capacity = ring.capacity
+        head = ring.head
+        # 上書き済みのレコードは読み飛ばす
+        if head - self.cursor > capacity:
+            self.dropped += head - self.cursor - capacity
+            self.cursor = head - capacity
+        count = min(head - self.cursor, len(timestamps))
+        if count <= 0:
+            return 0
+        start = self.cursor & ring._mask
+        first = min(count, capacity - start)
+        targets = (memoryview(timestamps), memoryview(buttons), memoryview(values))
+        for source, target in zip(self._sources, targets):
+            target[:first] = source[start:start + first]
+            if count > first:
+                target[first:count] = source[:count - first]
+        # コピー中に上書きされた先頭側は破棄扱いとし、有効な末尾側を先頭へ詰める
+        overwritten = min(ring.head - capacity - self.cursor, count)
+        self.cursor += count
+        if overwritten <= 0:
+            return count
+        self.dropped += overwritten
+        valid = count - overwritten
+        for target in targets:
+            target[:valid] = target[overwritten:count]
+        return valid
+
+    def allocate(self, size=None):
+        """
+        read_into() 向けの格納先配列を確保する。
+
+        引数
+            size        レコード数(デフォルトNone→リングバッファの容量)
+        戻り値
+            timestamps  タイムスタンプ格納先
+            buttons     ボタンID格納先
+            values      値格納先
+        """
+        size = self.ring.capacity if size is None else size
+        return (array.array(FLOAT_TYPECODE, bytes(8 * size)),
+            array.array(BUTTON_TYPECODE, bytes(2 * size)),
+            array.array(FLOAT_TYPECODE, bytes(8 * size)))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+操作状態の共有メモリへの公開。
+
+コントローラが操作状態を更新するたびに、最新の状態を
+multiprocessing.shared_memory のブロックへ書き込む。
+ロガーや安全監視など別プロセスの読み出し側は、イベントデバイスやソケットを
+経由せずに StateReader で最新の状態を取得できる。
+
+書き込みはシーケンスロック(seqlock)で保護する。書き込み側は書き込み前後に
+シーケンス番号を1ずつ増やし(書き込み中は奇数)、読み出し側は読み出し前後の
+シーケンス番号が一致し、かつ偶数の場合のみ値を採用する。
+書き込み側は1プロセス(1スレッド)のみとすること。
+Pythonにはメモリバリアがないため、書き込み順序はCPUに依存する点に注意。
+
+ブロックの内容(リトルエンディアン)
+  seq           uint64  シーケンス番号
+  angle         double  アングル値
+  throttle      double  スロットル値
+  angle_time    double  angle を更新したイベントのカーネルタイムスタンプ(未入力はNaN)
+  throttle_time double  throttle を更新したイベントのカーネルタイムスタンプ(未入力はNaN)
+  published     double  書き込んだ時刻(エポック秒)
+  recording     uint8   記録モード(0/1)
+  drive_mode    char[16] 運転モード(UTF-8)
+"""
+import math
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+# 公開先のデフォルトのブロック名
+DEFAULT_NAME = 'gamepad_state'
+
+SEQ_FORMAT = '<Q'
+SEQ_SIZE = struct.calcsize(SEQ_FORMAT)
+BODY_FORMAT = '<dddddB16s'
+BODY_SIZE = struct.calcsize(BODY_FORMAT)
+BLOCK_SIZE = SEQ_SIZE + BODY_SIZE
+
+# StateReader.read() の戻り値
+SharedState = namedtuple('SharedState', [
+    'seq', 'angle', 'throttle', 'drive_mode', 'recording',
+    'angle_time', 'throttle_time', 'published'])
+
+
+def _open(name, create=False, size=0):
+    """
+    ブロックを作成もしくは開く。ブロックの削除は StatePublisher.close() で明示的に行うため、
+    プロセス終了時に削除されないようリソーストラッカーの管理対象から外す。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        # Python 3.12 以前は登録直後に登録解除する
+        block = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+
+def _unlink(block):
+    """
+    ブロックを削除する。
+    """
+    if getattr(block, '_track', None) is None:
+        # Python 3.12 以前の unlink() は登録解除も行うため、先に登録し直す
+        resource_tracker.register(block._name, 'shared_memory')
+    block.unlink()
+
+
+class StatePublisher:
+    """
+    操作状態を共有メモリへ書き込むクラス。
+    """
+    def __init__(self, name=DEFAULT_NAME):
+        """
+        コンストラクタ。共有メモリのブロックを作成する。
+        同名のブロックが残っている場合(前回の異常終了時など)はそれを再利用する。
+
+        引数
+            name    ブロック名(デフォルト'gamepad_state')
+        戻り値
+            なし
+        """
+        try:
+            self._block = _open(name, create=True, size=BLOCK_SIZE)
+        except FileExistsError:
+            self._block = _open(name)
+            if self._block.size < BLOCK_SIZE:
+                self._block.close()
+                raise ValueError('shared memory {} is too small'.format(name))
+        self.name = name
+        self._buf = self._block.buf
+        self.seq = struct.unpack_from(SEQ_FORMAT, self._buf, 0)[0] & ~1
+        struct.pack_into(SEQ_FORMAT, self._buf, 0, self.seq)
+
+    def publish(self, snapshot):
+        """
+        スナップショットの内容を書き込む。
+
+        引数
+            snapshot    gamepad.state.ControlSnapshot オブジェクト
+        戻り値
+            なし
+        """
+        buf = self._buf
+        seq = self.seq + 1
+        # 書き込み中(奇数)
+        struct.pack_into(SEQ_FORMAT, buf, 0, seq)
+        struct.pack_into(BODY_FORMAT, buf, SEQ_SIZE,
+            snapshot.angle, snapshot.throttle,
+            math.nan if snapshot.angle_time is None else snapshot.angle_time,
+            math.nan if snapshot.throttle_time is None else snapshot.throttle_time,
+            time.time(), 1 if snapshot.recording else 0,
+            str(snapshot.drive_mode).encode('utf-8'))
+        # 書き込み完了(偶数)
+        self.seq = seq + 1
+        struct.pack_into(SEQ_FORMAT, buf, 0, self.seq)
+
+    def close(self):
+        """
+        ブロックを閉じて削除する。読み出し側が開いているブロックは閉じるまで残る。
+        """
+        if self._block is None:
+            return
+        self._buf = None
+        self._block.close()
+        _unlink(self._block)
+        self._block = None
+
+
+class StateReader:
+    """
+    StatePublisher が書き込んだ操作状態を読み出すクラス。
+    """
+    def __init__(self, name=DEFAULT_NAME, retries=1000):
+        """
+        コンストラクタ。共有メモリのブロックを開く。
+
+        引数
+            name        ブロック名(デフォルト'gamepad_state')
+            retries     書き込み中だった場合に読み直す上限回数(デフォルト1000)
+        戻り値
+            なし
+        """
+        self.name = name
+        self.retries = retries
+        self._block = _open(name)
+        self._buf = self._block.buf
+        # 書き込み中のため読み直した回数
+        self.conflicts = 0
+
+    @property
+    def seq(self):
+        """
+        現在のシーケンス番号(書き込みのたびに2ずつ増加)。
+        """
+        return struct.unpack_from(SEQ_FORMAT, self._buf, 0)[0]
+
+    def read(self):
+        """
+        最新の操作状態を読み出す。
+
+        引数
+            なし
+        戻り値
+            state       SharedState オブジェクト(一度も書き込まれていない場合、
+                        読み直しの上限に達した場合None)
+        """
+        buf = self._buf
+        for _ in range(self.retries):
+            before = struct.unpack_from(SEQ_FORMAT, buf, 0)[0]
+            if before & 1:
+                self.conflicts += 1
+                continue
+            body = struct.unpack_from(BODY_FORMAT, buf, SEQ_SIZE)
+            if struct.unpack_from(SEQ_FORMAT, buf, 0)[0] != before:
+                self.conflicts += 1
+                continue
+            if before == 0:
+                return None
+            angle, throttle, angle_time, throttle_time, published, recording, mode = body
+            return SharedState(before, angle, throttle,
+                mode.rstrip(b'\0').decode('utf-8'), bool(recording),
+                None if math.isnan(angle_time) else angle_time,
+                None if math.isnan(throttle_time) else throttle_time,
+                published)
+        return None
+
+    def close(self):
+        """
+        ブロックを閉じる(ブロックは削除しない)。
+        """
+        if self._block is None:
+            return
+        self._buf = None
+        self._block.close()
+        self._block = None
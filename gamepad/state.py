@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+run_threaded() 向けの操作状態スナップショット。
+
+イベント処理スレッドは操作状態を更新するたびに不変のタプルを新たに生成して
+参照を差し替える。参照の差し替えは不可分に行われるため、Vehicle ループ側は
+ロックを取得することなく、常に一貫した組み合わせの値を取得できる。
+各値にはその値を更新したイベントのカーネルタイムスタンプを付与しており、
+サンプリング時点での入力の経過時間(input age)を求めることができる。
+
+ボタンごとの最新値は ControllerState に保持する。値はボタンIDで添字付けした
+配列に格納し、ボタン名での参照は外部API(state['LEFT_STICK_X'] など)向けに残している。
+"""
+import array
+import time
+from collections import namedtuple
+
+# angle_time/throttle_time は angle/throttle を最後に更新したイベントの
+# カーネルタイムスタンプ(エポック秒、未入力の場合None)
+ControlSnapshot = namedtuple('ControlSnapshot', [
+    'angle', 'throttle', 'drive_mode', 'recording', 'angle_time', 'throttle_time'])
+
+
+def input_age(snapshot, now=None):
+    """
+    スナップショット中の最新の入力イベントからの経過秒数を返却する。
+
+    引数
+        snapshot    ControlSnapshot オブジェクト
+        now         現在時刻(エポック秒、デフォルトNone→time.time())
+    戻り値
+        age         経過秒数(アナログ入力が1件もない場合None)
+    """
+    times = [t for t in (snapshot.angle_time, snapshot.throttle_time) if t is not None]
+    if not times:
+        return None
+    return (time.time() if now is None else now) - max(times)
+
+
+class ControllerState:
+    """
+    ボタンごとの最新値をボタンID順の配列で保持するクラス。
+    イベント処理では values をボタンIDで直接更新し、
+    ボタン名での参照・更新は辞書と同じ書式で行える。
+    """
+    __slots__ = ('names', 'ids', 'values')
+
+    def __init__(self, names):
+        """
+        コンストラクタ。全ボタンの値を0で初期化する。
+
+        引数
+            names   ボタンID順のボタン名のリスト
+        戻り値
+            なし
+        """
+        self.names = list(names)
+        self.ids = {name: button_id for button_id, name in enumerate(self.names)}
+        self.values = array.array('d', bytes(8 * len(self.names)))
+
+    def __getitem__(self, name):
+        return self.values[self.ids[name]]
+
+    def __setitem__(self, name, value):
+        self.values[self.ids[name]] = value
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, name, default=None):
+        """
+        ボタン名に対応する最新値を返却する。
+
+        引数
+            name        ボタン名
+            default     未登録のボタン名の場合に返却する値(デフォルトNone)
+        戻り値
+            value       最新値
+        """
+        button_id = self.ids.get(name)
+        return default if button_id is None else self.values[button_id]
+
+    def items(self):
+        """
+        (ボタン名, 最新値) のリストを返却する。
+        """
+        return list(zip(self.names, self.values))
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+デコード済みイベントのトレースログ。
+
+イベント処理スレッドはイベント1件ごとにタプルを固定長のリングバッファ
+(collections.deque)へ追加するだけで、ファイルや端末への書き込みは
+バックグラウンドスレッドが一定間隔でまとめて行う。
+書き込みが追いつかずリングバッファから溢れたレコードは破棄され、
+連番の欠落として件数を数える。
+
+ファイルへの出力は1行1レコードのJSON(JSONL)形式で、各行は以下のキーを持つ。
+  seq     連番
+  t       カーネルタイムスタンプ(エポック秒)
+  type    event.type
+  code    event.code
+  value   event.value
+  btn     ボタン名(デコード対象外の場合null)
+  val     正規化済みの値(デコード対象外の場合null)
+"""
+import atexit
+import itertools
+import json
+import threading
+from collections import deque
+
+
+class TraceLog:
+    """
+    リングバッファとバックグラウンド書き込みスレッドによるトレースログ。
+    """
+    def __init__(self, sink, capacity=4096, interval=0.1, text=False):
+        """
+        コンストラクタ。書き込みスレッドを開始する。
+
+        引数
+            sink        出力先ファイルパスもしくは書き込み可能なファイルオブジェクト(sys.stdoutなど)
+            capacity    リングバッファに保持する最大レコード数(デフォルト4096)
+            interval    書き込み間隔(秒、デフォルト0.1)
+            text        True の場合JSONLではなく表示用の書式で出力する(デフォルトFalse)
+        戻り値
+            なし
+        """
+        if isinstance(sink, str):
+            self._file = open(sink, 'w')
+            self._owns_file = True
+        else:
+            self._file = sink
+            self._owns_file = False
+        self.interval = interval
+        self.text = text
+        self.written = 0
+        self.dropped = 0
+        self._buffer = deque(maxlen=capacity)
+        self._seq = itertools.count()
+        self._last_seq = -1
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='gamepad-trace', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, event, btn, val):
+        """
+        イベント1件をリングバッファへ追加する。イベント処理スレッドから呼び出される。
+
+        引数
+            event   evdev.InputEvent オブジェクト
+            btn     ボタン名(デコード対象外の場合None)
+            val     正規化済みの値(デコード対象外の場合None)
+        戻り値
+            なし
+        """
+        self._buffer.append((next(self._seq), event.sec, event.usec,
+            event.type, event.code, event.value, btn, val))
+
+    def _run(self):
+        """
+        書き込みスレッド本体。
+        """
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        """
+        リングバッファ上のレコードを全て書き込む。
+        """
+        buffer = self._buffer
+        lines = []
+        while buffer:
+            record = buffer.popleft()
+            seq = record[0]
+            # リングバッファから溢れたレコード件数
+            self.dropped += seq - self._last_seq - 1
+            self._last_seq = seq
+            lines.append(format_record(to_dict(record)) if self.text
+                else json.dumps(to_dict(record), separators=(',', ':')))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            self.written += len(lines)
+
+    def close(self):
+        """
+        書き込みスレッドを停止し、残りのレコードを書き込む。
+        本メソッドはプロセス終了時にも自動で呼び出される。
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        if self._owns_file:
+            self._file.close()
+        atexit.unregister(self.close)
+
+
+def to_dict(record):
+    """
+    リングバッファ上のレコードを辞書へ変換する。
+
+    引数
+        record  (seq, sec, usec, type, code, value, btn, val) タプル
+    戻り値
+        record  JSONLの1行に相当する辞書
+    """
+    seq, sec, usec, event_type, code, value, btn, val = record
+    return {'seq': seq, 't': sec + usec / 1000000.0, 'type': event_type,
+        'code': code, 'value': value, 'btn': btn, 'val': val}
+
+
+def format_record(record):
+    """
+    レコード1件を表示用の文字列へ変換する。
+
+    引数
+        record  JSONLの1行に相当する辞書
+    戻り値
+        line    表示用文字列
+    """
+    return '{t:.6f} type:[{type}] code:[{code}] value:[{value}] -> name:[{btn}] val:({val})'.format(**record)
+
+
+def read_trace(path):
+    """
+    トレースログファイルを読み込む。
+
+    引数
+        path    トレースログ(JSONL)ファイルパス
+    戻り値
+        record  1行分の辞書を返却するイテレータ
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
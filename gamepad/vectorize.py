@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+記録済みイベント列をNumPy配列のまま一括で正規化する関数群。
+学習データ作成のための後処理など、大量のイベントを処理する用途で使用する。
+正規化の仕様(ゼロ範囲、按分、応答曲線)はデコードテーブルの各正規化関数と同一である。
+前回の押下からの間隔に依存するゲート(設定ファイルの debounce)は適用しない。
+
+numpy パッケージが必要。
+"""
+import numpy as np
+
+from .decoder import dpad_normalizer, button_normalizer, press_normalizer
+
+
+def _vectorize(normalizer):
+    """
+    デコードテーブル上の正規化関数に対応するベクトル版関数を返却する。
+
+    引数
+        normalizer  gamepad.decoder の正規化関数
+    戻り値
+        vectorized  event.value 配列を受け取り正規化済み配列を返却する関数
+    """
+    if normalizer is dpad_normalizer:
+        return lambda values: values.astype(np.float64)
+    if normalizer is button_normalizer:
+        return lambda values: (values != 0).astype(np.float64)
+    if normalizer is press_normalizer:
+        return lambda values: np.ones(len(values), dtype=np.float64)
+    # キャリブレーションモードの集計用関数は集計しない元の関数で計算する
+    normalizer = getattr(normalizer, 'unwrapped', normalizer)
+    table = getattr(normalizer, 'table', None)
+    if table is not None:
+        return _vectorize_table(normalizer, np.asarray(table, dtype=np.float64))
+    params = getattr(normalizer, 'params', None)
+    if params is None:
+        raise ValueError('normalizer {} cannot be vectorized'.format(normalizer))
+    zero_low, zero_high, middle, half_length = params
+    def vectorized(values):
+        result = (values - middle) / half_length
+        result[(zero_low < values) & (values < zero_high)] = 0.0
+        return result
+    return vectorized
+
+
+def _vectorize_table(normalizer, table):
+    """
+    event.value で添字付けした表を持つ正規化関数(gamepad.curves.table_normalizer)の
+    ベクトル版関数を返却する。表の範囲外の値は1件ずつ正規化関数で計算する。
+
+    引数
+        normalizer  gamepad.curves.table_normalizer() で生成した正規化関数
+        table       表(NumPy配列)
+    戻り値
+        vectorized  event.value 配列を受け取り正規化済み配列を返却する関数
+    """
+    low = normalizer.low
+    def vectorized(values):
+        index = values - low
+        inside = (index >= 0) & (index < len(table)) & (index == np.floor(index))
+        result = np.empty(len(values), dtype=np.float64)
+        result[inside] = table[index[inside].astype(np.int64)]
+        outside = np.flatnonzero(~inside)
+        result[outside] = [normalizer(value) for value in values[outside].tolist()]
+        return result
+    return vectorized
+
+
+def normalize_arrays(decoder, types, codes, values):
+    """
+    (type, code, value) の配列を一括でデコードし、ボタン名ごとの正規化済み配列を返却する。
+    各配列内の順序は元のイベント順序を維持する。
+
+    引数
+        decoder     gamepad.decoder.Decoder オブジェクト
+        types       event.type の配列
+        codes       event.code の配列
+        values      event.value の配列
+    戻り値
+        normalized  {ボタン名: 正規化済みの値の配列(float64)}
+    """
+    types = np.asarray(types)
+    codes = np.asarray(codes)
+    values = np.asarray(values, dtype=np.float64)
+
+    # ボタン名ごとに対象イベントの位置と値を求める
+    names = {}
+    for (event_type, key), (button_id, normalizer, _) in decoder.entries().items():
+        name = decoder.names[button_id]
+        keys = values if event_type in decoder.value_keyed else codes
+        mask = (types == event_type) & (keys == key)
+        if not mask.any():
+            continue
+        index = np.flatnonzero(mask)
+        names.setdefault(name, []).append(
+            (index, _vectorize(normalizer)(values[index])))
+
+    normalized = {}
+    for name, parts in names.items():
+        index = np.concatenate([part[0] for part in parts])
+        result = np.concatenate([part[1] for part in parts])
+        # 複数のキーが同一ボタン名に対応する場合も発生順に並べる
+        normalized[name] = result[np.argsort(index, kind='stable')]
+    return normalized
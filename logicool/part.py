@@ -19,13 +19,28 @@ F710固有の仕様であり、本コードでは消灯時の状態を前提と
 各ボタン/各axisにどの機能が割り振られているかは、
 コントロールクラス JoystickController の self.func_map を参照のこと。
 """
-import time
-import evdev
-from evdev import ecodes
 
-from donkeypart_bluetooth_game_controller import BluetoothGameController
-
-class JoystickController(BluetoothGameController):
+from gamepad import GameController
+from gamepad.config import load_config, resource_path
+from gamepad.discovery import classify_devices, single_device, open_device
+from gamepad.aio import AsyncControllerMixin
+
+# 各モードのデバイス名に含まれる検索対象文字列
+XI_SEARCH_TERM = 'logitech gamepad f710'
+DI_SEARCH_TERM = 'logicool logicool cordless rumblepad 2'
+# 本パッケージのコントローラで扱うデバイスの検索対象文字列(gamepad.manager で使用)
+SEARCH_TERMS = (XI_SEARCH_TERM, DI_SEARCH_TERM)
+# decode セクションのない設定ファイルで使用する各モードの既定値(gamepad.engine 参照)
+XI_DECODE = {'routes': [
+    {'type': 'EV_ABS', 'key': 'code', 'map': 'ev_abs_code_map', 'normalize': 'analog', 'dpad': 'dpad_target'},
+    {'type': 'EV_KEY', 'key': 'code', 'map': 'ev_key_code_map', 'normalize': 'button'},
+]}
+DI_DECODE = {'routes': [
+    {'type': 'EV_ABS', 'key': 'code', 'map': 'ev_abs_code_map', 'normalize': 'analog', 'dpad': 'dpad_target'},
+    {'type': 'EV_MSC', 'key': 'value', 'map': 'ev_msc_value_map', 'normalize': 'press'},
+]}
+
+class JoystickController(GameController):
     """
     F710 ワイヤレスゲームパッド用コントローラクラス。
     Xinputモード/DirectInputモード兼用のpartクラスとして実装されている。
@@ -37,49 +52,79 @@ class JoystickController(BluetoothGameController):
         event_input_device=None, 
         config_path=None, 
         device_search_term=None, 
-        verbose=False):
+        verbose=False,
+        **kwargs):
         """
         コンストラクタ。
         親クラスの実装を処理後、Logicool製F710固有の設定に対応できるように
         引数で与えられた項目をもとにいくつかのインスタンス変数を初期化・上書きする。
 
         引数
-            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクト(デフォルトNone→device_search_termで検索する)
-            config_path           設定ファイルパス(デフォルトNull)
-            device_search_term    検索対象文字列(デフォルトNull)
+            event_input_device    イベントキャラクタデバイスのInputDeviceオブジェクトもしくはデバイスパス(デフォルトNone→device_search_termで検索する)
+            config_path           設定ファイルパス(デフォルトNull→接続中のデバイスからモードを判定)
+            device_search_term    検索対象文字列(デフォルトNull→モードごとの検索対象文字列)
             verbose               デバッグモード(デフォルトFalse)
+            kwargs                その他 gamepad.GameController の引数(batch_read など)
         戻り値
             なし
         """
-        XI_SEARCH_TERM = 'logitech gamepad f710'
-        XI_CONFIG_PATH = 'logicool/f710_xi.yml'
-        DI_SEARCH_TERM = 'logicool logicool cordless rumblepad 2'
-        DI_CONFIG_PATH = 'logicool/f710_di.yml'
+        XI_CONFIG_PATH = resource_path('logicool', 'f710_xi.yml')
+        DI_CONFIG_PATH = resource_path('logicool', 'f710_di.yml')
+
+        # デバイスパスが指定された場合はデバイスを開く(/dev/input/js* にも対応)
+        # 子プロセスで読み込む場合(isolate)は、モードの判定に必要な場合を除き開かない
+        given = event_input_device
+        isolate = kwargs.get('isolate')
+        if not (isolate and config_path is not None):
+            event_input_device = open_device(event_input_device)
+
+        # Xinput/DirectInput どちらのモードかを判定する
+        if config_path is not None:
+            # 設定ファイルが指定された場合はその検索対象文字列で判定
+            self.is_xi = load_config(config_path).get('device_search_term') == XI_SEARCH_TERM
+        elif event_input_device is not None:
+            # デバイスが指定された場合はそのデバイス名で判定
+            self.is_xi = XI_SEARCH_TERM in event_input_device.name.lower()
+        else:
+            # 接続中の全デバイスを1回だけ走査し、両モードの検索対象文字列で同時に分類
+            found = classify_devices([XI_SEARCH_TERM, DI_SEARCH_TERM])
+            self.is_xi = len(found[XI_SEARCH_TERM]) > 0
+            if self.is_xi:
+                single_device(found[DI_SEARCH_TERM])
+                event_input_device = single_device(found[XI_SEARCH_TERM])
+            else:
+                event_input_device = single_device(found[DI_SEARCH_TERM])
+        if isolate and event_input_device is not None and event_input_device is not given:
+            # 判定のために開いたデバイスは閉じ、パスのみを子プロセスへ渡す
+            event_input_device.close()
+            event_input_device = event_input_device.path
 
-        if self.find_input_device(XI_SEARCH_TERM) is None:
+        if self.is_xi:
             super(JoystickController, self).__init__(
                 event_input_device=event_input_device, 
-                config_path=DI_CONFIG_PATH, 
-                device_search_term=DI_SEARCH_TERM, 
-                verbose=verbose)
+                config_path=config_path or XI_CONFIG_PATH, 
+                device_search_term=device_search_term or XI_SEARCH_TERM, 
+                verbose=verbose,
+                **kwargs)
             #if self.verbose:
-            print('Use DirectInput configuration')
-            self.is_xi = False
+            print('Use Xinput configuration')
             # 両モード共通初期化処理を実行
             self._init_common()
-            self._init_di()
+            self._init_xi()
         else:
             super(JoystickController, self).__init__(
                 event_input_device=event_input_device, 
-                config_path=XI_CONFIG_PATH, 
-                device_search_term=XI_SEARCH_TERM, 
-                verbose=verbose)
+                config_path=config_path or DI_CONFIG_PATH, 
+                device_search_term=device_search_term or DI_SEARCH_TERM, 
+                verbose=verbose,
+                **kwargs)
             #if self.verbose:
-            print('Use Xinput configuration')
-            self.is_xi = True
+            print('Use DirectInput configuration')
             # 両モード共通初期化処理を実行
             self._init_common()
-            self._init_xi()
+            self._init_di()
+        # デコードテーブルを構築
+        self.decoder = self._compile_decoder()
 
     def _init_common(self):
         """
@@ -181,95 +226,24 @@ class JoystickController(BluetoothGameController):
                 self.analog_stick_max_value, ',', \
                 self.analog_stick_min_value, '] zero domain: ', self.analog_stick_zero_domain)
 
-    def read_loop(self):
+    def _decode_spec(self):
         """
-        イベントデバイスから１件読み取り、対象のボタン名、値を返却する。
-        親クラスの実装のままでは F710 固有のイベントキャラクタデバイス
-        フォーマットに対応できないため、本メソッドをオーバライドして対応している。
+        デコードテーブルの構築に使用する decode セクションを返却する。
+        decode セクションのない設定ファイルの場合はモードごとの既定値を使用する。
 
         引数
             なし
         戻り値
-            btn     対象のボタン名
-            val     押下判定値(0,1)もしくは棒倒し率(-1～0～1)
+            spec        decode セクション(辞書)
         """
-        try:
-            # イベントデバイスから1件イベントを読み込む
-            event = next(self.device.read_loop())
-
-            # event.type が ecodes.EV_ABS(3) である場合
-            if event.type == ecodes.EV_ABS:
-                # アナログパッド名の確定
-                btn = self.ev_abs_code_map.get(event.code)
+        return self.config.get('decode') or (XI_DECODE if self.is_xi else DI_DECODE)
 
-                # 十字キーの場合
-                if btn in self.dpad_target:
-                    if self.verbose:
-                        print('in dpad_target: ', self.dpad_target)
-                    # -1,0,1のいずれかとなるのでそのまま使用
-                    val = event.value
 
-                # 十字キー以外のアナログスティックの場合
-                else:
-                    if self.verbose:
-                        print('analog pad: ', btn)
-                    
-                    # 中央値の誤差範囲内である場合
-                    if self.analog_stick_zero_domain[0] < event.value and event.value < self.analog_stick_zero_domain[1]:
-                        if self.verbose:
-                            print('in zero domain: ', self.analog_stick_zero_domain)
-
-                        # ゼロとして扱う
-                        val = 0
-
-                    # ゼロ誤差範囲内以外の値の場合
-                    else:
-                        # 明確な中央値を計算
-                        middle = (self.analog_stick_zero_domain[0] + self.analog_stick_zero_domain[1]) / 2.0
-                        length = self.analog_stick_max_value - self.analog_stick_min_value
-                        # [-1, 1]の範囲内の値に按分
-                        val = ((event.value - middle) * 1.0) / (length / 2.0)
-
-                        if self.verbose:
-                            print('compute from ', event.value, ' to ', val)
-
-            # event.type が ecodes.EV_KEY(1) である場合
-            elif event.type == ecodes.EV_KEY and self.is_xi:
-                if self.verbose:
-                    print('in button target(Xinput)')
-                btn = self.ev_key_code_map.get(event.code)
-                # 0ではない場合、 1 にする
-                val = 0 if event.value == 0 else 1
-
-            # event.type が ecodes.EV_MSC(4) である場合
-            elif event.type == ecodes.EV_MSC and (not self.is_xi):
-                if self.verbose:
-                    print('in button target(DirectInput)')
-                btn = self.ev_msc_value_map.get(event.value)
-                # イベントは入力時のみ発生するため 1 を常にセット
-                val = 1
-
-            else:
-                if self.verbose:
-                    print('ignore event: ', event)
-                btn = None
-                val = None
-
-            # デバッグコード
-            if self.verbose:
-                print('code: [', event.code,  '] val:[', event.value, '] type:[', event.type, ']')
-                print('name: [', btn, '] value=(', val ,')')
-
-            # ボタン名、値の返却
-            return btn, val
-
-        # OSエラー発生時
-        except OSError as e:
-            print('OSError: Likely lost connection with controller. Trying to reconnect now. Error: {}'.format(e))
-            # 0.1秒待機
-            time.sleep(.1)
-            # 検索文字列self.device_search_term と合致するイベントデバイスオブジェクトを取得し
-            # インスタンス変数 self.device へ格納する（やりなおし）
-            self.load_device(self.device_search_term)
-            # ボタン名, 値ともにNoneを返却
-            return None, None
+class AsyncJoystickController(AsyncControllerMixin, JoystickController):
+    """
+    F710 用 asyncio 版コントローラクラス。
+    events() で非同期にボタン名、値を取得でき、gamepad.aio.multiplex()/run_all() を
+    使用すると1つのイベントループ上で複数のゲームパッドを待ち受けることができる。
+    update() は専用イベントループを起動するため、従来通り run_threaded() でも使用できる。
+    """
+    pass
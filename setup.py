@@ -8,6 +8,7 @@ setup(
     url = 'https://github.com/coolerking/donkeypart_game_controller',
     install_requires = ['docopt', 'donkeypart_bluetooth_game_controller', 'time', 'evdev'],
     extras_require = {
-        'check_js': ['fcntl', 'strict']
+        'check_js': ['fcntl', 'strict'],
+        'numpy': ['numpy']
     }
 )